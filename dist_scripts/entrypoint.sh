@@ -8,13 +8,17 @@ mkdir -p "$HOME/.mozilla" 2>/dev/null || true
 
 echo BUILDTIME: $BUILDTIME
 
-# Parse --dry-run and --verbose flags
+# Parse --dry-run, --plan and --verbose flags
 DRY_RUN=false
 DRY_RUN_VERBOSE=false
+DRY_RUN_PLAN=false
 args=()
 for arg in "$@"; do
     if [ "$arg" = "--dry-run" ]; then
         DRY_RUN=true
+    elif [ "$arg" = "--plan" ]; then
+        DRY_RUN=true
+        DRY_RUN_PLAN=true
     elif [ "$arg" = "--verbose" ] || [ "$arg" = "-v" ]; then
         DRY_RUN_VERBOSE=true
     else
@@ -34,6 +38,8 @@ Usage: entrypoint.sh [--dry-run] [--verbose] <command> [args...]
 Commands:
   shell [cmd...]                  Open an interactive shell (or run cmd)
   download_then_upload <user>     Download all albums, then upload to Immich
+  download_and_upload <user>      Download all albums and upload each one to Immich
+                                  as soon as it has finished downloading
   upload                          Upload existing downloads to Immich
   <flickr-docker.sh args...>      Pass through to flickr-docker.sh
                                   (e.g. auth, download <user>, album <id>, list <user>)
@@ -41,8 +47,10 @@ Commands:
 Options:
   --dry-run          List albums/photos via API without downloading or uploading
   --verbose, -v      In dry-run mode, list individual photos per album
+  --plan             Dry-run that also measures the bytes to download and
+                     estimates download and upload times from earlier runs
 
-Required environment variables (for upload/download_then_upload):
+Required environment variables (for upload/download_then_upload/download_and_upload):
   DATA_DIR              Path to the data directory
   IMMICH_API_KEY        Immich API key
   IMMICH_INSTANCE_URL   Immich instance URL
@@ -69,7 +77,8 @@ elif [ "$1" = "download_then_upload" ]; then
 
     if [ "$DRY_RUN" = true ]; then
         /usr/local/bin/flickr-docker.sh download "${@:2}" --dry-run \
-            $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose")
+            $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose") \
+            $([ "$DRY_RUN_PLAN" = true ] && echo "--plan")
         /usr/local/bin/upload-to-immich.sh --dry-run
         rc_upload=$?
         echo rc_upload: $rc_upload
@@ -83,6 +92,39 @@ elif [ "$1" = "download_then_upload" ]; then
     rc_upload=$?
     echo rc_upload: $rc_upload
     exit $(( rc_download > rc_upload ? rc_download : rc_upload ))
+elif [ "$1" = "download_and_upload" ]; then
+    for var in DATA_DIR IMMICH_API_KEY IMMICH_INSTANCE_URL; do
+        if [ -z "${!var}" ]; then
+            echo "ERROR: Required environment variable $var is not set" >&2
+            exit 1
+        fi
+    done
+
+    if [ "$DRY_RUN" = true ]; then
+        exec "$0" --dry-run $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose") \
+            $([ "$DRY_RUN_PLAN" = true ] && echo "--plan") download_then_upload "${@:2}"
+    fi
+
+    /usr/local/bin/flickr-docker.sh info
+
+    # The download wrapper appends each finished album directory to this log;
+    # the uploader follows it until the "#END" line written when the download exits.
+    export DOWNLOAD_DONE_LOG="$DATA_DIR/.flickr_download_done.log"
+    : > "$DOWNLOAD_DONE_LOG"
+    # Both processes run at once, so the uploader serves metrics on the next port
+    METRICS_PORT=${METRICS_PORT:+$((METRICS_PORT + 1))} \
+        /usr/local/bin/upload-to-immich.sh --follow "$DOWNLOAD_DONE_LOG" &
+    upload_pid=$!
+
+    /usr/local/bin/flickr-docker.sh download "${@:2}"
+    rc_download=$?
+    echo rc_download: $rc_download
+    # Covers a download that died before the wrapper could write the end marker
+    echo "#END" >> "$DOWNLOAD_DONE_LOG"
+    wait $upload_pid
+    rc_upload=$?
+    echo rc_upload: $rc_upload
+    exit $(( rc_download > rc_upload ? rc_download : rc_upload ))
 elif [ "$1" = "upload" ]; then
     for var in DATA_DIR IMMICH_API_KEY IMMICH_INSTANCE_URL; do
         if [ -z "${!var}" ]; then
@@ -103,5 +145,6 @@ else
     /usr/local/bin/flickr-docker.sh info &&
     exec /usr/local/bin/flickr-docker.sh "$@" \
         $([ "$DRY_RUN" = true ] && echo "--dry-run") \
-        $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose")
+        $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose") \
+        $([ "$DRY_RUN_PLAN" = true ] && echo "--plan")
 fi
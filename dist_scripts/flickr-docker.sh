@@ -563,6 +563,16 @@ build_container_args() {
         # Mac/Windows: empty -> Python webbrowser prints URL to stdout
         CONTAINER_ARGS+=(-e "BROWSER=$BROWSER")
     fi
+
+    # Bandwidth limiter (BANDWIDTH_CONTROL_FILE must be a path inside the container), download concurrency and mode,
+    # Flickr API pacing and cache size
+    local var
+    for var in BANDWIDTH_LIMIT BANDWIDTH_BURST BANDWIDTH_CONTROL_FILE DOWNLOAD_WORKERS INCREMENTAL_SYNC BLOB_STORE \
+        FLICKR_API_RATE FLICKR_API_CACHE_MAX_MB BACKOFF_BASE BACKOFF_MAX BACKOFF_EXIT_ON_429; do
+        if [ -n "${!var:-}" ]; then
+            CONTAINER_ARGS+=(-e "$var=${!var}")
+        fi
+    done
 }
 
 run_container() {
@@ -782,14 +792,17 @@ cmd_download() {
     local FLICKR_USER
     FLICKR_USER=$(flickr_user_to_url "$USERNAME")
 
-    # Dry-run: list albums/photos without downloading
+    # Dry-run: list albums/photos without downloading (--plan: measure the bytes to download)
     if [ "$DRY_RUN" = true ]; then
         local verbose_flag=""
         [ "$DRY_RUN_VERBOSE" = true ] && verbose_flag="--verbose"
+        local plan_args=()
+        [ "$DRY_RUN_PLAN" = true ] && plan_args=(--plan --backup-dir "$WORK_DIR")
         if [ "$IN_CONTAINER" = true ]; then
-            env HOME="$CONFIG_DIR" flickr-download-dry-run user "$FLICKR_USER" $verbose_flag
+            env HOME="$CONFIG_DIR" FLICKR_API_CACHE="$CACHE_DIR/api_cache.db" flickr-download-dry-run user "$FLICKR_USER" $verbose_flag "${plan_args[@]}"
         else
-            run_container download "$USERNAME" --dry-run $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose")
+            run_container download "$USERNAME" --dry-run $([ "$DRY_RUN_VERBOSE" = true ] && echo "--verbose") \
+                $([ "$DRY_RUN_PLAN" = true ] && echo "--plan")
         fi
         return
     fi
@@ -827,10 +840,12 @@ cmd_download_album() {
 
     # Dry-run: list photos in album without downloading
     if [ "$DRY_RUN" = true ]; then
+        local plan_args=()
+        [ "$DRY_RUN_PLAN" = true ] && plan_args=(--plan --backup-dir "$WORK_DIR")
         if [ "$IN_CONTAINER" = true ]; then
-            env HOME="$CONFIG_DIR" flickr-download-dry-run album "$ALBUM_ID"
+            env HOME="$CONFIG_DIR" FLICKR_API_CACHE="$CACHE_DIR/api_cache.db" flickr-download-dry-run album "$ALBUM_ID" "${plan_args[@]}"
         else
-            run_container album "$ALBUM_ID" --dry-run
+            run_container album "$ALBUM_ID" --dry-run $([ "$DRY_RUN_PLAN" = true ] && echo "--plan")
         fi
         return
     fi
@@ -873,7 +888,7 @@ cmd_list() {
     if [ "$IN_CONTAINER" = true ]; then
         # env HOME="$CONFIG_DIR" flickr-list-albums.py "$FLICKR_USER"
         # installed by pip with pyproject.toml
-        env HOME="$CONFIG_DIR" flickr-list-albums "$FLICKR_USER"
+        env HOME="$CONFIG_DIR" FLICKR_API_CACHE="$CACHE_DIR/api_cache.db" flickr-list-albums "$FLICKR_USER"
     else
         #run_container shell -c "flickr-list-albums.py '$FLICKR_USER'"
         # installed by pip with pyproject.toml
@@ -1311,6 +1326,8 @@ OPTIONS:
 
   --dry-run                 List albums/photos via API without downloading
   --verbose, -v             In dry-run mode, list individual photos per album
+  --plan                    Dry-run that measures the bytes to download and
+                            estimates the time from earlier downloads
 
 NOT AVAILABLE IN CONTAINER (run on the host):
 
@@ -1325,6 +1342,7 @@ EXAMPLES:
   $0 download my_flickr_name
   $0 download my_flickr_name --dry-run
   $0 download my_flickr_name --dry-run --verbose
+  $0 download my_flickr_name --plan
   $0 album 72157622764287329
   $0 album 72157622764287329 --dry-run
 
@@ -1370,6 +1388,9 @@ OPTIONS:
                             (applies to download and album commands)
   --verbose, -v             In dry-run mode, list individual photos per album
                             (applies to download --dry-run)
+  --plan                    Dry-run that measures the bytes to download (HEAD
+                            requests, no API quota for photos) and estimates
+                            the time from earlier downloads
 
 EXAMPLES:
 
@@ -1387,6 +1408,7 @@ EXAMPLES:
   # Dry-run: list what would be downloaded
   ./flickr-docker.sh download my_flickr_name --dry-run
   ./flickr-docker.sh download my_flickr_name --dry-run --verbose
+  ./flickr-docker.sh download my_flickr_name --plan
 
   # Specific album only
   ./flickr-docker.sh list my_flickr_name
@@ -1397,7 +1419,7 @@ DIRECTORIES:
 
   ./flickr-backup/          Downloaded photos
   ./flickr-config/          API keys and token
-  ./flickr-cache/           Cache for resume functionality
+  ./flickr-cache/           Flickr API response cache
 
 PREREQUISITES:
 
@@ -1509,13 +1531,17 @@ main() {
     esac
 }
 
-# Parse --dry-run and --verbose flags, remove them from positional args
+# Parse --dry-run, --plan and --verbose flags, remove them from positional args
 DRY_RUN=false
 DRY_RUN_VERBOSE=false
+DRY_RUN_PLAN=false
 filtered_args=()
 for arg in "$@"; do
     if [ "$arg" = "--dry-run" ]; then
         DRY_RUN=true
+    elif [ "$arg" = "--plan" ]; then
+        DRY_RUN=true
+        DRY_RUN_PLAN=true
     elif [ "$arg" = "--verbose" ] || [ "$arg" = "-v" ]; then
         DRY_RUN_VERBOSE=true
     else
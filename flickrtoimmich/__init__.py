@@ -87,6 +87,15 @@ _CONFIG_ENV_VARS: list[tuple[str, str]] = [
     ("USE_DSOCKET", "Domain socket mode"),
     ("USE_DBUS", "D-Bus mode"),
     ("BACKOFF_EXIT_ON_429", "Exit on rate limit"),
+    ("FLICKR_API_RATE", "Flickr API calls/hour"),
+    ("FLICKR_API_CACHE", "Flickr API cache"),
+    ("FLICKR_API_CACHE_MAX_MB", "Flickr API cache size (MB)"),
+    ("DOWNLOAD_WORKERS", "Parallel downloads"),
+    ("INCREMENTAL_SYNC", "Incremental sync"),
+    ("BLOB_STORE", "Shared photo store"),
+    ("BANDWIDTH_LIMIT", "Bandwidth limit"),
+    ("BANDWIDTH_CONTROL_FILE", "Bandwidth control file"),
+    ("METRICS_PORT", "Metrics port"),
     ("BUILDTIME", "Build time"),
 ]
 
@@ -0,0 +1,199 @@
+"""Process-wide token-bucket bandwidth limiter shared by the downloader and the uploader."""
+
+import math
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from types import FrameType
+
+from loguru import logger
+
+from flickrtoimmich import metrics
+
+# How often (seconds) the control file is checked for changes
+CONTROL_POLL_INTERVAL = 2.0
+
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count with an optional binary unit suffix.
+
+    Args:
+        value: Size such as ``"512M"``, ``"2G"``, ``"64KB"``, ``"1.5MiB"`` or ``"1048576"``.
+
+    Returns:
+        Size in bytes.
+
+    Raises:
+        ValueError: If ``value`` is not a finite, non-negative size.
+    """
+    number = value.strip().upper().removesuffix("B").removesuffix("I")
+    suffix = number[-1:] if number[-1:] in _UNITS else ""
+    scaled = float(number.removesuffix(suffix)) * _UNITS[suffix]
+    if not math.isfinite(scaled):
+        raise ValueError(f"size out of range: {value!r}")
+    size = int(scaled)
+    if size < 0:
+        raise ValueError(f"negative size: {value!r}")
+    return size
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting throughput to ``rate`` bytes per second.
+
+    Up to ``burst`` bytes can be consumed at once after an idle period. A rate of 0 disables the limit.
+
+    The limit can be changed at runtime with :meth:`configure`, by writing ``RATE [BURST]`` (e.g.
+    ``"5M 10M"``, or ``"0"`` for unlimited) to ``control_file``, or by sending ``SIGUSR1`` once
+    :meth:`install_signal_handler` was called, which toggles between the configured limit and full speed.
+
+    Args:
+        rate: Sustained rate in bytes per second; 0 for unlimited.
+        burst: Bucket capacity in bytes; defaults to one second worth of ``rate``.
+        control_file: File re-read whenever its modification time changes, or None.
+    """
+
+    def __init__(self, rate: int = 0, burst: int | None = None, control_file: Path | None = None) -> None:
+        self._lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._suspended = False
+        # Suspension state last logged; the signal handler only flips _suspended and consume() reports it
+        self._logged_suspended = False
+        self.control_file = control_file
+        self._control_mtime: int | None = None
+        self._next_poll = 0.0
+        self.configure(rate, burst)
+        self._tokens = float(self.burst)
+
+    @classmethod
+    def from_env(cls) -> "TokenBucket":
+        """Create a bucket from ``BANDWIDTH_LIMIT``, ``BANDWIDTH_BURST`` and ``BANDWIDTH_CONTROL_FILE``.
+
+        Returns:
+            Configured bucket; unlimited if ``BANDWIDTH_LIMIT`` is unset.
+
+        Raises:
+            ValueError: If ``BANDWIDTH_LIMIT`` or ``BANDWIDTH_BURST`` is not a valid size.
+        """
+        rate = parse_size(os.environ.get("BANDWIDTH_LIMIT") or "0")
+        burst = os.environ.get("BANDWIDTH_BURST")
+        control = os.environ.get("BANDWIDTH_CONTROL_FILE")
+        return cls(rate, parse_size(burst) if burst else None, Path(control) if control else None)
+
+    @property
+    def limited(self) -> bool:
+        """Whether a rate limit is currently in effect."""
+        return self.rate > 0 and not self._suspended
+
+    def configure(self, rate: int, burst: int | None = None) -> None:
+        """Change the rate and burst size.
+
+        Args:
+            rate: Sustained rate in bytes per second; 0 for unlimited.
+            burst: Bucket capacity in bytes; defaults to one second worth of ``rate``.
+        """
+        with self._lock:
+            burst = max(burst or rate, 1)
+            changed = (rate, burst) != (self.rate, self.burst)
+            self.rate = rate
+            self.burst = burst
+            self._tokens = min(self._tokens, self.burst)
+        if not changed:
+            return
+        if rate:
+            logger.info(f"Bandwidth limit set to {rate} B/s (burst {self.burst} B)")
+        else:
+            logger.info("Bandwidth limit disabled")
+
+    def toggle_suspended(self) -> None:
+        """Switch between the configured limit and full speed.
+
+        Safe to call from a signal handler: it takes no lock and does not log, since the handler may interrupt
+        :meth:`consume` or a logging call on the same thread. The change is logged by the next :meth:`consume`.
+        """
+        self._suspended = not self._suspended
+
+    def _log_suspension(self) -> None:
+        """Log a suspension toggled since the last call."""
+        suspended = self._suspended
+        if suspended != self._logged_suspended:
+            self._logged_suspended = suspended
+            logger.info(f"Bandwidth limit {'suspended (full speed)' if suspended else 'resumed'}")
+
+    def install_signal_handler(self, signum: int = signal.SIGUSR1) -> None:
+        """Toggle the limit on ``signum``. Must be called from the main thread.
+
+        Args:
+            signum: Signal to react to.
+        """
+
+        def _handler(_signum: int, _frame: FrameType | None) -> None:
+            self.toggle_suspended()
+
+        signal.signal(signum, _handler)
+
+    def _poll_control_file(self) -> None:
+        """Apply the control file if it changed since it was last read."""
+        now = time.monotonic()
+        if self.control_file is None or now < self._next_poll:
+            return
+        self._next_poll = now + CONTROL_POLL_INTERVAL
+        try:
+            mtime = self.control_file.stat().st_mtime_ns
+            if mtime == self._control_mtime:
+                return
+            self._control_mtime = mtime
+            fields = self.control_file.read_text().split()
+            rate = parse_size(fields[0]) if fields and fields[0].lower() not in ("off", "unlimited") else 0
+            self.configure(rate, parse_size(fields[1]) if len(fields) > 1 else None)
+        except (OSError, ValueError) as ex:
+            logger.warning(f"Ignoring bandwidth control file {self.control_file}: {ex}")
+
+    def consume(self, n: int) -> None:
+        """Block until ``n`` bytes may be transferred.
+
+        Requests larger than the burst size are granted in burst-sized pieces.
+
+        Args:
+            n: Number of bytes about to be transferred.
+        """
+        self._log_suspension()
+        self._poll_control_file()
+        while n > 0:
+            with self._lock:
+                if self.rate <= 0 or self._suspended:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                need = min(n, self.burst)
+                if self._tokens >= need:
+                    self._tokens -= need
+                    n -= need
+                    continue
+                delay = (need - self._tokens) / self.rate
+            metrics.BACKOFF_SECONDS.inc(delay, reason="bandwidth")
+            time.sleep(delay)
+
+
+_limiter: TokenBucket | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> TokenBucket:
+    """Return the process-wide bandwidth limiter, configured from the environment on first use.
+
+    Returns:
+        The shared token bucket.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TokenBucket.from_env()
+        return _limiter
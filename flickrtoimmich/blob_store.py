@@ -0,0 +1,100 @@
+"""Download-wide store of photo files keyed by Flickr photo ID, linked into the album directories.
+
+A photo that is filed in several albums is downloaded once into the store; every album directory gets a
+hardlink to that file, or a relative symlink where the file system does not support hardlinks (e.g. across
+devices). Deleting an album directory never removes data another album still links to.
+"""
+
+import errno
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from loguru import logger
+
+BLOB_STORE_ENV = "BLOB_STORE"
+BLOB_DIRNAME = ".flickr_blobs"
+
+# Blobs share this many locks, so memory stays fixed however many photos a run places; with a few download
+# workers, two concurrent downloads rarely wait for each other
+LOCK_STRIPES = 256
+
+
+class BlobStore:
+    """Photo files named ``<root>/<last 2 digits of ID>/<ID>_<size label><ext>``.
+
+    The file name depends on the Flickr photo ID and the requested size only, so the same photo is found
+    again however it is named in the albums.
+
+    Args:
+        root: Store directory (created if missing).
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(exist_ok=True)
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def blob_path(self, photo_id: str, size_label: str | None, ext: str) -> Path:
+        """Return where the file of a photo is stored.
+
+        Args:
+            photo_id: Flickr photo ID.
+            size_label: Requested size, or None for the largest available.
+            ext: File extension including the dot, e.g. ``.jpg``.
+
+        Returns:
+            Path of the blob; it may not exist yet.
+        """
+        label = (size_label or "largest").replace(" ", "_")
+        return self.root / photo_id[-2:] / f"{photo_id}_{label}{ext}"
+
+    def _lock(self, blob: Path) -> threading.Lock:
+        """Return the lock serializing downloads of ``blob``; unrelated blobs may share it."""
+        return self._locks[hash(blob) % LOCK_STRIPES]
+
+    def place(self, photo_id: str, size_label: str | None, fname: str, fetch: Callable[[str], None]) -> bool:
+        """Put the file of a photo at ``fname``, downloading it into the store only if it is not there yet.
+
+        Args:
+            photo_id: Flickr photo ID.
+            size_label: Requested size, or None for the largest available.
+            fname: Target file name in the album directory.
+            fetch: Downloads the photo to the path it is given.
+
+        Returns:
+            True if the file was downloaded, False if an existing blob was linked.
+
+        Raises:
+            OSError: If the download fails or ``fname`` cannot be created.
+        """
+        blob = self.blob_path(photo_id, size_label, os.path.splitext(fname)[1])
+        with self._lock(blob):
+            downloaded = False
+            if not blob.exists():
+                blob.parent.mkdir(exist_ok=True)
+                fetch(str(blob))
+                downloaded = True
+            link(blob, fname)
+        return downloaded
+
+
+def link(blob: Path, fname: str) -> None:
+    """Create ``fname`` as a hardlink to ``blob``, falling back to a relative symlink.
+
+    Args:
+        blob: Existing file.
+        fname: Link to create; it must not exist.
+
+    Raises:
+        OSError: If neither link can be created.
+    """
+    try:
+        os.link(blob, fname)
+        return
+    except OSError as ex:
+        if ex.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise
+        logger.debug(f"Cannot hardlink {fname} ({ex}), creating a symlink")
+    os.symlink(os.path.relpath(blob, os.path.dirname(fname) or "."), fname)
@@ -0,0 +1,83 @@
+"""Parallel SHA-1 hashing of upload candidates, as used by Immich for duplicate detection."""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Protocol
+
+CHUNK_SIZE = 1024 * 1024
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class ChecksumCache(Protocol):
+    """Lookup/store interface for previously computed checksums (implemented by ``UploadLedger``)."""
+
+    def cached_checksum(self, stat: os.stat_result) -> str | None:
+        """Return the cached checksum for a file with this ``stat`` result, if any."""
+        ...
+
+    def record_checksums(self, entries: list[tuple[os.stat_result, str]]) -> None:
+        """Store freshly computed checksums."""
+        ...
+
+
+def _hash_pool() -> ThreadPoolExecutor:
+    """Return the process-wide hashing thread pool, creating it on first use.
+
+    ``hashlib`` releases the GIL while digesting, so threads scale across cores. The pool size can be set
+    with ``HASH_WORKERS`` (default: number of CPUs).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.environ.get("HASH_WORKERS", "0")) or os.cpu_count() or 4
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sha1")
+        return _pool
+
+
+def sha1_file(path: Path) -> str:
+    """Compute the hex SHA-1 digest of a file, reading it in fixed-size chunks.
+
+    Args:
+        path: File to hash.
+
+    Returns:
+        Lower-case hex digest.
+    """
+    h = hashlib.sha1()
+    with path.open("rb") as fh:
+        while chunk := fh.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compute_checksums(files: list[Path], cache: ChecksumCache | None = None) -> dict[Path, str]:
+    """Hash ``files`` in parallel, reusing cached digests for unchanged files.
+
+    Args:
+        files: Files to hash.
+        cache: Optional checksum cache keyed by inode, size and mtime.
+
+    Returns:
+        Mapping of file path to hex SHA-1 digest.
+    """
+    stats = {f: f.stat() for f in files}
+    result: dict[Path, str] = {}
+    missing: list[Path] = []
+    for f, st in stats.items():
+        cached = cache.cached_checksum(st) if cache is not None else None
+        if cached is not None:
+            result[f] = cached
+        else:
+            missing.append(f)
+
+    if missing:
+        digests = list(_hash_pool().map(sha1_file, missing))
+        result.update(zip(missing, digests))
+        if cache is not None:
+            cache.record_checksums([(stats[f], d) for f, d in zip(missing, digests)])
+    return result
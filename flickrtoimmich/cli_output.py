@@ -0,0 +1,228 @@
+"""Output handling for ``immich`` CLI subprocesses: one selector thread reads all pipes and parses results."""
+
+import os
+import queue
+import re
+import selectors
+import subprocess
+import threading
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+from loguru import logger
+
+_READ_SIZE = 64 * 1024
+
+_FOUND = re.compile(r"Found (\d+) new files? and (\d+) duplicates?")
+_UPLOADED = re.compile(r"Successfully uploaded (\d+) (?:new )?assets?")
+_UNABLE = re.compile(r'Unable to upload "(?P<path>.+?)"(?::\s*(?P<reason>.*))?$')
+# The path of a failure list item may itself contain " - ", so the item is split by the batch's file names
+_FAILED_ITEM = re.compile(r"^\s*-\s+(?P<item>.+ - .+)$")
+
+
+class CliEvent(NamedTuple):
+    """One result reported by the ``immich`` CLI.
+
+    ``kind`` is ``"created"``, ``"duplicate"`` or ``"failed"``. Summary lines carry ``n_files`` and no
+    ``path``; per-file failures carry the file and the CLI's error message in ``detail``. Failure list items
+    (``- <path> - <message>``) carry the text after the dash in ``item`` instead, since the end of the path
+    is only known once it is compared with the uploaded files (see :meth:`CliResult.failed_files`).
+    """
+
+    kind: str
+    n_files: int
+    path: str | None = None
+    detail: str = ""
+    item: str = ""
+
+
+def parse_line(line: str) -> list[CliEvent]:
+    """Extract the results reported in one line of ``immich upload`` output.
+
+    Args:
+        line: Output line without the line terminator.
+
+    Returns:
+        The events found in the line; empty for progress and informational output.
+    """
+    if m := _FOUND.search(line):
+        return [CliEvent("duplicate", int(m[2]))] if int(m[2]) else []
+    if m := _UPLOADED.search(line):
+        return [CliEvent("created", int(m[1]))]
+    if m := _UNABLE.search(line):
+        return [CliEvent("failed", 1, m["path"], m["reason"] or "")]
+    if m := _FAILED_ITEM.match(line):
+        return [CliEvent("failed", 1, item=m["item"])]
+    return []
+
+
+class CliResult(NamedTuple):
+    """Exit code and parsed events of one ``immich upload`` run."""
+
+    returncode: int
+    events: list[CliEvent]
+
+    def count(self, kind: str) -> int:
+        """Return the number of files reported as ``kind`` in summary lines."""
+        return sum(e.n_files for e in self.events if e.kind == kind and e.path is None and not e.item)
+
+    def _attribute(self, files: Sequence[Path]) -> list[tuple[Path | None, str]]:
+        """Pair every failure event with the file of ``files`` it names and its reason.
+
+        Failures naming no file of ``files`` are paired with None and the whole reported text.
+        """
+        by_name: dict[str, Path] = {}
+        for f in files:
+            by_name[str(f)] = by_name[str(f.absolute())] = f
+        # Longest names first, so that "a - b.jpg" is not taken for "a" with a message starting with "b.jpg"
+        names = sorted(by_name, key=len, reverse=True)
+        attributed: list[tuple[Path | None, str]] = []
+        for e in self.events:
+            if e.kind != "failed":
+                continue
+            if e.path is not None:
+                named = by_name.get(e.path)
+                reason = e.detail or "upload failed"
+                attributed.append((named, reason) if named is not None else (None, f"{e.path}: {reason}"))
+                continue
+            name = next((n for n in names if e.item.startswith(f"{n} - ")), None)
+            attributed.append((by_name[name], e.item[len(name) + 3 :]) if name is not None else (None, e.item))
+        return attributed
+
+    def failed_files(self, files: Sequence[Path]) -> dict[Path, str]:
+        """Return the files of ``files`` the CLI reported as failed, with the reported reason.
+
+        Args:
+            files: Files passed to the CLI; failures naming other paths are ignored.
+
+        Returns:
+            Failed files mapped to the CLI's error message.
+        """
+        return {f: reason for f, reason in self._attribute(files) if f is not None}
+
+    def unattributed_failures(self, files: Sequence[Path]) -> list[str]:
+        """Return the failures the CLI reported that name none of ``files``.
+
+        Args:
+            files: Files passed to the CLI.
+
+        Returns:
+            The reported path and message of each such failure.
+        """
+        return [reason for f, reason in self._attribute(files) if f is None]
+
+
+class _Stream:
+    """Read state of one subprocess pipe."""
+
+    def __init__(self, name: str, on_line: Callable[[str, str], None], process: "_Process") -> None:
+        self.name = name
+        self.on_line = on_line
+        self.process = process
+        self.buf = b""
+
+
+class _Process:
+    """Counts the open pipes of one subprocess and signals once all of them reached EOF."""
+
+    def __init__(self, pipes: int) -> None:
+        self.open = pipes
+        self.closed = threading.Event()
+
+
+class OutputMultiplexer:
+    """Reads stdout and stderr of any number of subprocesses on a single background thread.
+
+    Callers start a command with :meth:`run`, which registers its pipes with a selector and blocks until
+    the process has exited. Complete lines (terminated by ``\\n`` or ``\\r``) are passed to the caller's
+    callback on the selector thread, so callbacks must be quick and thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._incoming: queue.SimpleQueue[tuple[int, _Stream]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._loop, name="cli-output", daemon=True)
+        self._thread.start()
+
+    def run(self, cmd: Sequence[str], on_line: Callable[[str, str], None]) -> int:
+        """Run ``cmd`` and feed its output lines to ``on_line`` until it exits.
+
+        Args:
+            cmd: Command and arguments.
+            on_line: Called with the stream name (``"stdout"`` or ``"stderr"``) and each output line.
+
+        Returns:
+            Exit code of the command.
+        """
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process = _Process(2)
+        for name, pipe in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+            assert pipe is not None
+            # The selector thread owns the descriptor from here on and closes it at EOF
+            fd = os.dup(pipe.fileno())
+            pipe.close()
+            os.set_blocking(fd, False)
+            self._incoming.put((fd, _Stream(name, on_line, process)))
+        os.write(self._wake_w, b"\0")
+        process.closed.wait()
+        return proc.wait()
+
+    def _loop(self) -> None:
+        """Dispatch readable pipes forever."""
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wake_r:
+                    try:
+                        os.read(self._wake_r, _READ_SIZE)
+                    except BlockingIOError:
+                        pass
+                    while not self._incoming.empty():
+                        fd, stream = self._incoming.get()
+                        self._selector.register(fd, selectors.EVENT_READ, stream)
+                else:
+                    self._read(key.fd, key.data)
+
+    def _read(self, fd: int, stream: _Stream) -> None:
+        """Read what is available on ``fd`` and emit complete lines; unregister the pipe at EOF."""
+        try:
+            data = os.read(fd, _READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if data:
+            *lines, stream.buf = re.split(rb"\r\n|\r|\n", stream.buf + data)
+        else:
+            lines, stream.buf = [stream.buf] if stream.buf else [], b""
+        for raw in filter(None, lines):
+            try:
+                stream.on_line(stream.name, raw.decode(errors="replace"))
+            except Exception:  # a failing callback must not stop the output of other processes
+                logger.exception(f"Handling {stream.name} output failed")
+        if not data:
+            self._selector.unregister(fd)
+            os.close(fd)
+            stream.process.open -= 1
+            if not stream.process.open:
+                stream.process.closed.set()
+
+
+_multiplexer: OutputMultiplexer | None = None
+_multiplexer_lock = threading.Lock()
+
+
+def get_multiplexer() -> OutputMultiplexer:
+    """Return the process-wide output multiplexer, starting its thread on first use.
+
+    Returns:
+        The shared multiplexer.
+    """
+    global _multiplexer
+    with _multiplexer_lock:
+        if _multiplexer is None:
+            _multiplexer = OutputMultiplexer()
+        return _multiplexer
@@ -0,0 +1,86 @@
+"""Append-only log through which the downloader announces finished album directories to the uploader.
+
+The downloader appends one absolute album path per line once the album is complete, and :data:`END_MARKER`
+when it exits. The uploader tails the file with :func:`follow`, so both can run at the same time.
+"""
+
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+DONE_LOG_ENV = "DOWNLOAD_DONE_LOG"
+END_MARKER = "#END"
+
+# How often (seconds) the log is checked for new lines
+POLL_INTERVAL = 1.0
+
+
+def _append(log: Path, line: str) -> None:
+    """Append ``line`` to ``log`` with a single write, so concurrent readers never see half a line."""
+    fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{line}\n".encode())
+    finally:
+        os.close(fd)
+
+
+def mark_album_done(log: Path, album_dir: Path) -> None:
+    """Announce that every photo of ``album_dir`` has been downloaded.
+
+    Args:
+        log: Completion log.
+        album_dir: Finished album directory.
+    """
+    _append(log, str(album_dir.absolute()))
+
+
+def report_album_done(album_dir: Path) -> None:
+    """Announce ``album_dir`` in the completion log named by ``DOWNLOAD_DONE_LOG``, if set.
+
+    Args:
+        album_dir: Finished album directory.
+    """
+    if log := os.environ.get(DONE_LOG_ENV):
+        mark_album_done(Path(log), album_dir)
+
+
+def mark_finished(log: Path) -> None:
+    """Announce that the downloader has exited and no more albums will follow.
+
+    Args:
+        log: Completion log.
+    """
+    _append(log, END_MARKER)
+
+
+def follow(log: Path, poll_interval: float = POLL_INTERVAL) -> Iterator[Path]:
+    """Yield the album directories announced in ``log`` until :data:`END_MARKER` is read.
+
+    Waits for the file to appear and for new lines to be appended, like ``tail -f``. A trailing line
+    without a newline is held back until it is complete.
+
+    Args:
+        log: Completion log.
+        poll_interval: Seconds to sleep when no new line is available.
+
+    Yields:
+        Album directories in the order they were announced.
+    """
+    while not log.exists():
+        time.sleep(poll_interval)
+    with log.open("rb") as fh:
+        partial = b""
+        while True:
+            data = fh.readline()
+            if not data:
+                time.sleep(poll_interval)
+                continue
+            partial += data
+            if not partial.endswith(b"\n"):
+                continue
+            line, partial = partial.decode().strip(), b""
+            if line == END_MARKER:
+                return
+            if line:
+                yield Path(line)
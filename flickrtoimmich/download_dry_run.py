@@ -1,17 +1,33 @@
-"""Dry-run mode for Flickr downloads — lists albums and photos without downloading."""
+"""Dry-run mode for Flickr downloads — lists albums and photos without downloading, or plans the transfer."""
 
 import argparse
 import os
 import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TypeVar
 
 import flickr_api
 import yaml
 from flickr_api.auth import AuthHandler
+from flickr_api.objects import Walker
 from loguru import logger
 
+from flickrtoimmich import flickr_cache, flickr_ratelimit
+from flickrtoimmich.download_plan import AlbumPlan, SizeProbe, plan_album
+from flickrtoimmich.flickr_listing import PhotoRecord, iter_photoset_photos
+from flickrtoimmich.transfer_stats import STATS_FILENAME, TransferStats, fmt_size
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_WORKERS = 8
+
 
 def _load_flickr_api() -> None:
-    """Load Flickr API credentials and OAuth token from config files."""
+    """Load Flickr API credentials and OAuth token from config files, then pace and cache API calls."""
     config_path = os.path.join(os.environ.get("HOME", os.path.expanduser("~")), ".flickr_download")
     with open(config_path) as f:
         config = yaml.safe_load(f)
@@ -20,31 +36,76 @@ def _load_flickr_api() -> None:
     token_path = os.path.join(os.environ.get("HOME", os.path.expanduser("~")), ".flickr_token")
     if os.path.exists(token_path):
         flickr_api.set_auth_handler(AuthHandler.load(token_path))
+    flickr_ratelimit.install()
+    flickr_cache.install()
 
 
-def _list_album_photos(ps: flickr_api.Photoset) -> int:
-    """List individual photos/videos in an album.
+def _log_album_photos(photos: Iterable[PhotoRecord]) -> int:
+    """Log the individual photos/videos of an album.
 
     Args:
-        ps: Flickr photoset object.
+        photos: Photos of the album in album order.
 
     Returns:
         Number of files listed.
     """
     count = 0
-    for photo in ps.getPhotos():
+    for photo in photos:
         count += 1
-        media = getattr(photo, "media", "photo")
-        logger.info(f"[DRY-RUN]   [{count}] {photo.title} ({media})")
+        logger.info(f"[DRY-RUN]   [{count}] {photo.title} ({photo.media})")
     return count
 
 
-def dry_run_user(user_url: str, verbose: bool = False) -> None:
+def _list_album_photos(ps: flickr_api.Photoset) -> int:
+    """List individual photos/videos in an album, fetching 500 photos per API call.
+
+    Args:
+        ps: Flickr photoset object.
+
+    Returns:
+        Number of files listed.
+    """
+    return _log_album_photos(iter_photoset_photos(ps.id))
+
+
+def _ordered_map(func: Callable[[T], R], items: Iterable[T], workers: int) -> Iterator[tuple[T, R]]:
+    """Apply ``func`` to ``items`` on a thread pool and yield the results in input order.
+
+    At most ``2 * workers`` items are in flight, so the listing never runs far ahead of the output.
+
+    Args:
+        func: Function to apply.
+        items: Input items.
+        workers: Number of threads.
+
+    Yields:
+        ``(item, result)`` pairs in the order of ``items``.
+    """
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dry-run")
+    pending: deque[tuple[T, Future[R]]] = deque()
+    try:
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            while len(pending) > 2 * workers:
+                done, fut = pending.popleft()
+                yield done, fut.result()
+        while pending:
+            done, fut = pending.popleft()
+            yield done, fut.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def dry_run_user(user_url: str, verbose: bool = False, workers: int = DEFAULT_WORKERS) -> None:
     """List all albums and their photos for a Flickr user without downloading.
 
+    With ``verbose``, the photos of up to ``workers`` albums are fetched at once. The API calls share the
+    process-wide Flickr call pacing, and the output is logged in album order as in a serial run.
+
     Args:
         user_url: Flickr user URL (e.g. "https://www.flickr.com/photos/username").
         verbose: If True, list individual photos per album.
+        workers: Number of albums listed concurrently.
     """
     _load_flickr_api()
     user = flickr_api.Person.findByUrl(user_url)
@@ -54,15 +115,18 @@ def dry_run_user(user_url: str, verbose: bool = False) -> None:
     total_videos = 0
     album_nr = 0
 
-    for ps in user.getPhotosets():
+    def fetch(ps: flickr_api.Photoset) -> list[PhotoRecord] | None:
+        return list(iter_photoset_photos(ps.id)) if verbose else None
+
+    for ps, album_photos in _ordered_map(fetch, Walker(user.getPhotosets), workers):
         album_nr += 1
         photos = int(getattr(ps, "photos", 0))
         videos = int(getattr(ps, "videos", 0))
         total_photos += photos
         total_videos += videos
         logger.info(f"[DRY-RUN] Album {album_nr}: '{ps.title}' — {photos} photo(s), {videos} video(s)")
-        if verbose:
-            _list_album_photos(ps)
+        if album_photos is not None:
+            _log_album_photos(album_photos)
 
     logger.info(f"[DRY-RUN] Total: {album_nr} album(s), {total_photos} photo(s), {total_videos} video(s)")
 
@@ -82,6 +146,81 @@ def dry_run_album(album_id: str) -> None:
     logger.info(f"[DRY-RUN] Total: {count} file(s) in album")
 
 
+def _log_album_plan(label: str, plan: AlbumPlan, verbose: bool) -> None:
+    """Log the planned transfer of one album, and with ``verbose`` every file in it."""
+    unknown = f", {plan.unknown} of unknown size" if plan.unknown else ""
+    logger.info(
+        f"[PLAN] {label} — {len(plan.files)} file(s) to download, {fmt_size(plan.n_bytes)}"
+        f" ({plan.already_downloaded} already downloaded{unknown})"
+    )
+    if verbose:
+        for nr, (photo, size) in enumerate(plan.files, 1):
+            size_str = fmt_size(size) if size is not None else "size unknown"
+            logger.info(f"[PLAN]   [{nr}] {photo.title} ({photo.media}, {size_str})")
+
+
+def _log_plan_total(what: str, n_bytes: int, unknown: int, backup_dir: Path | None) -> None:
+    """Log the planned total and the time it is expected to take at the throughput of earlier downloads."""
+    stats = TransferStats((backup_dir or Path(".")) / STATS_FILENAME)
+    unknown_str = f" plus {unknown} file(s) of unknown size" if unknown else ""
+    logger.info(f"[PLAN] Total: {what}, {fmt_size(n_bytes)}{unknown_str}; {stats.estimate('download', n_bytes)}")
+
+
+def plan_user(
+    user_url: str, backup_dir: Path | None = None, verbose: bool = False, workers: int = DEFAULT_WORKERS
+) -> None:
+    """Report how many bytes downloading all albums of a user would fetch, per album and in total.
+
+    File sizes are measured with ``HEAD`` requests (see :class:`SizeProbe`). Photos already recorded in the
+    backup directory are left out, and the total comes with an ETA based on earlier downloads.
+
+    Args:
+        user_url: Flickr user URL (e.g. "https://www.flickr.com/photos/username").
+        backup_dir: Directory downloads run in; None to plan a download from scratch.
+        verbose: If True, list every file with its size.
+        workers: Number of albums planned concurrently.
+    """
+    _load_flickr_api()
+    user = flickr_api.Person.findByUrl(user_url)
+    logger.info(f"[PLAN] User: {user.username}")
+
+    probe = SizeProbe()
+
+    def plan(ps: flickr_api.Photoset) -> AlbumPlan:
+        return plan_album(ps.id, ps.title, probe, backup_dir)
+
+    album_nr = files = n_bytes = unknown = 0
+    try:
+        for ps, album_plan in _ordered_map(plan, Walker(user.getPhotosets), workers):
+            album_nr += 1
+            _log_album_plan(f"Album {album_nr}: '{ps.title}'", album_plan, verbose)
+            files += len(album_plan.files)
+            n_bytes += album_plan.n_bytes
+            unknown += album_plan.unknown
+    finally:
+        probe.close()
+    _log_plan_total(f"{files} file(s) to download in {album_nr} album(s)", n_bytes, unknown, backup_dir)
+
+
+def plan_single_album(album_id: str, backup_dir: Path | None = None) -> None:
+    """Report how many bytes downloading one album would fetch, file by file.
+
+    Args:
+        album_id: Flickr photoset/album ID.
+        backup_dir: Directory downloads run in; None to plan a download from scratch.
+    """
+    _load_flickr_api()
+    ps = flickr_api.Photoset(id=album_id)
+    ps.getInfo()
+    probe = SizeProbe()
+    try:
+        album_plan = plan_album(album_id, ps.title, probe, backup_dir)
+    finally:
+        probe.close()
+    _log_album_plan(f"Album: '{ps.title}' (ID: {album_id})", album_plan, verbose=True)
+    _log_plan_total(f"{len(album_plan.files)} file(s) to download", album_plan.n_bytes, album_plan.unknown, backup_dir)
+
+
 def main() -> None:
     """CLI entry point for download dry-run."""
     from flickrtoimmich import startup
@@ -94,15 +233,34 @@ def main() -> None:
     user_parser = sub.add_parser("user", help="List all albums for a user")
     user_parser.add_argument("url", help="Flickr user URL")
     user_parser.add_argument("-v", "--verbose", action="store_true", help="list individual photos per album")
+    user_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"albums listed concurrently with --verbose or --plan (default: {DEFAULT_WORKERS})",
+    )
 
     album_parser = sub.add_parser("album", help="List photos in an album")
     album_parser.add_argument("album_id", help="Flickr album/photoset ID")
 
+    for p in (user_parser, album_parser):
+        p.add_argument("--plan", action="store_true", help="measure the bytes a download would fetch and its ETA")
+        p.add_argument(
+            "--backup-dir",
+            type=Path,
+            help=f"download directory: --plan leaves out downloaded photos and reads {STATS_FILENAME} from it",
+        )
+
     args = parser.parse_args()
 
-    if args.mode == "user":
-        dry_run_user(args.url, verbose=args.verbose)
-    elif args.mode == "album":
+    if args.mode == "user" and args.plan:
+        plan_user(args.url, backup_dir=args.backup_dir, verbose=args.verbose, workers=args.workers)
+    elif args.mode == "user":
+        dry_run_user(args.url, verbose=args.verbose, workers=args.workers)
+    elif args.plan:
+        plan_single_album(args.album_id, backup_dir=args.backup_dir)
+    else:
         dry_run_album(args.album_id)
 
 
@@ -0,0 +1,158 @@
+"""Download planning: the bytes a download would fetch, measured per file without downloading it."""
+
+import sqlite3
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import flickr_api.auth as _auth
+import flickr_api.method_call as _mc
+import requests
+from flickr_api.flickrerrors import FlickrError
+from flickr_download.utils import get_dirname
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from flickrtoimmich.flickr_listing import PhotoRecord, iter_photoset_photos
+
+DEFAULT_PROBE_WORKERS = 16
+
+
+def downloaded_ids(backup_dir: Path, title: str) -> set[str]:
+    """Return the IDs of photos recorded in the ``.metadata.db`` of an album's backup directory.
+
+    Args:
+        backup_dir: Directory the downloads are run in.
+        title: Album title, mapped to its directory name the way flickr_download does.
+
+    Returns:
+        Photo IDs; empty if the album has not been downloaded with ``--metadata_store`` yet.
+    """
+    db = backup_dir / get_dirname(title) / ".metadata.db"
+    if not db.exists():
+        return set()
+    try:
+        with sqlite3.connect(db) as conn:
+            return {str(row[0]) for row in conn.execute("SELECT photo_id FROM downloads")}
+    except sqlite3.Error as ex:
+        logger.warning(f"Cannot read download records {db}: {ex}")
+        return set()
+
+
+def _largest_source(sizes: list[dict[str, Any]], media: str) -> str | None:
+    """Pick the URL flickr_download fetches from a ``getSizes`` answer: the original, else the largest size."""
+    if media == "video":
+        sizes = [s for s in sizes if s.get("media") == "video" and s.get("label") != "Video Player"]
+        for s in sizes:
+            if s.get("label") == "Video Original":
+                return str(s["source"])
+    if not sizes:
+        return None
+    largest = max(sizes, key=lambda s: int(s.get("width") or 0) * int(s.get("height") or 0))
+    return str(largest["source"])
+
+
+class SizeProbe:
+    """Finds the size in bytes of the file a download would fetch for a photo, using HTTP ``HEAD`` requests.
+
+    Photo originals are probed at the ``url_o`` returned by the listing. Videos and photos without an
+    accessible original cost one ``flickr.photos.getSizes`` call, which goes through the API pacing and
+    cache. ``HEAD`` requests to the static hosts do not count against the API quota. Sizes are remembered by
+    photo ID, so photos in several albums are probed once.
+
+    Args:
+        workers: Number of concurrent ``HEAD`` requests.
+        timeout: Connect and read timeout in seconds.
+    """
+
+    def __init__(self, workers: int = DEFAULT_PROBE_WORKERS, timeout: float = 30.0) -> None:
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="size-probe")
+        self._sizes: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Stop the probe threads and release the connection pool."""
+        self._pool.shutdown()
+        self.session.close()
+
+    def sizes(self, photos: Sequence[PhotoRecord]) -> list[int | None]:
+        """Return the download size of every photo, probing up to ``workers`` at once.
+
+        Args:
+            photos: Photos to measure.
+
+        Returns:
+            Sizes in bytes in the order of ``photos``; None where the size could not be determined.
+        """
+        return list(self._pool.map(self.size_of, photos))
+
+    def size_of(self, photo: PhotoRecord) -> int | None:
+        """Return the download size of one photo, or None if it cannot be determined."""
+        with self._lock:
+            if photo.id in self._sizes:
+                return self._sizes[photo.id]
+        url = photo.url_o if photo.media == "photo" else None
+        size = self._head(url) if url else None
+        if size is None:
+            try:
+                r = _mc.call_api(auth_handler=_auth.AUTH_HANDLER, method="flickr.photos.getSizes", photo_id=photo.id)
+                url = _largest_source(r["sizes"]["size"], photo.media)
+            except (FlickrError, KeyError) as ex:
+                logger.debug(f"No sizes for photo {photo.id}: {ex}")
+                url = None
+            size = self._head(url) if url else None
+        with self._lock:
+            self._sizes[photo.id] = size
+        return size
+
+    def _head(self, url: str) -> int | None:
+        """Return the ``Content-Length`` of ``url`` after redirects, or None on errors."""
+        try:
+            with self.session.head(url, allow_redirects=True, timeout=self.timeout) as r:
+                length = r.headers.get("Content-Length")
+                return int(length) if r.ok and length is not None else None
+        except (requests.RequestException, ValueError) as ex:
+            logger.debug(f"HEAD {url} failed: {ex}")
+            return None
+
+
+class AlbumPlan(NamedTuple):
+    """What downloading one album would transfer."""
+
+    files: list[tuple[PhotoRecord, int | None]]
+    already_downloaded: int
+
+    @property
+    def n_bytes(self) -> int:
+        """Total size of the files with a known size."""
+        return sum(size or 0 for _, size in self.files)
+
+    @property
+    def unknown(self) -> int:
+        """Number of files whose size could not be determined."""
+        return sum(1 for _, size in self.files if size is None)
+
+
+def plan_album(photoset_id: str, title: str, probe: SizeProbe, backup_dir: Path | None = None) -> AlbumPlan:
+    """Work out which files downloading an album would fetch and how large they are.
+
+    Args:
+        photoset_id: Flickr photoset ID.
+        title: Album title.
+        probe: Size probe shared by all albums.
+        backup_dir: Download directory; photos already recorded there are left out.
+
+    Returns:
+        The album's plan.
+    """
+    done = downloaded_ids(backup_dir, title) if backup_dir is not None else set()
+    photos = list(iter_photoset_photos(photoset_id))
+    todo = [p for p in photos if p.id not in done]
+    return AlbumPlan(list(zip(todo, probe.sizes(todo))), len(photos) - len(todo))
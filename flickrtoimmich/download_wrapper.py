@@ -1,7 +1,28 @@
 #!/usr/bin/env python3
-"""Wrapper for flickr_download that patches set_file_time for unknown dates."""
+"""Wrapper for flickr_download that skips unknown dates, paces and caches API calls, throttles and reports downloads."""
 
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import flickr_api.objects as _fo
 import flickr_download.utils as _u
+import requests
+from flickr_api.flickrerrors import FlickrError
+
+from flickrtoimmich import (
+    blob_store,
+    completion_log,
+    flickr_cache,
+    flickr_ratelimit,
+    metrics,
+    parallel_download,
+    ranged_download,
+    transfer_stats,
+)
+from flickrtoimmich.bandwidth import get_limiter
 
 _orig = _u.set_file_time
 
@@ -20,12 +41,111 @@ def _safe(fname: str, taken_str: str) -> None:
 
 _u.set_file_time = _safe
 
-from flickr_download.flick_download import main as _flickr_main
+
+# Shared by all photo downloads of the run, so connections to the static hosts are reused
+_session = requests.Session()
+
+
+def _throttled_save(self: _fo.Photo, filename: str, size_label: str | None = None, timeout: int = 10) -> str:
+    """Download a photo like ``flickr_api.objects.Photo.save``, streamed to disk through the bandwidth limiter.
+
+    The file is written as ``<name>.part`` and continued with a ``Range`` request where an earlier attempt
+    stopped (see :func:`flickrtoimmich.ranged_download.fetch`). A ``429`` answer is retried after the
+    ``Retry-After`` delay instead of failing the photo.
+
+    Args:
+        self: Photo to download.
+        filename: Target file name without extension.
+        size_label: Flickr size label (e.g. ``"Original"``); the largest available size if None.
+        timeout: Socket timeout in seconds.
+
+    Returns:
+        Name of the written file.
+    """
+    if size_label is None:
+        size_label = self._getLargestSizeLabel()
+    output_filename: str = self._getOutputFilename(filename, size_label)
+    url = self.getPhotoFile(size_label)
+    try:
+        flickr_ratelimit.retrying(
+            lambda: ranged_download.fetch(_session, url, output_filename, get_limiter(), timeout), output_filename
+        )
+    except (OSError, FlickrError):
+        metrics.FILES.inc(direction="download", result="failed")
+        raise
+    metrics.FILES.inc(direction="download", result="ok")
+    return output_filename
+
+
+_fo.Photo.save = _throttled_save
+
+flickr_ratelimit.install()
+
+
+def _init_response_cache(path: str) -> flickr_cache.ResponseCache | None:
+    """Replace flickr_download's pickled ``--cache`` with the persistent response cache in ``<path>.db``.
+
+    The SQLite file is written as responses arrive, so nothing is lost when a download is interrupted, and
+    it is shared with the dry-run and album listing tools.
+    """
+    return flickr_cache.install(default_path=f"{path}.db")
+
+
+def _save_response_cache(path: str, cache: object) -> bool:
+    """No-op stand-in for flickr_download's ``save_cache``; the response cache commits every entry."""
+    return True
+
+
+_u.init_cache = _init_response_cache
+_u.save_cache = _save_response_cache
+
+import flickr_download.flick_download as _fd
+
+# flick_download imported both functions by name, and its main() calls those module globals, so they are
+# replaced there as well; setattr because flick_download does not re-export them
+setattr(_fd, "init_cache", _init_response_cache)
+setattr(_fd, "save_cache", _save_response_cache)
+
+_orig_download_list = _fd.download_list
+
+
+def _download_list_and_report(pset: Any, photos_title: str, *args: Any, **kwargs: Any) -> None:
+    """Download a photo list like ``flickr_download``, then announce its directory in the completion log.
+
+    The log named by ``DOWNLOAD_DONE_LOG`` lets ``immich-uploader --follow`` upload the album while later
+    albums are still downloading.
+    """
+    _orig_download_list(pset, photos_title, *args, **kwargs)
+    completion_log.report_album_done(parallel_download.find_album_dir(photos_title))
+
+
+_fd.download_list = _download_list_and_report
 
 
 def main() -> None:
-    """Entry point for flickr-download-wrapper console script."""
-    _flickr_main()
+    """Entry point for flickr-download-wrapper console script.
+
+    Set and user downloads are run by the parallel downloader instead of flickr_download's serial loop when
+    ``DOWNLOAD_WORKERS`` is above 1, or ``INCREMENTAL_SYNC`` or ``BLOB_STORE`` is ``true``. The process exits
+    with the downloader's exit code, which is non-zero if the download could not start or a photo failed.
+    """
+    get_limiter().install_signal_handler()
+    metrics.start_from_env()
+    workers = int(os.environ.get(parallel_download.WORKERS_ENV) or 1)
+    incremental = os.environ.get(parallel_download.INCREMENTAL_ENV) == "true"
+    blobs = os.environ.get(blob_store.BLOB_STORE_ENV) == "true"
+    started = time.monotonic()
+    try:
+        if workers > 1 or incremental or blobs:
+            code = parallel_download.main(workers, incremental, blobs)
+        else:
+            code = _fd.main()
+    finally:
+        # Downloads run in the backup directory, where the download dry-run's --plan reads the throughput
+        transfer_stats.record_run(Path(transfer_stats.STATS_FILENAME), "download", started)
+        if done_log := os.environ.get(completion_log.DONE_LOG_ENV):
+            completion_log.mark_finished(Path(done_log))
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+"""Persistent on-disk cache of Flickr API responses with per-method TTLs and size-bounded LRU eviction.
+
+:class:`ResponseCache` implements the cache interface of ``flickr_api`` (``get``, ``set`` and ``in``), so
+:func:`install` makes every ``flickr_api`` call answer read-only methods from a shared SQLite file. Cache
+keys contain the API key and OAuth token, so several Flickr accounts can share one cache file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode
+
+import flickr_api
+import flickr_api.method_call as _mc
+import requests
+from loguru import logger
+
+from flickrtoimmich import metrics
+
+CACHE_ENV = "FLICKR_API_CACHE"
+MAX_MB_ENV = "FLICKR_API_CACHE_MAX_MB"
+CACHE_FILENAME = ".flickr_api_cache.db"
+DEFAULT_MAX_MB = 256
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+# Time to live (seconds) of read-only methods; other methods whose name starts with one of
+# READ_PREFIXES live for DEFAULT_TTL, everything else is never cached
+METHOD_TTLS: dict[str, float] = {
+    "flickr.people.findByUrl": 7 * DAY,
+    "flickr.people.findByUsername": 7 * DAY,
+    "flickr.people.findByEmail": 7 * DAY,
+    "flickr.urls.lookupUser": 7 * DAY,
+    "flickr.people.getInfo": DAY,
+    "flickr.photos.getInfo": DAY,
+    "flickr.photos.getSizes": DAY,
+    "flickr.photos.getExif": 7 * DAY,
+    "flickr.photosets.getList": HOUR,
+    "flickr.photosets.getInfo": HOUR,
+    "flickr.photosets.getPhotos": HOUR,
+}
+DEFAULT_TTL = HOUR
+# Search methods are left out: the incremental sync finds new uploads with photos.search, which would
+# miss photos uploaded while a cached answer is reused
+READ_PREFIXES = ("get", "find", "lookup")
+
+# After eviction the cache is trimmed to this fraction of its size limit, so not every insert evicts
+_LOW_WATER = 0.9
+
+
+def method_ttl(method: str, ttls: Mapping[str, float] = METHOD_TTLS) -> float:
+    """Return how long a response of ``method`` may be reused.
+
+    Args:
+        method: Flickr API method name, e.g. ``flickr.photosets.getList``.
+        ttls: Per-method overrides.
+
+    Returns:
+        Time to live in seconds; 0 for methods that change data and must always reach Flickr.
+    """
+    if method in ttls:
+        return ttls[method]
+    if method.startswith("flickr.auth.") or method.startswith("flickr.test."):
+        return 0.0
+    return DEFAULT_TTL if method.rsplit(".", 1)[-1].startswith(READ_PREFIXES) else 0.0
+
+
+def _is_ok(resp: requests.Response) -> bool:
+    """Check that ``resp`` is a successful JSON API answer worth caching."""
+    if resp.status_code != 200:
+        return False
+    try:
+        return bool(json.loads(resp.content).get("stat") == "ok")
+    except (ValueError, AttributeError):
+        return False
+
+
+class ResponseCache:
+    """SQLite-backed response cache for ``flickr_api``.
+
+    Entries expire after the TTL of their API method (see :func:`method_ttl`). Once the stored responses
+    exceed ``max_bytes``, expired entries and then the least recently used ones are deleted. Only
+    successful answers of read-only methods are stored; errors and rate-limit responses always go to Flickr
+    again. The database may be shared by several processes.
+
+    Args:
+        db_path: SQLite database file (created if missing).
+        max_bytes: Upper bound for the total size of stored response bodies.
+        ttls: Per-method time to live overrides.
+    """
+
+    def __init__(
+        self, db_path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, ttls: Mapping[str, float] = METHOD_TTLS
+    ) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, method TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @classmethod
+    def from_env(cls, default_path: str | None = None) -> "ResponseCache | None":
+        """Open the cache named by ``FLICKR_API_CACHE``, limited to ``FLICKR_API_CACHE_MAX_MB`` megabytes.
+
+        Args:
+            default_path: File used when ``FLICKR_API_CACHE`` is unset; ``~/.flickr_api_cache.db`` if None.
+
+        Returns:
+            The cache, or None if ``FLICKR_API_CACHE_MAX_MB`` is 0.
+        """
+        max_mb = float(os.environ.get(MAX_MB_ENV) or DEFAULT_MAX_MB)
+        if max_mb <= 0:
+            return None
+        home = os.environ.get("HOME", os.path.expanduser("~"))
+        path = os.environ.get(CACHE_ENV) or default_path or os.path.join(home, CACHE_FILENAME)
+        return cls(Path(path), int(max_mb * 1024 * 1024))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str, default: requests.Response | None = None) -> requests.Response | None:
+        """Return the cached response for ``key`` and mark it as recently used.
+
+        Args:
+            key: ``flickr_api`` cache key (URL-encoded call arguments).
+            default: Returned on a miss.
+
+        Returns:
+            A response rebuilt from the stored body, or ``default`` if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        if row is None:
+            metrics.FLICKR_API_CACHE.inc(result="miss")
+            return default
+        metrics.FLICKR_API_CACHE.inc(result="hit")
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = row[0]
+        resp.encoding = "utf-8"
+        return resp
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def set(self, key: str, value: requests.Response) -> None:
+        """Store ``value`` if it is a successful answer of a cacheable method.
+
+        Args:
+            key: ``flickr_api`` cache key (URL-encoded call arguments).
+            value: Response returned by Flickr.
+        """
+        method = parse_qs(key).get("method", [""])[0]
+        ttl = method_ttl(method, self.ttls)
+        if ttl <= 0 or not _is_ok(value):
+            return
+        body = value.content
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, body, len(body), now + ttl, now),
+            )
+            self._conn.commit()
+            self._bytes += len(body)
+            if self._bytes > self.max_bytes:
+                self._evict(now)
+
+    def forget(self, param: str, values: Iterable[str]) -> int:
+        """Delete the cached responses of calls made with ``param`` set to one of ``values``.
+
+        Args:
+            param: Call argument, e.g. ``photo_id``.
+            values: Argument values whose responses are outdated.
+
+        Returns:
+            Number of deleted entries.
+        """
+        deleted = 0
+        with self._lock:
+            for value in values:
+                arg = urlencode({param: value})
+                cur = self._conn.execute(
+                    "DELETE FROM responses WHERE '&' || key || '&' LIKE ? ESCAPE '\\'", (f"%&{_like(arg)}&%",)
+                )
+                deleted += cur.rowcount
+            self._conn.commit()
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return deleted
+
+    def _evict(self, now: float) -> None:
+        """Delete expired entries, then least recently used ones, until below the low-water mark; needs the lock."""
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        # Other processes sharing the file may have added or removed entries, so the size is recounted
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * _LOW_WATER
+        evicted = 0
+        if self._bytes > target:
+            stale = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                if self._bytes <= target:
+                    break
+                stale.append((key,))
+                self._bytes -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            evicted = len(stale)
+        self._conn.commit()
+        logger.debug(f"Flickr API cache trimmed to {self._bytes} bytes ({evicted} least recently used evicted)")
+
+
+def _like(text: str) -> str:
+    """Escape the LIKE wildcards in ``text``."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def forget(param: str, values: Iterable[str]) -> None:
+    """Drop outdated responses from the cache enabled by :func:`install`, if any (see :meth:`ResponseCache.forget`)."""
+    if isinstance(_mc.CACHE, ResponseCache):
+        _mc.CACHE.forget(param, values)
+
+
+def install(default_path: str | None = None) -> ResponseCache | None:
+    """Answer ``flickr_api`` calls from the cache configured in the environment (see :meth:`ResponseCache.from_env`).
+
+    Args:
+        default_path: Cache file used when ``FLICKR_API_CACHE`` is unset.
+
+    Returns:
+        The installed cache, or None if caching is disabled.
+    """
+    cache = ResponseCache.from_env(default_path)
+    if cache is not None:
+        flickr_api.enable_cache(cache)
+    return cache
@@ -0,0 +1,145 @@
+"""Bulk photo listing: whole pages of photos with the needed extras in one API call each."""
+
+from collections.abc import Iterator
+from typing import Any, NamedTuple
+
+import flickr_api.auth as _auth
+import flickr_api.method_call as _mc
+
+# Largest page size flickr.photosets.getPhotos accepts
+PER_PAGE = 500
+EXTRAS = ("media", "date_taken", "last_update", "url_o", "o_dims")
+
+
+def _int(value: Any) -> int | None:
+    """Convert a numeric API field (often sent as a string) to int; None if absent or empty."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PhotoRecord(NamedTuple):
+    """One photo or video of a listing, built from the fields of a ``getPhotos`` page.
+
+    ``width`` and ``height`` are the original's dimensions and ``url_o`` its download URL; all three are
+    None when Flickr does not expose the original (e.g. for other users' photos with downloads disabled).
+    """
+
+    id: str
+    title: str
+    media: str
+    date_taken: str
+    last_update: int
+    url_o: str | None
+    width: int | None
+    height: int | None
+
+    @classmethod
+    def from_api(cls, p: dict[str, Any]) -> "PhotoRecord":
+        """Build a record from one entry of the ``photo`` list of an API response."""
+        return cls(
+            id=str(p["id"]),
+            title=str(p.get("title") or ""),
+            media=p.get("media") or "photo",
+            date_taken=p.get("datetaken") or "",
+            last_update=_int(p.get("lastupdate")) or 0,
+            url_o=p.get("url_o") or None,
+            width=_int(p.get("width_o") or p.get("o_width")),
+            height=_int(p.get("height_o") or p.get("o_height")),
+        )
+
+
+def _iter_pages(method: str, container: str, per_page: int = PER_PAGE, **args: str) -> Iterator[dict[str, Any]]:
+    """Yield the entries of all pages of a paginated photo list method.
+
+    The calls go through ``flickr_api`` with the configured OAuth token, so private photos are included and the
+    calls are paced, retried and cached like any other call.
+
+    Args:
+        method: Flickr API method name.
+        container: Key of the response object holding ``photo``, ``page`` and ``pages``.
+        per_page: Photos per request (at most 500).
+        args: Further method arguments.
+
+    Yields:
+        Raw photo entries in listing order.
+    """
+    page, pages = 1, 1
+    while page <= pages:
+        r = _mc.call_api(
+            auth_handler=_auth.AUTH_HANDLER,
+            method=method,
+            extras=",".join(EXTRAS),
+            per_page=str(per_page),
+            page=str(page),
+            **args,
+        )
+        listing = r[container]
+        pages = int(listing.get("pages") or 1)
+        yield from listing.get("photo") or []
+        page += 1
+
+
+def iter_photoset_photos(photoset_id: str, per_page: int = PER_PAGE) -> Iterator[PhotoRecord]:
+    """Yield all photos of a photoset, fetching ``per_page`` photos with their extras per API call.
+
+    Args:
+        photoset_id: Flickr photoset ID.
+        per_page: Photos per request (at most 500).
+
+    Yields:
+        Photos in album order.
+    """
+    for p in _iter_pages("flickr.photosets.getPhotos", "photoset", per_page, photoset_id=photoset_id):
+        yield PhotoRecord.from_api(p)
+
+
+def iter_uploaded_since(user_id: str, min_upload_date: int) -> Iterator[PhotoRecord]:
+    """Yield the photos ``user_id`` uploaded at or after ``min_upload_date``.
+
+    Args:
+        user_id: Flickr NSID of the owner.
+        min_upload_date: Unix timestamp.
+
+    Yields:
+        Matching photos, newest first.
+    """
+    for p in _iter_pages(
+        "flickr.photos.search", "photos", user_id=user_id, min_upload_date=str(min_upload_date), sort="date-posted-desc"
+    ):
+        yield PhotoRecord.from_api(p)
+
+
+def iter_recently_updated(min_date: int, owner: str | None = None) -> Iterator[PhotoRecord]:
+    """Yield the photos of the authenticated user that were changed at or after ``min_date``.
+
+    ``flickr.photos.recentlyUpdated`` only covers the calling user's own photos (new uploads, edited metadata,
+    replaced files), so entries of any other ``owner`` are dropped.
+
+    Args:
+        min_date: Unix timestamp.
+        owner: Flickr NSID the photos must belong to, or None to keep all.
+
+    Yields:
+        Changed photos.
+    """
+    for p in _iter_pages("flickr.photos.recentlyUpdated", "photos", min_date=str(min_date)):
+        if owner is None or p.get("owner") in (None, owner):
+            yield PhotoRecord.from_api(p)
+
+
+def photo_album_ids(photo_id: str) -> list[str]:
+    """Return the IDs of the photosets a photo belongs to (one ``flickr.photos.getAllContexts`` call).
+
+    Args:
+        photo_id: Flickr photo ID.
+
+    Returns:
+        Photoset IDs.
+    """
+    r = _mc.call_api(auth_handler=_auth.AUTH_HANDLER, method="flickr.photos.getAllContexts", photo_id=photo_id)
+    sets = r.get("set") or []
+    if isinstance(sets, dict):
+        sets = [sets]
+    return [str(s["id"]) for s in sets]
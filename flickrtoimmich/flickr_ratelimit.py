@@ -0,0 +1,194 @@
+"""In-process pacing of Flickr API calls and ``Retry-After`` handling for rate-limited requests.
+
+:func:`install` patches ``flickr_api`` so that every API request that is not answered from the cache first
+draws from a shared :class:`CallPacer`, and a call answered with ``429 Too Many Requests`` is retried after
+the server's ``Retry-After`` delay. Only the affected call waits; other threads keep going.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from functools import wraps
+from typing import Any, TypeVar
+
+import flickr_api.api as _api
+import flickr_api.method_call as _mc
+import requests
+from flickr_api.flickrerrors import FlickrError
+from loguru import logger
+
+from flickrtoimmich import metrics
+
+T = TypeVar("T")
+
+RATE_ENV = "FLICKR_API_RATE"
+DEFAULT_CALLS_PER_HOUR = 3600
+
+MAX_RETRIES = 5
+
+
+class RateLimited(FlickrError):  # type: ignore[misc]
+    """A Flickr request was answered with HTTP 429.
+
+    The message contains ``HTTP Error 429`` like urllib's, which the rate-limit backoff in
+    ``flickr-docker.sh`` watches for once all retries are exhausted.
+
+    Args:
+        retry_after: Delay in seconds requested by the server, or None.
+    """
+
+    def __init__(self, retry_after: float | None = None) -> None:
+        super().__init__("HTTP Error 429: Too Many Requests")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds of a ``Retry-After`` header (delta seconds or HTTP date).
+
+    Args:
+        value: Header value, or None if absent.
+
+    Returns:
+        Non-negative delay, or None if the header is absent or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, retry_after: float | None) -> float:
+    """Return the wait before retry ``attempt``: the server's delay, else the linear backoff of the shell wrapper."""
+    if retry_after is not None:
+        return retry_after
+    base = float(os.environ.get("BACKOFF_BASE") or 60)
+    return min(base * attempt, float(os.environ.get("BACKOFF_MAX") or 600))
+
+
+def _max_retries() -> int:
+    """Return the number of retries; none with ``BACKOFF_EXIT_ON_429=true`` so the run stops at the first 429."""
+    return 0 if os.environ.get("BACKOFF_EXIT_ON_429") == "true" else MAX_RETRIES
+
+
+def retrying(func: Callable[[], T], what: str, max_retries: int | None = None) -> T:
+    """Call ``func`` and retry it after a delay while it raises :class:`RateLimited`.
+
+    Args:
+        func: Request to perform.
+        what: Description of the request for log messages.
+        max_retries: Retries before :class:`RateLimited` is re-raised; see :func:`_max_retries` if None.
+
+    Returns:
+        The result of ``func``.
+
+    Raises:
+        RateLimited: If the request is still rate-limited after all retries.
+    """
+    if max_retries is None:
+        max_retries = _max_retries()
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except RateLimited as ex:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = _backoff_delay(attempt, ex.retry_after)
+            logger.warning(f"Flickr rate limit on {what} (#{attempt}), retrying in {delay:.0f}s")
+            metrics.BACKOFF_SECONDS.inc(delay, reason="retry_after")
+            time.sleep(delay)
+
+
+class CallPacer:
+    """Thread-safe pacing of calls to a quota of ``calls_per_hour``.
+
+    Up to ``burst`` calls may start back to back after an idle period; after that calls are spaced evenly.
+
+    Args:
+        calls_per_hour: Sustained call rate; 0 disables pacing.
+        burst: Number of calls that may start at once; defaults to one minute worth of calls.
+    """
+
+    def __init__(self, calls_per_hour: float = DEFAULT_CALLS_PER_HOUR, burst: int | None = None) -> None:
+        self.rate = calls_per_hour / 3600
+        self.burst = max(burst or int(calls_per_hour / 60), 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CallPacer":
+        """Create a pacer for ``FLICKR_API_RATE`` calls per hour (default: Flickr's quota of 3600)."""
+        return cls(float(os.environ.get(RATE_ENV) or DEFAULT_CALLS_PER_HOUR))
+
+    def acquire(self) -> None:
+        """Block until the next call may start."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            metrics.BACKOFF_SECONDS.inc(delay, reason="flickr_quota")
+            time.sleep(delay)
+
+
+class _PacedRequests:
+    """Stand-in for the ``requests`` module inside ``flickr_api.method_call``."""
+
+    def __init__(self, pacer: CallPacer) -> None:
+        self._pacer = pacer
+
+    def post(self, url: str, data: Any = None, **kwargs: Any) -> requests.Response:
+        """Send an API request once the pacer allows it; raise :class:`RateLimited` on HTTP 429."""
+        self._pacer.acquire()
+        resp = requests.post(url, data, **kwargs)
+        if resp.status_code == 429:
+            metrics.RATE_LIMITED.inc(service="flickr")
+            raise RateLimited(parse_retry_after(resp.headers.get("Retry-After")))
+        return resp
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(requests, name)
+
+
+def _retrying_call_api(call_api: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap ``flickr_api``'s ``call_api`` so that rate-limited calls are signed and sent again after a delay."""
+
+    @wraps(call_api)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return retrying(lambda: call_api(*args, **kwargs), str(kwargs.get("method", "API call")))
+
+    wrapper._flickrtoimmich_retrying = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def install(pacer: CallPacer | None = None) -> CallPacer:
+    """Pace and retry all Flickr API calls made through ``flickr_api``. Calling it again only replaces the pacer.
+
+    Args:
+        pacer: Pacer to use; configured from the environment if None.
+
+    Returns:
+        The installed pacer.
+    """
+    pacer = pacer or CallPacer.from_env()
+    _mc.requests = _PacedRequests(pacer)
+    for module in (_mc, _api):
+        if not getattr(module.call_api, "_flickrtoimmich_retrying", False):
+            module.call_api = _retrying_call_api(module.call_api)
+    return pacer
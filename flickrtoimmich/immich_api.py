@@ -0,0 +1,264 @@
+"""Minimal Immich REST API client used by the native upload engine."""
+
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from flickrtoimmich import metrics
+from flickrtoimmich.bandwidth import TokenBucket
+from flickrtoimmich.multipart import MultipartFileBody
+
+DEVICE_ID = "flickrtoimmich"
+
+
+class ImmichAPIError(RuntimeError):
+    """Raised when the Immich server rejects a request or returns an unexpected response."""
+
+
+def _normalize_base_url(url: str) -> str:
+    """Return the API base URL (``.../api``) for an Immich instance URL.
+
+    Args:
+        url: Instance URL as configured for the ``immich`` CLI, with or without ``/api`` suffix.
+
+    Returns:
+        URL ending in ``/api`` without a trailing slash.
+    """
+    url = url.rstrip("/")
+    return url if url.endswith("/api") else f"{url}/api"
+
+
+def _iso_timestamp(ts: float) -> str:
+    """Format a POSIX timestamp as an ISO-8601 UTC string accepted by Immich.
+
+    Args:
+        ts: Seconds since the epoch.
+
+    Returns:
+        ISO-8601 timestamp such as ``"2024-01-15T12:30:00.000Z"``.
+    """
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class ImmichClient:
+    """Immich REST API client sharing one pooled keep-alive HTTP session.
+
+    Args:
+        base_url: Immich instance URL (``/api`` is appended if missing).
+        api_key: Immich API key sent as ``x-api-key`` header.
+        pool_size: Maximum number of pooled connections to the server.
+        timeout: Per-request timeout in seconds.
+        limiter: Bandwidth limiter that asset uploads draw from, or None for no limit.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        pool_size: int = 10,
+        timeout: float = 300.0,
+        limiter: TokenBucket | None = None,
+    ) -> None:
+        self.base_url = _normalize_base_url(base_url)
+        self.timeout = timeout
+        self.limiter = limiter
+        self.session = requests.Session()
+        self.session.headers.update({"x-api-key": api_key, "Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._albums: dict[str, str] = {}
+        self._albums_fetched = False
+        self._albums_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, pool_size: int = 10, limiter: TokenBucket | None = None) -> "ImmichClient":
+        """Create a client from ``IMMICH_INSTANCE_URL`` and ``IMMICH_API_KEY``.
+
+        Args:
+            pool_size: Maximum number of pooled connections to the server.
+            limiter: Bandwidth limiter that asset uploads draw from, or None for no limit.
+
+        Returns:
+            Configured client.
+
+        Raises:
+            ImmichAPIError: If one of the environment variables is not set.
+        """
+        url = os.environ.get("IMMICH_INSTANCE_URL")
+        api_key = os.environ.get("IMMICH_API_KEY")
+        if not url or not api_key:
+            raise ImmichAPIError("IMMICH_INSTANCE_URL and IMMICH_API_KEY must be set for the native upload engine")
+        return cls(url, api_key, pool_size=pool_size, limiter=limiter)
+
+    def close(self) -> None:
+        """Close the underlying HTTP session and its pooled connections."""
+        self.session.close()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        """Send a request to the Immich API and return the decoded JSON body.
+
+        Args:
+            method: HTTP method.
+            path: API path relative to the base URL (e.g. ``"/albums"``).
+            **kwargs: Additional arguments passed to :meth:`requests.Session.request`.
+
+        Returns:
+            Decoded JSON body, or ``None`` for empty responses.
+
+        Raises:
+            ImmichAPIError: On transport errors or non-2xx status codes.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            resp = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as ex:
+            raise ImmichAPIError(f"{method} {path} failed: {ex}") from ex
+        if resp.status_code == 429:
+            metrics.RATE_LIMITED.inc(service="immich")
+        if not resp.ok:
+            raise ImmichAPIError(f"{method} {path} returned HTTP {resp.status_code}: {resp.text[:500]}")
+        return resp.json() if resp.content else None
+
+    def bulk_upload_check(self, checksums: dict[str, str]) -> dict[str, dict[str, Any]]:
+        """Ask Immich which checksums are already present before transferring any bytes.
+
+        Args:
+            checksums: Mapping of caller-chosen ID to hex SHA-1 checksum.
+
+        Returns:
+            Mapping of ID to the server result, with ``action`` (``"accept"`` or ``"reject"``), and for
+            rejected duplicates ``reason`` and ``assetId``.
+        """
+        if not checksums:
+            return {}
+        body = {"assets": [{"id": i, "checksum": c} for i, c in checksums.items()]}
+        results = self._request("POST", "/assets/bulk-upload-check", json=body)["results"]
+        return {r["id"]: r for r in results}
+
+    def upload_asset(self, path: Path, checksum: str | None = None) -> dict[str, Any]:
+        """Upload a single file as a new asset, streaming it from disk in fixed-size chunks.
+
+        Args:
+            path: File to upload.
+            checksum: Hex SHA-1 of the file; sent as ``x-immich-checksum`` so the server can reject
+                duplicates early.
+
+        Returns:
+            Response body with ``id`` and ``status`` (``"created"`` or ``"duplicate"``).
+        """
+        stat = path.stat()
+        data = {
+            "deviceAssetId": f"{path.name}-{stat.st_size}".replace(" ", ""),
+            "deviceId": DEVICE_ID,
+            "fileCreatedAt": _iso_timestamp(stat.st_mtime),
+            "fileModifiedAt": _iso_timestamp(stat.st_mtime),
+            "filename": path.name,
+        }
+        with MultipartFileBody(data, "assetData", path, limiter=self.limiter) as body:
+            headers = {"Content-Type": body.content_type}
+            if checksum:
+                headers["x-immich-checksum"] = checksum
+            result: dict[str, Any] = self._request("POST", "/assets", data=body, headers=headers)
+        metrics.BYTES.inc(stat.st_size, direction="upload")
+        return result
+
+    def prime_albums(self, albums: dict[str, str]) -> None:
+        """Seed the album name-to-ID cache, e.g. from IDs persisted by a previous run.
+
+        Args:
+            albums: Mapping of album name to Immich album ID.
+        """
+        with self._albums_lock:
+            for name, album_id in albums.items():
+                self._albums.setdefault(name, album_id)
+
+    def forget_album(self, name: str) -> None:
+        """Drop a cached album ID that turned out to be stale; the next lookup re-fetches the album list.
+
+        Args:
+            name: Album name.
+        """
+        with self._albums_lock:
+            self._albums.pop(name, None)
+            self._albums_fetched = False
+
+    def get_or_create_album(self, name: str) -> str:
+        """Return the ID of the album called ``name``, creating it if necessary.
+
+        Cached IDs are returned without contacting the server; otherwise the album list is fetched once per
+        client and kept in memory. Safe to call from several upload workers; an album is only created once.
+
+        Args:
+            name: Album name.
+
+        Returns:
+            Immich album ID.
+        """
+        with self._albums_lock:
+            album_id = self._albums.get(name)
+            if album_id is None and not self._albums_fetched:
+                self._albums.update({a["albumName"]: a["id"] for a in self._request("GET", "/albums")})
+                self._albums_fetched = True
+                album_id = self._albums.get(name)
+            if album_id is None:
+                album_id = str(self._request("POST", "/albums", json={"albumName": name})["id"])
+                logger.info(f"Created Immich album '{name}' ({album_id})")
+                self._albums[name] = album_id
+            return album_id
+
+    def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> None:
+        """Attach assets to an album in a single call.
+
+        Assets that are already part of the album are reported as ``duplicate`` by Immich and ignored here.
+
+        Args:
+            album_id: Immich album ID.
+            asset_ids: Asset IDs to add.
+        """
+        if not asset_ids:
+            return
+        results = self._request("PUT", f"/albums/{album_id}/assets", json={"ids": asset_ids}) or []
+        for r in results:
+            if not r.get("success") and r.get("error") != "duplicate":
+                logger.warning(f"Could not add asset {r.get('id')} to album {album_id}: {r.get('error')}")
+
+    def update_assets(self, asset_ids: list[str], **fields: Any) -> None:
+        """Set the same field values on many assets in a single call.
+
+        Args:
+            asset_ids: Asset IDs to update.
+            **fields: Fields accepted by Immich's bulk asset update (e.g. ``description``, ``latitude``,
+                ``longitude``).
+        """
+        if asset_ids:
+            self._request("PUT", "/assets", json={"ids": asset_ids, **fields})
+
+    def upsert_tags(self, names: list[str]) -> dict[str, str]:
+        """Create any missing tags and return the IDs of all of them.
+
+        Args:
+            names: Tag names (``/`` separates hierarchy levels in Immich).
+
+        Returns:
+            Mapping of tag name to Immich tag ID.
+        """
+        if not names:
+            return {}
+        return {t["value"]: t["id"] for t in self._request("PUT", "/tags", json={"tags": names})}
+
+    def tag_assets(self, tag_ids: list[str], asset_ids: list[str]) -> None:
+        """Attach every tag in ``tag_ids`` to every asset in ``asset_ids`` in a single call.
+
+        Args:
+            tag_ids: Immich tag IDs.
+            asset_ids: Asset IDs to tag.
+        """
+        if tag_ids and asset_ids:
+            self._request("PUT", "/tags/assets", json={"tagIds": tag_ids, "assetIds": asset_ids})
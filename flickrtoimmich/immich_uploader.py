@@ -1,81 +1,501 @@
 #!/usr/bin/env python3
-"""Batched Immich uploader with streaming output."""
+"""Batched Immich uploader with streaming discovery."""
 
 import argparse
 import os
-import subprocess
+import sqlite3
 import sys
 import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import IO
+from typing import Iterator, NamedTuple
 
 from loguru import logger
 
+from flickrtoimmich import metrics
+from flickrtoimmich.bandwidth import get_limiter, parse_size
+from flickrtoimmich.checksums import compute_checksums
+from flickrtoimmich.cli_output import CliEvent, CliResult, get_multiplexer, parse_line
+from flickrtoimmich.immich_api import ImmichAPIError, ImmichClient
+from flickrtoimmich.scan_index import SCAN_INDEX_FILENAME, ScanIndex
+from flickrtoimmich.scanner import ScannedFile, iter_albums, iter_completed_albums, prefetch
+from flickrtoimmich.sidecar_metadata import sync_metadata
+from flickrtoimmich.transfer_stats import STATS_FILENAME, TransferStats, fmt_size, record_run
+from flickrtoimmich.upload_ledger import LEDGER_FILENAME, UploadLedger
+
+QUARANTINE_FILENAME = ".immich_upload_quarantine.tsv"
+# Asset IDs of uploaded contents kept for reuse by later batches (about 100 bytes each)
+RECENT_ASSETS = 10_000
+
+
+class Quarantine:
+    """Files that could not be uploaded, collected from all upload workers for a report at the end of a run."""
+
+    def __init__(self) -> None:
+        self.entries: list[tuple[Path, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, path: Path, reason: str) -> None:
+        """Record a file that failed to upload.
+
+        Args:
+            path: File that failed.
+            reason: Short description of the failure.
+        """
+        with self._lock:
+            self.entries.append((path, reason))
+
+    def write(self, report_path: Path) -> None:
+        """Write the report as ``path<TAB>reason`` lines, or remove a stale report if nothing failed.
+
+        Args:
+            report_path: Report file to (over)write.
+        """
+        if not self.entries:
+            report_path.unlink(missing_ok=True)
+            return
+        with report_path.open("w", encoding="utf-8") as fh:
+            for path, reason in sorted(self.entries):
+                fh.write(f"{path}\t{' '.join(reason.split())}\n")
+
+
+class AlbumAttacher:
+    """Collects uploaded assets per album and attaches them with bulk add calls.
+
+    Assets are buffered until an album has ``flush_every`` of them or :meth:`flush` is called for it, so a
+    large album costs a handful of add calls instead of one per batch. Files are recorded in the ledger only
+    once they are attached. Album IDs are seeded from the ledger and newly resolved IDs are persisted there,
+    so later runs resolve albums without listing them on the server. Thread-safe.
 
-def stream_pipe(pipe: IO[str], target: IO[str]) -> None:
-    """Stream lines from a subprocess pipe to a target file object.
+    Args:
+        client: Immich API client.
+        ledger: Upload ledger to record attached files and album IDs in, or None.
+        flush_every: Number of buffered assets that triggers an add call for an album.
+    """
+
+    def __init__(self, client: ImmichClient, ledger: UploadLedger | None = None, flush_every: int = 1000) -> None:
+        self.client = client
+        self.ledger = ledger
+        self.flush_every = flush_every
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[tuple[Path, str | None]]] = {}
+        self._known = ledger.album_ids() if ledger is not None else {}
+        # Persisted IDs not yet confirmed by the server during this run
+        self._unverified = set(self._known)
+        client.prime_albums(self._known)
+
+    def add(self, album: str, entries: list[tuple[Path, str | None]]) -> bool:
+        """Buffer uploaded assets for ``album`` and flush it once enough have accumulated.
+
+        Args:
+            album: Album name.
+            entries: ``(path, asset_id)`` pairs.
+
+        Returns:
+            False if a triggered flush failed, True otherwise.
+        """
+        with self._lock:
+            buf = self._pending.setdefault(album, [])
+            buf.extend(entries)
+            full = len(buf) >= self.flush_every
+        return self.flush(album) if full else True
+
+    def flush(self, album: str) -> bool:
+        """Attach all buffered assets of ``album`` in a single call.
+
+        Args:
+            album: Album name.
+
+        Returns:
+            True if the assets were attached (or nothing was buffered), False otherwise.
+        """
+        with self._lock:
+            entries = self._pending.pop(album, [])
+        if not entries:
+            return True
+        asset_ids = [str(a) for _, a in entries]
+        try:
+            try:
+                self.client.add_assets_to_album(self._resolve(album), asset_ids)
+            except ImmichAPIError:
+                if album not in self._unverified:
+                    raise
+                # The persisted ID may belong to an album deleted in Immich since the last run
+                logger.warning(f"Cached ID of album '{album}' rejected, resolving it again")
+                self._unverified.discard(album)
+                self.client.forget_album(album)
+                self.client.add_assets_to_album(self._resolve(album), asset_ids)
+        except ImmichAPIError as ex:
+            logger.error(f"Adding {len(entries)} asset(s) to album '{album}' failed: {ex}")
+            with self._lock:
+                self.failed += len(entries)
+            return False
+        self._unverified.discard(album)
+        if self.ledger is not None:
+            self.ledger.record(entries)
+        return True
+
+    def flush_idle(self, active: set[str]) -> bool:
+        """Flush every album with buffered assets that is not in ``active``.
+
+        Args:
+            active: Albums that may still receive assets.
+
+        Returns:
+            True if all flushes succeeded.
+        """
+        with self._lock:
+            idle = [a for a in self._pending if a not in active]
+        return all([self.flush(a) for a in idle])
+
+    def _resolve(self, album: str) -> str:
+        """Return the ID of ``album`` (creating it if needed) and persist it if it is new."""
+        album_id = self.client.get_or_create_album(album)
+        with self._lock:
+            changed = self._known.get(album) != album_id
+            self._known[album] = album_id
+        if changed and self.ledger is not None:
+            self.ledger.record_album(album, album_id)
+        return album_id
+
+
+class AssetRegistry:
+    """Immich asset IDs of the contents uploaded during this run, keyed by SHA-1.
+
+    The same photo is often filed in several album directories. The first batch that meets a checksum
+    claims it and uploads the file; every later batch, on any worker and in any album, attaches the
+    resulting asset without another duplicate check or upload. A batch that meets a checksum still being
+    uploaded by another worker waits for that upload. To rule out deadlocks, batches only wait after they
+    have resolved all of their own claims. Thread-safe.
+
+    Only in-flight claims and the ``max_recent`` most recently used asset IDs are kept, so memory does not
+    grow with the library. Content met again after its ID was dropped is claimed anew, and the server's
+    duplicate check then returns the existing asset without sending the file.
 
     Args:
-        pipe: Readable pipe from a subprocess (stdout or stderr).
-        target: Writable file object to forward lines to.
+        max_recent: Number of resolved asset IDs kept for reuse.
     """
-    for line in pipe:
-        target.write(line)
-    pipe.close()
 
+    def __init__(self, max_recent: int = RECENT_ASSETS) -> None:
+        self._pending: dict[str, Future[str | None]] = {}
+        self._recent: OrderedDict[str, str] = OrderedDict()
+        self._max_recent = max_recent
+        self._lock = threading.Lock()
+
+    def claim(self, checksum: str) -> "Future[str | None] | None":
+        """Claim the upload of ``checksum`` unless another file with that content was claimed before.
+
+        Args:
+            checksum: Hex SHA-1 of the file content.
+
+        Returns:
+            None if the caller now owns the upload and must :meth:`resolve` it, otherwise a future of the
+            owner's asset ID (None if the owner's upload failed).
+        """
+        with self._lock:
+            asset_id = self._recent.get(checksum)
+            if asset_id is not None:
+                self._recent.move_to_end(checksum)
+                done: Future[str | None] = Future()
+                done.set_result(asset_id)
+                return done
+            fut = self._pending.get(checksum)
+            if fut is not None:
+                return fut
+            self._pending[checksum] = Future()
+        return None
+
+    def resolve(self, checksum: str, asset_id: str | None) -> None:
+        """Publish the outcome of a claimed upload; after a failure the checksum can be claimed again.
+
+        Args:
+            checksum: Claimed checksum.
+            asset_id: Immich asset ID, or None if the upload failed.
+        """
+        with self._lock:
+            fut = self._pending.pop(checksum)
+            if asset_id is not None:
+                self._recent[checksum] = asset_id
+                if len(self._recent) > self._max_recent:
+                    self._recent.popitem(last=False)
+        fut.set_result(asset_id)
+
+
+def upload_batch(
+    files: list[Path],
+    album: str,
+    client: ImmichClient | None = None,
+    ledger: UploadLedger | None = None,
+    attacher: AlbumAttacher | None = None,
+    quarantine: Quarantine | None = None,
+    assets: AssetRegistry | None = None,
+) -> bool:
+    """Upload a batch of files to Immich.
+
+    With a ``client`` the files are sent through the in-process REST engine; without one the ``immich``
+    CLI is spawned and its output parsed into per-file results.
+
+    Files the CLI reports as failed are added to ``quarantine`` and the rest of the batch is recorded as
+    uploaded. When the CLI fails without naming the failing files, or reports a failure that cannot be tied
+    to a file of the batch, the batch is split in half and each half retried until they are isolated.
 
-def upload_batch(files: list[Path], album: str) -> bool:
-    """Upload a batch of files to Immich via the CLI, streaming output in real time.
+    Args:
+        files: List of file paths to upload.
+        album: Name of the Immich album to upload into.
+        client: Immich API client for the native engine, or None to use the CLI.
+        ledger: Upload ledger to record successfully uploaded files in.
+        attacher: Buffers album additions for the native engine; without one the batch is attached to
+            its album immediately.
+        quarantine: Collects files that could not be uploaded, or None.
+        assets: Assets uploaded earlier in the run, reused for files with the same content (native engine).
+
+    Returns:
+        True if all files were uploaded successfully, False otherwise.
+    """
+    if client is not None:
+        return _upload_batch_native(files, album, client, ledger, attacher, quarantine, assets)
+
+    result = _run_cli_upload(files, album)
+    failed = result.failed_files(files)
+    unattributed = result.unattributed_failures(files)
+    for text in unattributed:
+        logger.warning(f"immich reported a failure that names no file of the batch: {text}")
+    if not unattributed and (result.returncode == 0 or failed):
+        # The CLI names the files it could not upload, so the rest of the batch needs no retry
+        done = [f for f in files if f not in failed]
+        duplicates = min(result.count("duplicate"), len(done))
+        metrics.FILES.inc(len(done) - duplicates, direction="upload", result="created")
+        metrics.FILES.inc(duplicates, direction="upload", result="duplicate")
+        metrics.BYTES.inc(sum(f.stat().st_size for f in done), direction="upload")
+        if ledger is not None:
+            ledger.record([(f, None) for f in done])
+        for f, reason in failed.items():
+            logger.error(f"immich upload of {f} failed: {reason}")
+            metrics.FILES.inc(direction="upload", result="failed")
+            if quarantine is not None:
+                quarantine.add(f, reason)
+        return not failed
+    rc = result.returncode
+    reason = f"immich CLI exited with code {rc}" if rc else f"immich CLI reported: {unattributed[0]}"
+    if len(files) == 1:
+        logger.error(f"immich upload of {files[0]} failed: {reason}")
+        metrics.FILES.inc(direction="upload", result="failed")
+        if quarantine is not None:
+            quarantine.add(files[0], reason)
+        return False
+    logger.warning(f"{reason}, retrying the {len(files)} file(s) in two halves")
+    mid = len(files) // 2
+    return all([upload_batch(half, album, None, ledger, None, quarantine) for half in (files[:mid], files[mid:])])
+
+
+def _run_cli_upload(files: list[Path], album: str) -> CliResult:
+    """Run ``immich upload`` for ``files`` and parse its per-file results.
+
+    The output is read by the shared :class:`~flickrtoimmich.cli_output.OutputMultiplexer`, so concurrent
+    batches need no reader threads of their own. Result lines are logged at debug level (failures as
+    warnings); any other output is logged as it arrives.
 
     Args:
         files: List of file paths to upload.
         album: Name of the Immich album to upload into.
 
     Returns:
-        True if the upload process exited successfully, False otherwise.
+        Exit code and parsed result events of the CLI.
     """
+    events: list[CliEvent] = []
+
+    def on_line(stream: str, line: str) -> None:
+        parsed = parse_line(line)
+        events.extend(parsed)
+        if any(e.kind == "failed" for e in parsed):
+            logger.warning(f"    immich: {line}")
+        elif parsed:
+            logger.debug(f"    immich: {line}")
+        elif stream == "stderr":
+            logger.warning(f"    immich: {line}")
+        else:
+            logger.info(f"    immich: {line}")
+
     cmd = ["immich", "upload", *[str(f) for f in files], "--album", album]
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return CliResult(get_multiplexer().run(cmd, on_line), events)
+
+
+def _upload_batch_native(
+    files: list[Path],
+    album: str,
+    client: ImmichClient,
+    ledger: UploadLedger | None = None,
+    attacher: AlbumAttacher | None = None,
+    quarantine: Quarantine | None = None,
+    assets: AssetRegistry | None = None,
+) -> bool:
+    """Upload a batch of files via the Immich REST API and attach them to ``album``.
 
-    t_out = threading.Thread(target=stream_pipe, args=(proc.stdout, sys.stdout))
-    t_err = threading.Thread(target=stream_pipe, args=(proc.stderr, sys.stderr))
-    t_out.start()
-    t_err.start()
-    t_out.join()
-    t_err.join()
+    The batch is hashed up front (SHA-1, cached in the ledger) and checked against Immich with a single
+    bulk upload-check call; files the server already has are attached to the album without transferring
+    their bytes. Files are recorded in the ledger only once they are attached to the album, so a failed
+    album update is retried on the next run. With an ``attacher`` the album update is deferred and
+    batched with other uploads to the same album.
 
-    rc = proc.wait()
-    if rc != 0:
-        logger.error(f"immich upload exited with code {rc}")
-    return rc == 0
+    With ``assets``, files whose content was already uploaded during this run are attached to ``album`` as
+    the existing asset, without a duplicate check. Only the first file with a given content is sent.
 
+    Files that fail to upload are added to ``quarantine``. If hashing fails, the batch is split in half
+    and retried until the unreadable files are isolated.
+
+    Args:
+        files: List of file paths to upload.
+        album: Name of the Immich album to upload into.
+        client: Immich API client.
+        ledger: Upload ledger to record successfully uploaded files in.
+        attacher: Buffers album additions across batches, or None to attach immediately.
+        quarantine: Collects files that could not be uploaded, or None.
+        assets: Assets uploaded earlier in the run, or None to check every file with the server.
 
-def _fmt_size(size: int) -> str:
-    """Format a byte count into a human-readable size string.
+    Returns:
+        True if every file was uploaded (or already present on the server), False otherwise.
+    """
+    try:
+        checksums = compute_checksums(files, ledger)
+    except OSError as ex:
+        if len(files) == 1:
+            logger.error(f"Reading {files[0]} failed: {ex}")
+            metrics.FILES.inc(direction="upload", result="failed")
+            if quarantine is not None:
+                quarantine.add(files[0], str(ex))
+            return False
+        mid = len(files) // 2
+        return all(
+            [
+                _upload_batch_native(half, album, client, ledger, attacher, quarantine, assets)
+                for half in (files[:mid], files[mid:])
+            ]
+        )
+    # Files whose content another file of this run claimed, with the future of the claimed upload
+    shared: list[tuple[Path, Future[str | None]]] = []
+    own = list(files)
+    if assets is not None:
+        own = []
+        for f in files:
+            fut = assets.claim(checksums[f])
+            if fut is None:
+                own.append(f)
+            else:
+                shared.append((f, fut))
+
+    ok = True
+    uploaded: list[tuple[Path, str | None]] = []
+    # Claims still to resolve; anything left on exit failed
+    unresolved = {checksums[f] for f in own} if assets is not None else set()
+    try:
+        try:
+            checks = client.bulk_upload_check({str(i): checksums[f] for i, f in enumerate(own)}) if own else {}
+        except ImmichAPIError as ex:
+            # Files with content claimed by another batch need no check and are still handled below
+            logger.error(f"Duplicate check for {len(own)} file(s) in album '{album}' failed: {ex}")
+            metrics.FILES.inc(len(own), direction="upload", result="failed")
+            if quarantine is not None:
+                for f in own:
+                    quarantine.add(f, f"duplicate check failed: {ex}")
+            own, checks, ok = [], {}, False
+
+        for i, f in enumerate(own):
+            check = checks.get(str(i), {})
+            if check.get("action") == "reject" and check.get("assetId"):
+                logger.debug(f"    duplicate (not sent): {f} -> {check['assetId']}")
+                metrics.FILES.inc(direction="upload", result="duplicate")
+                asset_id = check["assetId"]
+            else:
+                try:
+                    result = client.upload_asset(f, checksums[f])
+                except (ImmichAPIError, OSError) as ex:
+                    logger.error(f"Upload of {f} failed: {ex}")
+                    metrics.FILES.inc(direction="upload", result="failed")
+                    if quarantine is not None:
+                        quarantine.add(f, str(ex))
+                    ok = False
+                    continue
+                logger.debug(f"    {result.get('status', '?')}: {f} -> {result['id']}")
+                metrics.FILES.inc(direction="upload", result=str(result.get("status", "created")))
+                asset_id = result["id"]
+            uploaded.append((f, asset_id))
+            if assets is not None:
+                unresolved.discard(checksums[f])
+                assets.resolve(checksums[f], asset_id)
+    finally:
+        if assets is not None:
+            for checksum in unresolved:
+                assets.resolve(checksum, None)
+
+    retry: list[Path] = []
+    for f, fut in shared:
+        asset_id = fut.result()
+        if asset_id is None:
+            retry.append(f)
+            continue
+        logger.debug(f"    same content as an earlier upload (not sent): {f} -> {asset_id}")
+        metrics.FILES.inc(direction="upload", result="reused")
+        uploaded.append((f, asset_id))
+    if retry:
+        # The batch that claimed this content failed; check these files with the server on their own
+        ok = _upload_batch_native(retry, album, client, ledger, attacher, quarantine) and ok
+
+    if attacher is not None:
+        return attacher.add(album, uploaded) and ok
+    try:
+        client.add_assets_to_album(client.get_or_create_album(album), [str(a) for _, a in uploaded])
+    except ImmichAPIError as ex:
+        logger.error(f"Adding {len(uploaded)} asset(s) to album '{album}' failed: {ex}")
+        return False
+    if ledger is not None:
+        ledger.record(uploaded)
+    return ok
+
+
+def _parse_size(value: str) -> int:
+    """Parse a positive byte count with an optional binary unit suffix for ``argparse``.
 
     Args:
-        size: Size in bytes.
+        value: Size such as ``"512M"``, ``"2G"`` or ``"1048576"``.
 
     Returns:
-        Formatted string such as ``"1.5 MB"`` or ``"320 B"``.
+        Size in bytes.
+
+    Raises:
+        argparse.ArgumentTypeError: If ``value`` is not a positive size.
     """
-    for unit in ("B", "KB", "MB", "GB"):
-        if size < 1024:
-            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
-        size_f = size / 1024
-        size = int(size_f)  # only for the loop; final return uses float
-    return f"{size / 1024:.1f} TB"
+    try:
+        size = parse_size(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}") from None
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive: {value!r}")
+    return size
 
 
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments for the Immich uploader.
 
     Returns:
-        Parsed namespace with ``batch_size``, ``extensions``, and ``dry_run`` attributes.
+        Parsed namespace with ``batch_size``, ``batch_bytes``, ``extensions``, ``dry_run``, ``engine``,
+        ``workers``, ``ledger``, ``no_ledger``, ``no_metadata``, ``quarantine_report``, ``scan_index``,
+        ``no_scan_index``, ``rescan``, ``scan_workers`` and ``follow`` attributes.
     """
     parser = argparse.ArgumentParser(description="Upload photos/videos to Immich in batches")
-    parser.add_argument("--batch-size", type=int, default=20, help="number of files per upload batch (default: 20)")
+    parser.add_argument(
+        "--batch-size", type=int, default=20, help="maximum number of files per upload batch (default: 20)"
+    )
+    parser.add_argument(
+        "--batch-bytes",
+        type=_parse_size,
+        default=None,
+        help="target total size per upload batch, e.g. 512M or 2G; a larger file gets a batch of its own"
+        " (default: no size limit)",
+    )
     parser.add_argument(
         "--extensions",
         nargs="+",
@@ -83,77 +503,393 @@ def parse_args() -> argparse.Namespace:
         help="file extensions to include (default: .jpg .jpeg .png .mp4)",
     )
     parser.add_argument("--dry-run", action="store_true", help="list files that would be uploaded without uploading")
+    parser.add_argument(
+        "--engine",
+        choices=["native", "cli"],
+        default="native",
+        help="upload via the Immich REST API in-process (native) or by spawning the immich CLI (default: native)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of batches uploaded concurrently (default: 1, serial)"
+    )
+    parser.add_argument(
+        "--ledger",
+        type=Path,
+        default=None,
+        help=f"upload ledger database used to skip already uploaded files (default: $DATA_DIR/{LEDGER_FILENAME})",
+    )
+    parser.add_argument("--no-ledger", action="store_true", help="upload every file and do not record uploads")
+    parser.add_argument(
+        "--no-metadata", action="store_true", help="do not push Flickr sidecar metadata to the uploaded assets"
+    )
+    parser.add_argument(
+        "--quarantine-report",
+        type=Path,
+        default=None,
+        help=f"report of files that could not be uploaded (default: $DATA_DIR/{QUARANTINE_FILENAME})",
+    )
+    parser.add_argument(
+        "--scan-index",
+        type=Path,
+        default=None,
+        help=f"directory listing cache used to skip unchanged directories (default: $DATA_DIR/{SCAN_INDEX_FILENAME})",
+    )
+    parser.add_argument("--no-scan-index", action="store_true", help="read every directory and keep no scan index")
+    parser.add_argument(
+        "--rescan", action="store_true", help="ignore cached directory listings and rebuild the scan index"
+    )
+    parser.add_argument(
+        "--scan-workers", type=int, default=8, help="number of directories listed concurrently (default: 8)"
+    )
+    parser.add_argument(
+        "--follow",
+        type=Path,
+        default=None,
+        metavar="DONE_LOG",
+        help="upload albums as the download wrapper reports them finished in DONE_LOG, until the download exits",
+    )
     return parser.parse_args()
 
 
-def main(batch_size: int, extensions: set[str], dry_run: bool = False) -> None:
+class ScanBatch(NamedTuple):
+    """One upload batch produced by the streaming scanner."""
+
+    album: str
+    album_nr: int
+    batch_nr: int
+    files: list[ScannedFile]
+
+
+class ScanTotals:
+    """Running totals maintained by the scanner while it is still ahead of the upload loop."""
+
+    def __init__(self) -> None:
+        self.albums = 0
+        self.files = 0
+        self.batches = 0
+        self.skipped = 0
+        self.done = False
+
+    def fmt(self, value: int) -> str:
+        """Format a running total, marked with ``+`` while the scan is still in progress."""
+        return str(value) if self.done else f"{value}+"
+
+
+def iter_batches(
+    data_dir: Path,
+    extensions: set[str],
+    batch_size: int,
+    ledger: UploadLedger | None,
+    totals: ScanTotals,
+    batch_bytes: int | None = None,
+    index: ScanIndex | None = None,
+    pool: ThreadPoolExecutor | None = None,
+    follow_log: Path | None = None,
+) -> Iterator[ScanBatch]:
+    """Walk ``data_dir`` album by album and yield upload batches as soon as they are full.
+
+    A batch is full once it holds ``batch_size`` files or the next file would push its total size past
+    ``batch_bytes``; a file larger than ``batch_bytes`` is sent in a batch of its own. Files already
+    recorded in the ledger are skipped. ``totals`` is updated as the scan proceeds and marked done when the
+    generator is exhausted.
+
+    Args:
+        data_dir: Data directory containing one subdirectory per album.
+        extensions: Set of file extensions to include.
+        batch_size: Maximum number of files per batch.
+        ledger: Upload ledger to filter against, or None.
+        totals: Running totals to update.
+        batch_bytes: Target total size of a batch in bytes, or None for no size limit.
+        index: Scan index used to skip unchanged directories, or None.
+        pool: Thread pool for concurrent directory listing, or None.
+        follow_log: Download completion log; albums are taken from it until the download exits instead
+            of from a pass over ``data_dir``.
+
+    Yields:
+        Batches in album order.
+    """
+    if follow_log is not None:
+        albums = iter_completed_albums(follow_log, data_dir, extensions, index, pool)
+    else:
+        albums = iter_albums(data_dir, extensions, index, pool)
+    for album_dir, album_files in albums:
+        batch: list[ScannedFile] = []
+        batch_nr = 0
+        size = 0
+        for sf in album_files:
+            if ledger is not None and ledger.is_uploaded(sf.path, sf.size, sf.mtime_ns):
+                totals.skipped += 1
+                continue
+            if batch_nr == 0 and not batch:
+                totals.albums += 1
+            if batch and batch_bytes is not None and size + sf.size > batch_bytes:
+                batch_nr += 1
+                totals.batches += 1
+                yield ScanBatch(album_dir.name, totals.albums, batch_nr, batch)
+                batch, size = [], 0
+            totals.files += 1
+            batch.append(sf)
+            size += sf.size
+            if len(batch) == batch_size:
+                batch_nr += 1
+                totals.batches += 1
+                yield ScanBatch(album_dir.name, totals.albums, batch_nr, batch)
+                batch, size = [], 0
+        if batch:
+            totals.batches += 1
+            yield ScanBatch(album_dir.name, totals.albums, batch_nr + 1, batch)
+    totals.done = True
+
+
+def main(
+    batch_size: int,
+    extensions: set[str],
+    dry_run: bool = False,
+    engine: str = "native",
+    workers: int = 1,
+    ledger_path: Path | None = None,
+    use_ledger: bool = True,
+    scan_index_path: Path | None = None,
+    use_scan_index: bool = True,
+    rescan: bool = False,
+    scan_workers: int = 8,
+    batch_bytes: int | None = None,
+    quarantine_path: Path | None = None,
+    push_metadata: bool = True,
+    follow: Path | None = None,
+) -> int:
     """Discover albums in the data directory and upload their files to Immich in batches.
 
+    Discovery runs in a background thread that feeds a bounded queue, so uploading starts with the first
+    full batch and memory use does not depend on the size of the library. Totals in the progress counters
+    are shown with a ``+`` suffix until the scan has finished.
+
+    With ``workers > 1`` batches are uploaded concurrently by a bounded thread pool. Batch headers are
+    still logged in album order as batches are submitted, and completions are reported in the same order.
+
+    The native engine attaches uploaded assets to their album in bulk once the album is finished (or every
+    1000 assets) and reuses album IDs persisted in the ledger by earlier runs. A file whose content was
+    already uploaded from another album directory during the run is not sent again; the existing asset is
+    added to its album as well.
+
+    Files recorded in the upload ledger with unchanged size and mtime are skipped, so a rerun over an
+    unchanged tree does not contact Immich at all.
+
+    With ``follow`` the upload runs alongside the download: albums are uploaded as the download wrapper
+    announces them finished in the completion log, and a full pass over the data directory follows once the
+    download has exited.
+
+    The scan index caches each directory's listing by directory mtime, so a rescan only reads directories
+    that gained, lost or renamed entries since the last run (dry runs included). Files rewritten in place
+    are not noticed until ``rescan`` is set.
+
     Args:
         batch_size: Maximum number of files per upload batch.
         extensions: Set of file extensions to include (e.g. ``{".jpg", ".png"}``).
         dry_run: If True, list files without uploading.
+        engine: ``"native"`` to upload through the Immich REST API, ``"cli"`` to spawn the ``immich`` CLI.
+        workers: Number of batches uploaded concurrently.
+        ledger_path: Upload ledger database; defaults to ``$DATA_DIR/.immich_upload_ledger.db``.
+        use_ledger: If False, neither consult nor update the ledger.
+        scan_index_path: Scan index database; defaults to ``$DATA_DIR/.immich_scan_index.db``.
+        use_scan_index: If False, read every directory and keep no scan index.
+        rescan: If True, ignore cached directory listings and rebuild the scan index.
+        scan_workers: Number of directories listed concurrently; 1 lists them serially.
+        batch_bytes: Target total size of an upload batch in bytes, or None to batch by file count only.
+        quarantine_path: Report of files that could not be uploaded; defaults to
+            ``$DATA_DIR/.immich_upload_quarantine.tsv``.
+        push_metadata: If True, push title, description, tags and location from the Flickr JSON sidecars
+            of all uploaded assets to Immich after the upload (native engine with ledger only).
+        follow: Download completion log to take finished albums from, or None to scan once.
+
+    Returns:
+        Process exit code; 1 if a batch failed, a file was quarantined or an asset could not be added to its
+        album, so that the next run retries them.
     """
     data_dir = Path(os.environ.get("DATA_DIR", "."))
 
     logger.info("START")
-
-    # Collect all albums and files first for total counts
-    albums: list[tuple[str, list[Path]]] = []
-    for album_dir in sorted(data_dir.iterdir()):
-        if not album_dir.is_dir():
-            continue
-        files = sorted(f for f in album_dir.rglob("*") if f.is_file() and f.suffix.lower() in extensions)
-        if files:
-            albums.append((album_dir.name, files))
-
-    total_files = sum(len(files) for _, files in albums)
-    total_batches = sum((len(files) + batch_size - 1) // batch_size for _, files in albums)
+    started = time.monotonic()
+
+    client: ImmichClient | None = None
+    if not dry_run and engine == "native":
+        try:
+            client = ImmichClient.from_env(pool_size=max(10, workers), limiter=get_limiter())
+        except ImmichAPIError as ex:
+            logger.error(str(ex))
+            return 1
+
+    ledger: UploadLedger | None = None
+    ledger_path = ledger_path or data_dir / LEDGER_FILENAME
+    # A dry run only reads an existing ledger and never creates one
+    if use_ledger and (not dry_run or ledger_path.exists()):
+        try:
+            ledger = UploadLedger(ledger_path, data_dir)
+            logger.info(f"Using upload ledger {ledger.db_path}")
+        except sqlite3.Error as ex:
+            logger.warning(f"Upload ledger {ledger_path} unavailable, uploading without it: {ex}")
+
+    index: ScanIndex | None = None
+    if use_scan_index:
+        scan_index_path = scan_index_path or data_dir / SCAN_INDEX_FILENAME
+        try:
+            index = ScanIndex(scan_index_path, data_dir, extensions, refresh=rescan)
+        except sqlite3.Error as ex:
+            logger.warning(f"Scan index {scan_index_path} unavailable, scanning without it: {ex}")
+    scan_pool = ThreadPoolExecutor(max_workers=scan_workers, thread_name_prefix="scan") if scan_workers > 1 else None
+    attacher = AlbumAttacher(client, ledger) if client is not None else None
+    assets = AssetRegistry() if client is not None else None
+    quarantine = Quarantine()
+
+    totals = ScanTotals()
     total_size = 0
     prefix = "[DRY-RUN] " if dry_run else ""
     file_nr = 0
     global_batch_nr = 0
-    num_albums = len(albums)
+    failed_batches = 0
+    # Per-album summary, logged once the scanner has moved on to the next album
+    album_stats: list[tuple[int, str, int, int, int]] = []
+
+    def close_album() -> None:
+        if not album_stats:
+            return
+        nr, name, n_files, n_bytes, n_batches = album_stats.pop()
+        size_str = f" {fmt_size(n_bytes)}," if dry_run else ""
+        logger.info(f"{prefix}Album {nr} '{name}' complete: {n_files} file(s),{size_str} {n_batches} batch(es)")
+
+    executor: ThreadPoolExecutor | None = None
+    if not dry_run and workers > 1:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+    # In-flight batches in submission order; bounded so that scanning never runs far ahead of uploading
+    pending: deque[tuple[str, str, Future[bool]]] = deque()
+
+    metrics.WORKERS.set(workers, pool="upload")
+
+    def run_batch(files: list[Path], album: str) -> bool:
+        metrics.WORKERS_BUSY.inc(pool="upload")
+        start = time.monotonic()
+        try:
+            return upload_batch(files, album, client, ledger, attacher, quarantine, assets)
+        except Exception as ex:
+            # E.g. an unexpected server response; one broken batch must not abort the run and its other batches
+            logger.exception(f"Batch of {len(files)} file(s) in album '{album}' failed")
+            metrics.FILES.inc(len(files), direction="upload", result="failed")
+            for f in files:
+                quarantine.add(f, f"unexpected error: {ex!r}")
+            return False
+        finally:
+            metrics.BATCH_SECONDS.observe(time.monotonic() - start)
+            metrics.WORKERS_BUSY.dec(pool="upload")
+
+    def drain(limit: int) -> None:
+        nonlocal failed_batches
+        while len(pending) > limit:
+            label, _, fut = pending.popleft()
+            metrics.QUEUE_DEPTH.set(len(pending), queue="upload")
+            ok = fut.result()
+            if not ok:
+                failed_batches += 1
+            logger.info(f"  {label} {'done' if ok else 'FAILED'}")
+
+    if follow is not None:
+        logger.info(f"Uploading albums as they finish downloading (completion log {follow})")
+
+    def scan_batches() -> Iterator[ScanBatch]:
+        if follow is not None:
+            scan = iter_batches(data_dir, extensions, batch_size, ledger, totals, batch_bytes, index, scan_pool, follow)
+            yield from prefetch(scan, maxsize=max(4, 2 * workers), name="scan")
+            # The final pass filters by the ledger, so every batch of the announced albums has to be recorded
+            # first; in-flight batches and assets waiting for their album would otherwise be uploaded again
+            drain(0)
+            if attacher is not None:
+                attacher.flush_idle(set())
+            totals.done = False
+            logger.info(f"Download finished, scanning {data_dir} for albums that were not announced")
+        scan = iter_batches(data_dir, extensions, batch_size, ledger, totals, batch_bytes, index, scan_pool)
+        yield from prefetch(scan, maxsize=max(4, 2 * workers), name="scan")
+
+    for sb in scan_batches():
+        if sb.batch_nr == 1:
+            close_album()
+            album_stats.append((sb.album_nr, sb.album, 0, 0, 0))
+            logger.info(f"{prefix}Album {sb.album_nr}/{totals.fmt(totals.albums)} '{sb.album}'")
+        nr, name, n_files, n_bytes, n_batches = album_stats[-1]
+        sb_bytes = sum(sf.size for sf in sb.files)
+        album_stats[-1] = (nr, name, n_files + len(sb.files), n_bytes + sb_bytes, n_batches + 1)
+        total_size += sb_bytes
+
+        global_batch_nr += 1
+        progress = f"[{global_batch_nr}/{totals.fmt(totals.batches)}]"
+        logger.info(f"{prefix}  Batch {sb.batch_nr} {progress} ({len(sb.files)} file(s), {fmt_size(sb_bytes)})")
+
+        for idx_in_batch, sf in enumerate(sb.files, 1):
+            file_nr += 1
+            counter = f"[{file_nr}/{totals.fmt(totals.files)}] batch:{idx_in_batch}/{len(sb.files)}"
+            if dry_run:
+                mtime = datetime.fromtimestamp(sf.mtime_ns / 1e9, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                logger.debug(f"{prefix}    {counter}  {sf.path}  ({fmt_size(sf.size)}, {mtime})")
+            else:
+                logger.debug(f"    {counter}  {sf.path}")
 
-    for album_nr, (album, files) in enumerate(albums, 1):
-        num_batches = (len(files) + batch_size - 1) // batch_size
-        album_size = sum(f.stat().st_size for f in files) if dry_run else 0
         if dry_run:
-            total_size += album_size
-            logger.info(
-                f"{prefix}Album {album_nr}/{num_albums} '{album}':"
-                f" {len(files)} file(s), {_fmt_size(album_size)}, {num_batches} batch(es)"
-            )
+            continue
+        files = [sf.path for sf in sb.files]
+        if executor is None:
+            if not run_batch(files, sb.album):
+                failed_batches += 1
         else:
-            logger.info(f"Album {album_nr}/{num_albums} '{album}': {len(files)} file(s), {num_batches} batch(es)")
-
-        for batch_idx in range(0, len(files), batch_size):
-            batch = files[batch_idx : batch_idx + batch_size]
-            batch_nr = batch_idx // batch_size + 1
-            global_batch_nr += 1
-            logger.info(
-                f"{prefix}  Batch {batch_nr}/{num_batches} [{global_batch_nr}/{total_batches}] ({len(batch)} file(s))"
-            )
-
-            for idx_in_batch, f in enumerate(batch, 1):
-                file_nr += 1
-                if dry_run:
-                    stat = f.stat()
-                    mtime = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                    logger.debug(
-                        f"{prefix}    [{file_nr}/{total_files}] batch:{idx_in_batch}/{len(batch)}"
-                        f"  {f}  ({_fmt_size(stat.st_size)}, {mtime})"
-                    )
-                else:
-                    logger.debug(f"    [{file_nr}/{total_files}] batch:{idx_in_batch}/{len(batch)}  {f}")
-
-            if not dry_run:
-                upload_batch(batch, album)
-
+            label = f"Batch {sb.batch_nr} {progress} '{sb.album}'"
+            pending.append((label, sb.album, executor.submit(run_batch, files, sb.album)))
+            metrics.QUEUE_DEPTH.set(len(pending), queue="upload")
+            drain(2 * workers)
+        if attacher is not None:
+            # Attach albums that no in-flight batch can add to anymore
+            attacher.flush_idle({sb.album, *(album for _, album, _ in pending)})
+    close_album()
+
+    drain(0)
+    if attacher is not None:
+        attacher.flush_idle(set())
+    if push_metadata and client is not None and ledger is not None:
+        synced = sync_metadata(client, ledger, workers=max(8, workers))
+        if synced:
+            logger.info(f"Pushed sidecar metadata of {synced} asset(s)")
+    if executor is not None:
+        executor.shutdown()
+    if client is not None:
+        client.close()
+    if ledger is not None:
+        ledger.close()
+    if scan_pool is not None:
+        scan_pool.shutdown()
+    if index is not None:
+        index.close()
+
+    if totals.skipped:
+        logger.info(f"Skipped {totals.skipped} file(s) already recorded in the upload ledger")
     if dry_run:
-        logger.info(f"{prefix}Total: {len(albums)} album(s), {total_files} file(s), {_fmt_size(total_size)}")
+        eta = TransferStats(data_dir / STATS_FILENAME).estimate("upload", total_size)
+        logger.info(f"{prefix}Total: {totals.albums} album(s), {totals.files} file(s), {fmt_size(total_size)}; {eta}")
+    elif failed_batches:
+        logger.error(f"{failed_batches}/{totals.batches} batch(es) failed")
+    if attacher is not None and attacher.failed:
+        logger.error(f"{attacher.failed} uploaded asset(s) could not be added to their album")
+    if not dry_run and follow is None:
+        # A followed upload waits for the download, so its throughput says nothing about upload speed
+        record_run(data_dir / STATS_FILENAME, "upload", started)
+    if not dry_run:
+        quarantine_path = quarantine_path or data_dir / QUARANTINE_FILENAME
+        if quarantine.entries:
+            logger.error(f"{len(quarantine.entries)} file(s) could not be uploaded, see {quarantine_path}")
+        try:
+            quarantine.write(quarantine_path)
+        except OSError as ex:
+            logger.warning(f"Could not write quarantine report {quarantine_path}: {ex}")
+            for path, reason in quarantine.entries:
+                logger.error(f"  {path}: {reason}")
 
     logger.info("DONE")
+    return 1 if failed_batches or quarantine.entries or (attacher is not None and attacher.failed) else 0
 
 
 def cli() -> None:
@@ -162,7 +898,26 @@ def cli() -> None:
 
     startup()
     args = parse_args()
-    main(batch_size=args.batch_size, extensions=set(args.extensions), dry_run=args.dry_run)
+    get_limiter().install_signal_handler()
+    metrics.start_from_env()
+    code = main(
+        batch_size=args.batch_size,
+        extensions=set(args.extensions),
+        dry_run=args.dry_run,
+        engine=args.engine,
+        workers=args.workers,
+        ledger_path=args.ledger,
+        use_ledger=not args.no_ledger,
+        scan_index_path=args.scan_index,
+        use_scan_index=not args.no_scan_index,
+        rescan=args.rescan,
+        scan_workers=args.scan_workers,
+        batch_bytes=args.batch_bytes,
+        quarantine_path=args.quarantine_report,
+        push_metadata=not args.no_metadata,
+        follow=args.follow,
+    )
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ import yaml
 from flickr_api.auth import AuthHandler
 from loguru import logger
 
+from flickrtoimmich import flickr_cache, flickr_ratelimit
+
 
 def main() -> None:
     """List all albums for a Flickr user with photo and video counts."""
@@ -29,6 +31,8 @@ def main() -> None:
     token_path = os.path.join(os.environ.get("HOME", os.path.expanduser("~")), ".flickr_token")
     if os.path.exists(token_path):
         flickr_api.set_auth_handler(AuthHandler.load(token_path))
+    flickr_ratelimit.install()
+    flickr_cache.install()
 
     user = flickr_api.Person.findByUrl(sys.argv[1])
     for ps in user.getPhotosets():
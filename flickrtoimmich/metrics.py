@@ -0,0 +1,210 @@
+"""Minimal Prometheus metrics for the downloader and uploader, served over HTTP when ``METRICS_PORT`` is set."""
+
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set such as ``{direction="upload",result="ok"}``."""
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(value: float) -> str:
+    """Render a sample value the way the text exposition format expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    """Base class holding name, help text, label names and a lock; registers itself on creation."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """Return the label values of ``labels`` in declaration order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """Return the exposition lines for all label sets."""
+
+    def render(self) -> str:
+        """Return the ``# HELP``/``# TYPE`` header followed by all samples."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the counter for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for ``labels``."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for ``labels`` to ``value``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Subtract ``amount`` from the gauge for ``labels``."""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative histogram of observations with fixed bucket bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        self._data: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._data.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._data[key] = (counts, total + value)
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = sorted((k, (list(c), t)) for k, (c, t) in self._data.items())
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = _fmt_labels(self.labelnames, key, f'le="{_fmt_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+FILES = Counter("flickrtoimmich_files_total", "Files processed by direction and result", ("direction", "result"))
+BYTES = Counter("flickrtoimmich_bytes_total", "Bytes transferred", ("direction",))
+BATCH_SECONDS = Histogram(
+    "flickrtoimmich_upload_batch_seconds",
+    "Wall-clock time per upload batch",
+    (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+RATE_LIMITED = Counter("flickrtoimmich_rate_limited_total", "HTTP 429 responses received", ("service",))
+FLICKR_API_CACHE = Counter("flickrtoimmich_flickr_api_cache_total", "Flickr API cache lookups", ("result",))
+BACKOFF_SECONDS = Counter(
+    "flickrtoimmich_backoff_seconds_total", "Seconds spent waiting before a transfer", ("reason",)
+)
+QUEUE_DEPTH = Gauge("flickrtoimmich_queue_depth", "Items waiting in an internal queue", ("queue",))
+WORKERS_BUSY = Gauge("flickrtoimmich_workers_busy", "Workers currently processing an item", ("pool",))
+WORKERS = Gauge("flickrtoimmich_workers", "Configured number of workers", ("pool",))
+
+
+def render() -> str:
+    """Return all registered metrics in the Prometheus text exposition format."""
+    return "".join(m.render() for m in _registry)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves :func:`render` on ``/metrics``."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Skip the access log; Prometheus scrapes every few seconds and would flood stderr."""
+
+
+def start_server(port: int, addr: str = "") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread.
+
+    Args:
+        port: TCP port to listen on (0 picks a free port).
+        addr: Address to bind to; all interfaces by default.
+
+    Returns:
+        The running server.
+    """
+    server = ThreadingHTTPServer((addr, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def start_from_env() -> ThreadingHTTPServer | None:
+    """Start the metrics server if ``METRICS_PORT`` is set (opt-in).
+
+    Returns:
+        The running server, or None if disabled or the port could not be bound.
+    """
+    port = os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    try:
+        server = start_server(int(port), os.environ.get("METRICS_ADDR", ""))
+    except (OSError, ValueError) as ex:
+        logger.warning(f"Metrics endpoint on port {port} unavailable: {ex}")
+        return None
+    logger.info(f"Serving Prometheus metrics on :{server.server_address[1]}/metrics")
+    return server
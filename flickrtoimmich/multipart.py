@@ -0,0 +1,137 @@
+"""Streaming ``multipart/form-data`` body that sends a file from disk without loading it into memory."""
+
+import mmap
+import os
+import uuid
+from pathlib import Path
+from types import TracebackType
+
+from flickrtoimmich.bandwidth import TokenBucket
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _quote(value: str) -> str:
+    """Escape a value for a quoted ``Content-Disposition`` parameter."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+
+
+class MultipartFileBody:
+    """File-like ``multipart/form-data`` body made of form fields followed by one file.
+
+    ``requests`` sends any body with ``read`` and ``__len__`` with a ``Content-Length`` header and reads it
+    in blocks, so peak memory per upload is bounded by ``chunk_size`` instead of the file size. The file
+    is memory-mapped where possible and handed out as ``memoryview`` slices of the page cache, which
+    ``socket.sendall`` consumes without an intermediate Python copy. Empty or unmappable files are read
+    with ``readinto`` into a single reused buffer instead.
+
+    Args:
+        fields: Plain form fields sent before the file.
+        file_field: Name of the form field carrying the file.
+        path: File to send.
+        filename: File name reported to the server; defaults to ``path.name``.
+        content_type: Content type of the file part.
+        limiter: Bandwidth limiter drawn from for every file chunk, or None.
+        chunk_size: Maximum number of file bytes returned per read.
+    """
+
+    def __init__(
+        self,
+        fields: dict[str, str],
+        file_field: str,
+        path: Path,
+        filename: str | None = None,
+        content_type: str = "application/octet-stream",
+        limiter: TokenBucket | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{_quote(k)}"\r\n\r\n{v}\r\n'.encode()
+            for k, v in fields.items()
+        )
+        head += (
+            f"--{boundary}\r\nContent-Disposition: form-data;"
+            f' name="{_quote(file_field)}"; filename="{_quote(filename or path.name)}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._head = head
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self._limiter = limiter
+        self._chunk_size = chunk_size
+        self._fh = path.open("rb")
+        self._size = os.fstat(self._fh.fileno()).st_size
+        self._mm: mmap.mmap | None = None
+        self._view: memoryview | None = None
+        self._buf: bytearray | None = None
+        if self._size:
+            try:
+                self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    self._mm.madvise(mmap.MADV_SEQUENTIAL)
+                self._view = memoryview(self._mm)
+            except (OSError, ValueError):
+                self._mm = None
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._head) + self._size + len(self._tail)
+
+    def read(self, size: int = -1) -> bytes | memoryview:
+        """Return the next part of the body.
+
+        Args:
+            size: Maximum number of bytes to return; the rest of the current section if negative.
+
+        Returns:
+            Up to ``size`` bytes; empty at the end of the body.
+        """
+        head, file_end = len(self._head), len(self._head) + self._size
+        pos = self._pos
+        if pos < head:
+            end = head if size < 0 else min(head, pos + size)
+            data: bytes | memoryview = self._head[pos:end]
+        elif pos < file_end:
+            n = min(file_end - pos, self._chunk_size if size < 0 else min(size, self._chunk_size))
+            data = self._read_file(pos - head, n)
+            if self._limiter is not None:
+                self._limiter.consume(len(data))
+        else:
+            start = pos - file_end
+            data = self._tail[start:] if size < 0 else self._tail[start : start + size]
+        self._pos += len(data)
+        return data
+
+    def _read_file(self, offset: int, n: int) -> bytes | memoryview:
+        """Return ``n`` file bytes at ``offset``, from the mapping or the reused read buffer."""
+        if self._view is not None:
+            return self._view[offset : offset + n]
+        if self._buf is None:
+            self._buf = bytearray(self._chunk_size)
+        self._fh.seek(offset)
+        got = self._fh.readinto(memoryview(self._buf)[:n])
+        if not got:
+            raise OSError(f"{self._fh.name} shrank while it was being uploaded")
+        return memoryview(self._buf)[:got]
+
+    def close(self) -> None:
+        """Release the mapping and close the file."""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # a chunk is still referenced; the mapping is unmapped once it is collected
+            self._mm = None
+        self._fh.close()
+
+    def __enter__(self) -> "MultipartFileBody":
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        self.close()
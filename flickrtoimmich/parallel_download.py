@@ -0,0 +1,415 @@
+"""Parallel Flickr downloader that keeps flickr_download's directory layout, file names and JSON sidecars."""
+
+import errno
+import json
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Collection
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import flickr_api as Flickr
+import flickr_download.flick_download as _fd
+import flickr_download.utils as _u
+import requests
+from flickr_api.flickrerrors import FlickrAPIError, FlickrError
+from flickr_api.objects import Photo, Walker
+from flickr_download.filename_handlers import FilenameHandler, get_filename_handler
+from flickr_download.utils import get_dirname, get_full_path, get_photo_page, serialize_json
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from flickrtoimmich import completion_log, flickr_cache, flickr_ratelimit, metrics, ranged_download
+from flickrtoimmich.bandwidth import TokenBucket, get_limiter
+from flickrtoimmich.blob_store import BLOB_DIRNAME, BlobStore
+from flickrtoimmich.flickr_listing import (
+    EXTRAS,
+    PhotoRecord,
+    iter_recently_updated,
+    iter_uploaded_since,
+    photo_album_ids,
+)
+from flickrtoimmich.sync_state import SYNC_STATE_FILENAME, SyncState
+
+WORKERS_ENV = "DOWNLOAD_WORKERS"
+INCREMENTAL_ENV = "INCREMENTAL_SYNC"
+
+# Number of distinct CDN hosts (live.staticflickr.com, farmN.staticflickr.com, video hosts) kept pooled
+POOLED_HOSTS = 16
+
+# Changes are looked up from this many seconds before the watermark, to cover clock skew and Flickr's
+# search index lagging behind uploads
+WATERMARK_OVERLAP = 3600
+
+# Length flickr_download truncates directory names to when the file system rejects them
+MAX_DIRNAME = 200
+
+
+def make_album_dir(title: str) -> str:
+    """Create the directory for a photo list the way flickr_download does.
+
+    Args:
+        title: Photo list title.
+
+    Returns:
+        Directory name, truncated to :data:`MAX_DIRNAME` characters if the file system rejected the full name.
+    """
+    dirname = get_dirname(title)
+    if not os.path.exists(dirname):
+        try:
+            os.mkdir(dirname)
+        except OSError as err:
+            if err.errno != errno.ENAMETOOLONG:
+                raise
+            logger.warning(f"Truncating too long directory name: {dirname}")
+            dirname = dirname[:MAX_DIRNAME]
+            os.makedirs(dirname, exist_ok=True)
+    return dirname
+
+
+def find_album_dir(title: str) -> Path:
+    """Return the directory flickr_download created for a photo list.
+
+    Args:
+        title: Photo list title.
+
+    Returns:
+        The directory named by ``get_dirname``, or its name truncated to :data:`MAX_DIRNAME` characters if
+        only that exists.
+    """
+    dirname = get_dirname(title)
+    if not os.path.isdir(dirname) and os.path.isdir(dirname[:MAX_DIRNAME]):
+        return Path(dirname[:MAX_DIRNAME])
+    return Path(dirname)
+
+
+class ParallelDownloader:
+    """Downloads Flickr photo lists with several photos in flight at once.
+
+    Photos are listed through ``flickr_api`` and named in listing order with flickr_download's naming
+    handlers, so the resulting tree, the ``<photo>.json`` sidecars and the ``.metadata.db`` download
+    records match a serial ``flickr_download`` run. Each worker loads the photo info, writes the sidecar
+    and streams the file from Flickr's static hosts over one shared ``requests`` session, which keeps a
+    pool of keep-alive connections per host. Photos are listed with their original's URL and date taken,
+    which saves the per-photo API calls those answer (see :meth:`_use_listing`).
+
+    Args:
+        get_filename: flickr_download naming handler.
+        size_label: Size to download, or None for the largest available.
+        save_json: If True, write a JSON sidecar next to every photo.
+        metadata_store: If True, record downloads in ``.metadata.db`` and skip recorded photos.
+        workers: Number of photos downloaded concurrently.
+        limiter: Bandwidth limiter drawn from for every chunk; the process-wide limiter if None.
+        timeout: Connect and read timeout in seconds for file downloads.
+        sync_state: Watermark store; if given, user downloads only fetch what changed since the last complete
+            run (see :meth:`download_user`).
+        blob_store: If given, every photo is downloaded once into this store and linked into the album
+            directories it appears in.
+    """
+
+    def __init__(
+        self,
+        get_filename: FilenameHandler,
+        size_label: str | None = None,
+        save_json: bool = False,
+        metadata_store: bool = False,
+        workers: int = 8,
+        limiter: TokenBucket | None = None,
+        timeout: float = 60.0,
+        sync_state: SyncState | None = None,
+        blob_store: BlobStore | None = None,
+    ) -> None:
+        self.get_filename = get_filename
+        self.size_label = size_label
+        self.save_json = save_json
+        self.metadata_store = metadata_store
+        self.workers = workers
+        self.limiter = limiter or get_limiter()
+        self.timeout = timeout
+        self.sync_state = sync_state
+        self.blob_store = blob_store
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOLED_HOSTS, pool_maxsize=workers, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download")
+        self.failed = 0
+        metrics.WORKERS.set(workers, pool="download")
+
+    def close(self) -> None:
+        """Wait for running downloads and release the connection pool."""
+        self._pool.shutdown()
+        self.session.close()
+
+    def download_user(self, username: str) -> None:
+        """Download all photo sets of a user.
+
+        With a :class:`SyncState` and a watermark from an earlier complete run, only the delta is fetched.
+        Photos uploaded or changed since the watermark are looked up with ``photos.search`` and
+        ``photos.recentlyUpdated``. Albums whose ``date_update`` is unchanged and that contain none of those
+        photos are skipped without listing them. Changed photos that are already on disk get a fresh JSON
+        sidecar, which makes the uploader sync their metadata again.
+
+        Args:
+            username: Flickr user name, e-mail address or profile URL.
+        """
+        user = _fd.find_user(username)
+        state = self.sync_state
+        started = int(time.time())
+        failed_before = self.failed
+        watermark = state.user_watermark(user.id) if state is not None else None
+        changed: set[str] = set()
+        touched_albums: set[str] = set()
+        if watermark is not None:
+            since = watermark - WATERMARK_OVERLAP
+            changed = {p.id for p in iter_uploaded_since(user.id, since)}
+            changed.update(p.id for p in iter_recently_updated(since, owner=user.id))
+            # Cached photo info and album contexts may predate the change
+            flickr_cache.forget("photo_id", changed)
+            for photo_id in changed:
+                touched_albums.update(photo_album_ids(photo_id))
+            logger.info(f"Incremental sync: {len(changed)} photo(s) added or changed in {len(touched_albums)} album(s)")
+
+        for photoset in Walker(user.getPhotosets):
+            date_update = int(getattr(photoset, "date_update", 0) or 0)
+            if state is not None and watermark is not None:
+                if photoset.id not in touched_albums and state.album_date_update(photoset.id) == date_update:
+                    logger.info(f"Skipping unchanged album {photoset.title}")
+                    continue
+                # A cached listing may predate the change that brought the album here
+                flickr_cache.forget("photoset_id", [photoset.id])
+            failed = self.failed
+            self.download_list(photoset, photoset.title, refresh=changed)
+            if state is not None and self.failed == failed:
+                state.record_album(photoset.id, user.id, date_update)
+
+        if state is not None and self.failed == failed_before:
+            state.set_user_watermark(user.id, started)
+
+    def download_set(self, set_id: str) -> None:
+        """Download one photo set.
+
+        Args:
+            set_id: Flickr photoset ID.
+        """
+        pset = Flickr.Photoset(id=set_id)
+        self.download_list(pset, pset.title)
+
+    def download_list(self, pset: Any, title: str, refresh: Collection[str] = ()) -> None:
+        """Download every photo of a photo list into the directory named after ``title``.
+
+        Photos recorded in ``.metadata.db`` are skipped before any request is made, unless they are listed in
+        ``refresh``. Downloads are recorded in completion order by this thread, which owns the database
+        connection.
+
+        Args:
+            pset: Photo list (a photoset or a person) providing ``getPhotos``.
+            title: Name of the photo list.
+            refresh: IDs of photos changed on Flickr whose JSON sidecar is rewritten even if already downloaded.
+        """
+        logger.info(f"Downloading {title}")
+        dirname = make_album_dir(title)
+        suffix = f" ({self.size_label})" if self.size_label else ""
+        conn = _fd._get_metadata_db(dirname) if self.metadata_store else None
+        recorded: set[str] = set()
+        if conn is not None:
+            query = "SELECT photo_id FROM downloads WHERE size_label = ? AND suffix = ?"
+            recorded = {row[0] for row in conn.execute(query, (self.size_label or "", suffix))}
+        # In-flight photos in submission order; bounded so that listing never runs far ahead of downloading
+        pending: deque[tuple[Photo, Future[bool]]] = deque()
+
+        def drain(limit: int) -> None:
+            while len(pending) > limit:
+                photo, fut = pending.popleft()
+                metrics.QUEUE_DEPTH.set(len(pending), queue="download")
+                if not fut.result():
+                    self.failed += 1
+                elif conn is not None and photo.id not in recorded:
+                    conn.execute("INSERT INTO downloads VALUES (?, ?, ?)", (photo.id, self.size_label or "", suffix))
+                    conn.commit()
+
+        try:
+            for photo in Walker(pset.getPhotos, extras=",".join(EXTRAS)):
+                if photo.id in recorded and photo.id not in refresh:
+                    logger.info(f"Skipping download of already downloaded photo with ID: {photo.id}")
+                    continue
+                self._use_listing(photo)
+                # Naming handlers such as title_increment depend on the listing order, so names are assigned here
+                base = get_full_path(dirname, self.get_filename(pset, photo, suffix))
+                future = self._pool.submit(self._download_photo, photo, base, photo.id in refresh)
+                pending.append((photo, future))
+                drain(2 * self.workers)
+            drain(0)
+        finally:
+            if conn is not None:
+                conn.close()
+        completion_log.report_album_done(Path(dirname))
+
+    def _use_listing(self, photo: Photo) -> None:
+        """Fill in what the listing extras already tell about ``photo``, so workers make fewer API calls.
+
+        When the original is wanted, its URL and dimensions stand in for the ``flickr.photos.getSizes`` call.
+        Without sidecars, the date taken also stands in for ``flickr.photos.getInfo``. Videos and photos whose
+        original Flickr does not expose still have their sizes looked up.
+        """
+        record = PhotoRecord.from_api(photo.__dict__)
+        wants_original = self.size_label in (None, "Original")
+        if wants_original and record.media == "photo" and record.url_o and record.width and record.height:
+            original = dict(
+                label="Original", media="photo", source=record.url_o, width=record.width, height=record.height
+            )
+            photo.__dict__.setdefault("sizes", {"Original": original})
+        if not self.save_json and record.date_taken:
+            photo.__dict__.setdefault("taken", record.date_taken)
+
+    def _download_photo(self, photo: Photo, base: str, refresh: bool = False) -> bool:
+        """Write the sidecar and the file of one photo; runs on a worker thread.
+
+        With ``refresh``, an existing sidecar is rewritten with the current photo info.
+
+        Returns:
+            True if the photo is on disk, False if it has to be retried on the next run.
+        """
+        metrics.WORKERS_BUSY.inc(pool="download")
+        try:
+            try:
+                fname: str = photo._getOutputFilename(base, self.size_label)
+                if not photo["loaded"] and (self.save_json or "taken" not in photo.__dict__):
+                    photo.load()
+            except FlickrError as ex:
+                logger.info(f"Skipping {base}, because cannot get info from Flickr: {ex}")
+                return False
+
+            if self.save_json:
+                self._save_json(photo, fname + ".json", overwrite=refresh)
+
+            if not self.size_label and photo._getLargestSizeLabel() == "Video Player":
+                # Old videos only offer a SWF player instead of the video file
+                logger.error(f"Video not available for: {get_photo_page(photo)}")
+                return False
+
+            if os.path.exists(fname):
+                logger.info(f"Skipping {fname}, as it exists already")
+                return True
+            try:
+                if self.blob_store is None:
+                    logger.info(f"Saving: {fname} ({get_photo_page(photo)})")
+                    self._fetch_photo(photo, fname)
+                elif self.blob_store.place(
+                    photo.id, self.size_label, fname, lambda blob: self._fetch_photo(photo, blob)
+                ):
+                    logger.info(f"Saved: {fname} ({get_photo_page(photo)})")
+                else:
+                    logger.info(f"Linked {fname} to the copy downloaded for another album")
+                    metrics.FILES.inc(direction="download", result="linked")
+            except FlickrError as ex:
+                logger.error(f"Flickr error saving photo: {ex}")
+                return False
+            except OSError as ex:
+                logger.error(f"IO error saving photo: {ex}")
+                return False
+            # Looked up at call time so that the download wrapper's patch for unknown dates applies
+            _u.set_file_time(fname, photo["taken"])
+            return True
+        finally:
+            metrics.WORKERS_BUSY.dec(pool="download")
+
+    @staticmethod
+    def _save_json(photo: Photo, json_fname: str, overwrite: bool = False) -> None:
+        """Write the photo info as flickr_download's ``--save_json`` does, unless the sidecar exists."""
+        if not overwrite and os.path.exists(json_fname):
+            logger.info(f"Skipping {json_fname}, as it exists already")
+            return
+        try:
+            photo_data = photo.__dict__.copy()
+            try:
+                photo_data["exif"] = photo.getExif()
+            except FlickrAPIError as ex:
+                if ex.code != 2:
+                    raise
+                logger.warning("Could not get EXIF data. Likely not photo owner?")
+            data = json.dumps(photo_data, default=serialize_json, indent=2, sort_keys=True)
+            with open(json_fname, "w", encoding="utf-8") as json_file:
+                logger.info(f"Saving photo info: {json_fname}")
+                json_file.write(data)
+        except Exception as ex:
+            logger.warning(f"Trouble saving photo info {json_fname}: {ex}")
+
+    def _fetch_photo(self, photo: Photo, fname: str) -> None:
+        """Look up the file URL of ``photo`` and download it to ``fname``, retrying after rate limiting."""
+        url = photo.getPhotoFile(self.size_label)
+        flickr_ratelimit.retrying(lambda: self._fetch(url, fname), fname)
+
+    def _fetch(self, url: str, fname: str) -> None:
+        """Download ``url`` to ``fname`` through the bandwidth limiter, resuming an earlier partial download.
+
+        See :func:`flickrtoimmich.ranged_download.fetch`.
+
+        Raises:
+            RateLimited: If the request was answered with HTTP 429.
+            OSError: If the request fails (as ``HTTP Error <code>`` for error responses), the file is
+                incomplete or cannot be written.
+        """
+        try:
+            ranged_download.fetch(self.session, url, fname, self.limiter, self.timeout)
+        except (OSError, requests.RequestException, flickr_ratelimit.RateLimited):
+            metrics.FILES.inc(direction="download", result="failed")
+            raise
+        metrics.FILES.inc(direction="download", result="ok")
+
+
+def main(workers: int, incremental: bool = False, blobs: bool = False) -> int:
+    """Run flickr_download's command line with photos downloaded by a :class:`ParallelDownloader`.
+
+    Accepts flickr_download's arguments and configuration file. Only ``--download`` and ``--download_user``
+    are parallelised; every other mode is handed to flickr_download unchanged.
+
+    Args:
+        workers: Number of photos downloaded concurrently.
+        incremental: If True, keep sync watermarks in ``.flickr_sync_state.db`` in the download directory and
+            only fetch what changed since the last complete user download.
+        blobs: If True, download every photo once into ``.flickr_blobs`` in the download directory and
+            hardlink it into its album directories.
+
+    Returns:
+        Process exit code; 1 if the download could not start or any photo failed.
+    """
+    args = _fd._get_arg_parser().parse_args()
+    if not (args.download or args.download_user) or args.list or args.list_naming or args.skip_download:
+        return _fd.main()
+    if not args.api_key or not args.api_secret:
+        print('You need to pass in both "api_key" and "api_secret" arguments', file=sys.stderr)
+        return 1
+    cache = _u.init_cache(args.cache) if args.cache else None
+    if not _fd._init(args.api_key, args.api_secret, args.user_auth):
+        return 1
+
+    logger.info(f"Downloading with {workers} parallel worker(s)")
+    sync_state = SyncState(Path(SYNC_STATE_FILENAME)) if incremental else None
+    downloader = ParallelDownloader(
+        get_filename_handler(args.naming),
+        args.quality,
+        args.save_json,
+        args.metadata_store,
+        workers,
+        sync_state=sync_state,
+        blob_store=BlobStore(Path(BLOB_DIRNAME)) if blobs else None,
+    )
+    try:
+        if args.download:
+            downloader.download_set(args.download)
+        else:
+            downloader.download_user(args.download_user)
+    finally:
+        downloader.close()
+        if sync_state is not None:
+            sync_state.close()
+        if cache is not None:
+            _u.save_cache(args.cache, cache)
+    if downloader.failed:
+        logger.error(f"{downloader.failed} photo(s) could not be downloaded; they are retried on the next run")
+        return 1
+    return 0
@@ -0,0 +1,154 @@
+"""Resumable downloads: data goes to ``<name>.part``, continued with HTTP ``Range`` requests, renamed when complete.
+
+A download that is interrupted, whether by a timeout, a killed pod or a container suspended by the rate-limit
+backoff, leaves its ``.part`` file behind. The next attempt, in the same run or a later one, only requests the
+missing bytes. The finished file is checked against the size announced by the server before it is renamed
+into place, so a truncated file never appears under the final name, where later runs would skip it as existing.
+"""
+
+import os
+import re
+
+import requests
+from loguru import logger
+
+from flickrtoimmich import flickr_ratelimit, metrics
+from flickrtoimmich.bandwidth import TokenBucket
+
+PART_SUFFIX = ".part"
+# Data of an interrupted chunk is lost, so chunks are kept small
+CHUNK_SIZE = 64 * 1024
+
+# Attempts within one call, as long as every failed attempt still added bytes to the partial file
+MAX_ATTEMPTS = 5
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)")
+
+
+def parse_content_range(value: str | None) -> tuple[int | None, int | None]:
+    """Return the first byte position and the complete length of a ``Content-Range`` header.
+
+    Args:
+        value: Header value such as ``bytes 100-199/1000`` or ``bytes */1000``; None if absent.
+
+    Returns:
+        Start offset and total size, each None if the header does not state it.
+    """
+    m = _CONTENT_RANGE.match(value or "")
+    if m is None:
+        return None, None
+    start, total = m.groups()
+    return (int(start) if start is not None else None), (int(total) if total != "*" else None)
+
+
+def _part_size(part: str) -> int:
+    try:
+        return os.path.getsize(part)
+    except FileNotFoundError:
+        return 0
+
+
+def _discard(part: str) -> None:
+    try:
+        os.unlink(part)
+    except FileNotFoundError:
+        pass
+
+
+def _fetch_once(session: requests.Session, url: str, fname: str, limiter: TokenBucket, timeout: float) -> int:
+    """Make one request for the missing part of ``fname``; returns the bytes received."""
+    part = fname + PART_SUFFIX
+    offset = _part_size(part)
+    # Ranges count encoded bytes, so the body must not be compressed in transit
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+    received = 0
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+        if r.status_code == 429:
+            metrics.RATE_LIMITED.inc(service="flickr")
+            raise flickr_ratelimit.RateLimited(flickr_ratelimit.parse_retry_after(r.headers.get("Retry-After")))
+        if r.status_code == 416 and offset:
+            # The partial file reaches or passes the end of the file; it is either complete or stale
+            _, total = parse_content_range(r.headers.get("Content-Range"))
+            if total == offset:
+                os.replace(part, fname)
+                return 0
+            logger.warning(f"Discarding partial download {part}: {offset} bytes, file has {total}")
+            _discard(part)
+            return _fetch_once(session, url, fname, limiter, timeout)
+        if r.status_code >= 400:
+            if r.status_code not in (408, 500, 502, 503, 504):
+                # The file is gone or no longer accessible at this URL, so the partial data cannot be completed
+                _discard(part)
+            # Same wording as urllib, which the rate-limit backoff in flickr-docker.sh watches for
+            raise OSError(f"HTTP Error {r.status_code}: {r.reason} ({url})")
+        if r.status_code == 206:
+            start, total = parse_content_range(r.headers.get("Content-Range"))
+            if start != offset:
+                _discard(part)
+                raise OSError(f"Unexpected Content-Range {r.headers.get('Content-Range')!r} for {url}")
+            mode = "ab"
+            logger.info(f"Resuming {fname} at {offset} bytes")
+        else:
+            if offset:
+                logger.info(f"Server ignored the range request, restarting {fname}")
+            length = r.headers.get("Content-Length")
+            total = int(length) if length is not None and length.isdigit() else None
+            mode = "wb"
+        with open(part, mode) as f:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                limiter.consume(len(chunk))
+                f.write(chunk)
+                received += len(chunk)
+                metrics.BYTES.inc(len(chunk), direction="download")
+    size = _part_size(part)
+    if total is not None and size != total:
+        if size > total:
+            _discard(part)
+        raise OSError(f"Incomplete download of {fname}: {size} of {total} bytes")
+    os.replace(part, fname)
+    return received
+
+
+def fetch(
+    session: requests.Session, url: str, fname: str, limiter: TokenBucket, timeout: float, attempts: int = MAX_ATTEMPTS
+) -> int:
+    """Download ``url`` to ``fname``, continuing a ``<fname>.part`` file left by an earlier attempt.
+
+    An attempt that fails after receiving data is resumed right away, up to ``attempts`` times. After that,
+    or when an attempt receives nothing, the error is raised and the partial file is kept for the next run.
+    It is only deleted when the server no longer serves the file or sends data that does not fit it.
+
+    Args:
+        session: Session the requests are sent with.
+        url: File URL.
+        fname: Target file name.
+        limiter: Bandwidth limiter drawn from for every chunk.
+        timeout: Connect and read timeout in seconds.
+        attempts: Attempts before giving up.
+
+    Returns:
+        Bytes transferred, which excludes data already on disk from earlier runs. Every received chunk is
+        also counted in ``flickrtoimmich_bytes_total``, including those of failed attempts.
+
+    Raises:
+        RateLimited: If the request was answered with HTTP 429.
+        OSError: If the request fails (as ``HTTP Error <code>`` for error responses), the file is incomplete
+            or cannot be written.
+        requests.RequestException: If the connection fails.
+    """
+    part = fname + PART_SUFFIX
+    received = 0
+    attempt = 1
+    while True:
+        before = _part_size(part)
+        try:
+            return received + _fetch_once(session, url, fname, limiter, timeout)
+        except (OSError, requests.RequestException) as ex:
+            gained = _part_size(part) - before
+            if gained <= 0 or attempt >= attempts:
+                raise
+            received += gained
+            attempt += 1
+            logger.warning(f"Download of {fname} interrupted at {before + gained} bytes ({ex}), resuming")
@@ -0,0 +1,121 @@
+"""Persistent SQLite index of directory listings used to skip unchanged subtrees when rescanning."""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+SCAN_INDEX_FILENAME = ".immich_scan_index.db"
+
+# Listings of directories modified less than this long ago are not stored: on file systems with coarse
+# mtime granularity (NFS, FAT) a file added within the same tick would otherwise never be picked up.
+RACY_WINDOW_NS = 2_000_000_000
+
+_COMMIT_EVERY = 200
+
+
+class IndexedFile(NamedTuple):
+    """A matching file as recorded in a directory listing."""
+
+    name: str
+    size: int
+    mtime_ns: int
+
+
+class DirListing(NamedTuple):
+    """Sorted subdirectories and matching files of one directory, valid while its mtime is unchanged."""
+
+    mtime_ns: int
+    subdirs: list[str]
+    files: list[IndexedFile]
+
+
+class ScanIndex:
+    """Cache of directory listings keyed by path relative to ``root`` and directory mtime.
+
+    A directory's mtime changes whenever an entry is added, removed or renamed in it, so a listing whose
+    recorded mtime still matches can be reused without reading the directory. Files rewritten in place
+    keep their directory mtime; ``refresh=True`` ignores all cached listings and rebuilds the index.
+
+    The index is only valid for one set of extensions; it is cleared when opened with a different set.
+
+    Args:
+        db_path: SQLite database file (created if missing).
+        root: Data directory that indexed paths are relative to.
+        extensions: Lower-case file extensions the listings are filtered by.
+        refresh: If True, never return cached listings but still store fresh ones.
+    """
+
+    def __init__(self, db_path: Path, root: Path, extensions: set[str], refresh: bool = False) -> None:
+        self.db_path = db_path
+        self.root = root
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, subdirs TEXT NOT NULL, files TEXT NOT NULL)"
+        )
+        ext_key = " ".join(sorted(extensions))
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'extensions'").fetchone()
+        if row is None or row[0] != ext_key:
+            self._conn.execute("DELETE FROM dirs")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('extensions', ?)", (ext_key,))
+        self._conn.commit()
+
+    def _key(self, path: Path) -> str:
+        """Return the index key (path relative to the data directory) for ``path``."""
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def lookup(self, path: Path, mtime_ns: int) -> DirListing | None:
+        """Return the cached listing of ``path`` if the directory has not changed since it was stored.
+
+        Args:
+            path: Directory to look up.
+            mtime_ns: Current modification time of the directory in nanoseconds.
+
+        Returns:
+            The cached listing, or None if missing, stale or ``refresh`` is set.
+        """
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT subdirs, files FROM dirs WHERE path = ? AND mtime_ns = ?", (self._key(path), mtime_ns)
+            ).fetchone()
+        if row is None:
+            return None
+        return DirListing(mtime_ns, json.loads(row[0]), [IndexedFile(*f) for f in json.loads(row[1])])
+
+    def store(self, path: Path, listing: DirListing) -> None:
+        """Store a freshly read listing of ``path``.
+
+        Listings of directories modified within :data:`RACY_WINDOW_NS` are skipped.
+
+        Args:
+            path: Directory the listing belongs to.
+            listing: Listing read from disk.
+        """
+        if time.time_ns() - listing.mtime_ns < RACY_WINDOW_NS:
+            return
+        row = (self._key(path), listing.mtime_ns, json.dumps(listing.subdirs), json.dumps(listing.files))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)", row)
+            self._dirty += 1
+            if self._dirty >= _COMMIT_EVERY:
+                self._conn.commit()
+                self._dirty = 0
+
+    def close(self) -> None:
+        """Commit pending listings and close the database connection."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,221 @@
+"""Streaming discovery of album directories and media files below ``DATA_DIR``."""
+
+import itertools
+import os
+import queue
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, TypeVar
+
+from loguru import logger
+
+from flickrtoimmich import completion_log, metrics
+from flickrtoimmich.scan_index import DirListing, IndexedFile, ScanIndex
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class ScannedFile(NamedTuple):
+    """A media file found during the scan, with the stat fields the uploader needs."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+
+
+def iter_album_dirs(data_dir: Path) -> Iterator[Path]:
+    """Yield the album directories directly below ``data_dir`` in name order.
+
+    Hidden directories, such as the download's blob store, are not albums and are skipped like the ``immich``
+    CLI skips them.
+
+    Args:
+        data_dir: Data directory containing one subdirectory per album.
+
+    Yields:
+        Album directory paths.
+    """
+    with os.scandir(data_dir) as it:
+        names = sorted(e.name for e in it if e.is_dir() and not e.name.startswith("."))
+    for name in names:
+        yield data_dir / name
+
+
+def list_dir(directory: Path, extensions: set[str], index: ScanIndex | None = None) -> DirListing:
+    """Return the sorted subdirectories and matching files of ``directory``.
+
+    With an ``index`` the directory itself is stat'ed once and its cached listing reused if its mtime is
+    unchanged. Otherwise the directory is read with ``os.scandir``, classifying entries by ``d_type``
+    so that only files with a matching extension are stat'ed.
+
+    Args:
+        directory: Directory to list.
+        extensions: Lower-case file extensions to include (e.g. ``{".jpg", ".png"}``).
+        index: Scan index to consult and update, or None.
+
+    Returns:
+        The directory listing.
+    """
+    mtime_ns = directory.stat().st_mtime_ns if index is not None else 0
+    if index is not None and (cached := index.lookup(directory, mtime_ns)) is not None:
+        return cached
+    subdirs: list[str] = []
+    files: list[IndexedFile] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                st = entry.stat()
+                files.append(IndexedFile(entry.name, st.st_size, st.st_mtime_ns))
+    listing = DirListing(mtime_ns, sorted(subdirs), sorted(files))
+    if index is not None:
+        index.store(directory, listing)
+    return listing
+
+
+def iter_album_files(
+    album_dir: Path,
+    extensions: set[str],
+    index: ScanIndex | None = None,
+    pool: ThreadPoolExecutor | None = None,
+    listing: DirListing | None = None,
+) -> Iterator[ScannedFile]:
+    """Yield media files below ``album_dir`` depth-first in sorted order.
+
+    Each directory's files are yielded before its subdirectories. With a ``pool`` the subdirectories of a
+    directory are listed in parallel while the files of the first one are consumed, which hides the
+    per-directory round-trip latency on network file systems. Only the listings along the current path are
+    held in memory.
+
+    Args:
+        album_dir: Album directory to walk.
+        extensions: Lower-case file extensions to include (e.g. ``{".jpg", ".png"}``).
+        index: Scan index used to skip unchanged directories, or None.
+        pool: Thread pool for listing subdirectories concurrently, or None to list them serially.
+        listing: Already obtained listing of ``album_dir``.
+
+    Yields:
+        Matching files with size and modification time.
+    """
+    if listing is None:
+        listing = list_dir(album_dir, extensions, index)
+    for f in listing.files:
+        yield ScannedFile(album_dir / f.name, f.size, f.mtime_ns)
+    subdirs = [album_dir / name for name in listing.subdirs]
+    if pool is not None:
+        futures = [pool.submit(list_dir, d, extensions, index) for d in subdirs]
+        for d, fut in zip(subdirs, futures):
+            yield from iter_album_files(d, extensions, index, pool, fut.result())
+    else:
+        for d in subdirs:
+            yield from iter_album_files(d, extensions, index)
+
+
+def iter_albums(
+    data_dir: Path,
+    extensions: set[str],
+    index: ScanIndex | None = None,
+    pool: ThreadPoolExecutor | None = None,
+    lookahead: int = 8,
+) -> Iterator[tuple[Path, Iterator[ScannedFile]]]:
+    """Yield each album directory together with an iterator over its media files.
+
+    With a ``pool`` the top-level listings of the next ``lookahead`` albums are read in the background.
+    Each file iterator must be exhausted before advancing to the next album.
+
+    Args:
+        data_dir: Data directory containing one subdirectory per album.
+        extensions: Lower-case file extensions to include.
+        index: Scan index used to skip unchanged directories, or None.
+        pool: Thread pool for concurrent directory listing, or None.
+        lookahead: Number of album listings requested ahead of the consumer.
+
+    Yields:
+        ``(album_dir, files)`` pairs in album name order.
+    """
+    if pool is None:
+        for album_dir in iter_album_dirs(data_dir):
+            yield album_dir, iter_album_files(album_dir, extensions, index)
+        return
+    pending: deque[tuple[Path, Future[DirListing]]] = deque()
+    album_dirs = iter_album_dirs(data_dir)
+    while True:
+        for album_dir in itertools.islice(album_dirs, lookahead - len(pending)):
+            pending.append((album_dir, pool.submit(list_dir, album_dir, extensions, index)))
+        if not pending:
+            return
+        album_dir, fut = pending.popleft()
+        yield album_dir, iter_album_files(album_dir, extensions, index, pool, fut.result())
+
+
+def iter_completed_albums(
+    done_log: Path,
+    data_dir: Path,
+    extensions: set[str],
+    index: ScanIndex | None = None,
+    pool: ThreadPoolExecutor | None = None,
+) -> Iterator[tuple[Path, Iterator[ScannedFile]]]:
+    """Yield albums as the downloader announces them in ``done_log``, until the downloader has exited.
+
+    Blocks while the download is still running and no further album has been announced. Albums that were
+    not announced (e.g. after a download error) are left to a full pass over ``data_dir`` with
+    :func:`iter_albums`. The caller starts that pass once the uploads of the announced albums are recorded in
+    the upload ledger, so they are not uploaded twice.
+
+    Args:
+        done_log: Completion log written by the download wrapper.
+        data_dir: Data directory containing one subdirectory per album.
+        extensions: Lower-case file extensions to include.
+        index: Scan index used to skip unchanged directories, or None.
+        pool: Thread pool for concurrent directory listing, or None.
+
+    Yields:
+        ``(album_dir, files)`` pairs in the order the albums were announced.
+    """
+    root = data_dir.resolve()
+    for album_dir in completion_log.follow(done_log):
+        if album_dir.resolve().parent != root:
+            logger.warning(f"Ignoring finished album {album_dir}: not a directory directly below {data_dir}")
+            continue
+        yield data_dir / album_dir.name, iter_album_files(data_dir / album_dir.name, extensions, index, pool)
+
+
+def prefetch(items: Iterable[T], maxsize: int, name: str | None = None) -> Iterator[T]:
+    """Run ``items`` in a background thread and yield its elements through a bounded queue.
+
+    The producer blocks once ``maxsize`` elements are waiting, so scanning never runs arbitrarily far
+    ahead of the consumer. Exceptions raised by the producer are re-raised in the consumer.
+
+    Args:
+        items: Iterable to consume in the background.
+        maxsize: Maximum number of buffered elements.
+        name: Queue name under which the buffer depth is exported as a metric, or None.
+
+    Yields:
+        The elements of ``items`` in order.
+    """
+    q: queue.Queue[object] = queue.Queue(maxsize=maxsize)
+    error: list[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for item in items:
+                q.put(item)
+        except BaseException as ex:  # re-raised in the consumer thread
+            error.append(ex)
+        finally:
+            q.put(_DONE)
+
+    threading.Thread(target=produce, name="scanner", daemon=True).start()
+    while (item := q.get()) is not _DONE:
+        if name is not None:
+            metrics.QUEUE_DEPTH.set(q.qsize(), queue=name)
+        yield item  # type: ignore[misc]
+    if error:
+        raise error[0]
@@ -0,0 +1,176 @@
+"""Push metadata from flickr_download's JSON sidecars (``<photo>.json``) to the uploaded Immich assets."""
+
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+from loguru import logger
+
+from flickrtoimmich.immich_api import ImmichAPIError, ImmichClient
+from flickrtoimmich.upload_ledger import UploadLedger
+
+SIDECAR_SUFFIX = ".json"
+
+# Maximum number of asset IDs per bulk request
+BULK_CHUNK = 1000
+
+
+class SidecarMetadata(NamedTuple):
+    """Metadata of one Flickr photo as stored in its sidecar."""
+
+    description: str
+    tags: tuple[str, ...]
+    latitude: float | None
+    longitude: float | None
+
+
+def _text(value: Any) -> str:
+    """Return a Flickr text field, which may be a plain string or a ``{"_content": ...}`` object."""
+    if isinstance(value, dict):
+        value = value.get("_content", "")
+    return str(value or "").strip()
+
+
+def parse_sidecar(path: Path) -> SidecarMetadata:
+    """Read the title, description, tags and location from a sidecar.
+
+    The title and description are combined into the Immich description. A location of ``0, 0`` is
+    Flickr's marker for "no location" and is ignored.
+
+    Args:
+        path: Sidecar JSON file.
+
+    Returns:
+        Parsed metadata.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not valid JSON.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    title, description = _text(data.get("title")), _text(data.get("description"))
+    if title and description and title != description:
+        description = f"{title}\n\n{description}"
+    else:
+        description = description or title
+
+    tags: list[str] = []
+    for tag in data.get("tags") or []:
+        # flickr_download stores tags as plain strings; older sidecars may hold the full tag objects
+        text = _text(tag.get("raw") or tag.get("text")) if isinstance(tag, dict) else _text(tag)
+        if text and text not in tags:
+            tags.append(text)
+
+    latitude = longitude = None
+    location = data.get("location")
+    if isinstance(location, dict):
+        try:
+            lat, lon = float(location["latitude"]), float(location["longitude"])
+        except (KeyError, TypeError, ValueError):
+            pass
+        else:
+            if (lat, lon) != (0.0, 0.0):
+                latitude, longitude = lat, lon
+    return SidecarMetadata(description, tuple(tags), latitude, longitude)
+
+
+def _chunks(items: list[str]) -> list[list[str]]:
+    """Split ``items`` into lists of at most :data:`BULK_CHUNK` elements."""
+    return [items[i : i + BULK_CHUNK] for i in range(0, len(items), BULK_CHUNK)]
+
+
+def _load(entry: tuple[Path, str, int | None]) -> tuple[Path, str, int, SidecarMetadata] | None:
+    """Parse the sidecar of an uploaded file if it changed since its metadata was last pushed."""
+    path, asset_id, synced_mtime = entry
+    sidecar = path.with_name(path.name + SIDECAR_SUFFIX)
+    try:
+        mtime_ns = os.stat(sidecar).st_mtime_ns
+        if mtime_ns == synced_mtime:
+            return None
+        return path, asset_id, mtime_ns, parse_sidecar(sidecar)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as ex:
+        logger.warning(f"Ignoring sidecar {sidecar}: {ex}")
+        return None
+
+
+def sync_metadata(client: ImmichClient, ledger: UploadLedger, workers: int = 8) -> int:
+    """Apply sidecar descriptions, tags and locations to all uploaded assets with new or changed sidecars.
+
+    Sidecars are read in parallel. Tags are bulked: one tag upsert for all tags and one tagging call per tag.
+    Immich only sets the same description and location on several assets at once, and Flickr descriptions
+    and coordinates are nearly unique per photo, so these cost about one asset update per photo. Both fields
+    of an asset go in the same update, and assets with identical values share one. All calls are spread
+    over ``workers`` threads. Assets whose updates all succeeded are recorded in the ledger and skipped on
+    the next run, so only new or changed sidecars cost calls.
+
+    Args:
+        client: Immich API client.
+        ledger: Upload ledger listing uploaded files and their asset IDs.
+        workers: Number of sidecars read and API calls sent concurrently.
+
+    Returns:
+        Number of assets whose metadata was pushed.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sidecar") as pool:
+        loaded = [r for r in pool.map(_load, ledger.uploaded_assets()) if r is not None]
+    if not loaded:
+        return 0
+    logger.info(f"Pushing sidecar metadata of {len(loaded)} asset(s) to Immich")
+
+    # Description and location of each asset, keyed by the field values so identical ones share a call
+    by_fields: dict[tuple[tuple[str, Any], ...], list[str]] = defaultdict(list)
+    by_tag: dict[str, list[str]] = defaultdict(list)
+    for _, asset_id, _, meta in loaded:
+        fields: dict[str, Any] = {}
+        if meta.description:
+            fields["description"] = meta.description
+        if meta.latitude is not None and meta.longitude is not None:
+            fields.update(latitude=meta.latitude, longitude=meta.longitude)
+        if fields:
+            by_fields[tuple(fields.items())].append(asset_id)
+        for tag in meta.tags:
+            by_tag[tag].append(asset_id)
+
+    failed: set[str] = set()
+    jobs: list[tuple[str, list[str], Callable[[list[str]], None]]] = []
+    for fields_key, asset_ids in by_fields.items():
+        values = dict(fields_key)
+        jobs.append((", ".join(values), asset_ids, partial(client.update_assets, **values)))
+    if by_tag:
+        try:
+            tag_ids = client.upsert_tags(sorted(by_tag))
+        except ImmichAPIError as ex:
+            logger.error(f"Creating {len(by_tag)} tag(s) failed: {ex}")
+            tag_ids = {}
+        for tag, asset_ids in by_tag.items():
+            if tag in tag_ids:
+                jobs.append((f"tag '{tag}'", asset_ids, partial(client.tag_assets, [tag_ids[tag]])))
+            else:
+                failed.update(asset_ids)
+
+    def run(job: tuple[str, list[str], Callable[[list[str]], None]]) -> list[str]:
+        what, asset_ids, update = job
+        failed_ids: list[str] = []
+        for chunk in _chunks(asset_ids):
+            try:
+                update(chunk)
+            except ImmichAPIError as ex:
+                logger.error(f"Setting {what} on {len(chunk)} asset(s) failed: {ex}")
+                failed_ids.extend(chunk)
+        return failed_ids
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata") as pool:
+        for failed_ids in pool.map(run, jobs):
+            failed.update(failed_ids)
+
+    done = [(path, mtime_ns) for path, asset_id, mtime_ns, _ in loaded if asset_id not in failed]
+    ledger.record_metadata(done)
+    if failed:
+        logger.error(f"Metadata of {len(failed)} asset(s) could not be pushed; retrying on the next run")
+    return len(done)
@@ -0,0 +1,61 @@
+"""Persistent watermarks for incremental Flickr syncs: when each user and album was last fully downloaded."""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+SYNC_STATE_FILENAME = ".flickr_sync_state.db"
+
+
+class SyncState:
+    """Per-user and per-album sync watermarks stored in the download directory.
+
+    A user's watermark is the start time of the last run that downloaded all of their albums without
+    failures. For every album, the ``date_update`` that Flickr reported when it was last downloaded
+    completely is stored as well. An album whose ``date_update`` is unchanged can then be skipped without
+    listing its photos.
+
+    Args:
+        db_path: SQLite database file (created if missing).
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, synced_at INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS albums ("
+            " album_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, date_update INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def user_watermark(self, user_id: str) -> int | None:
+        """Return the start time (Unix seconds) of the last complete sync of ``user_id``, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_user_watermark(self, user_id: str, synced_at: int) -> None:
+        """Record that every album of ``user_id`` was downloaded in a run that started at ``synced_at``."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?)", (user_id, synced_at))
+            self._conn.commit()
+
+    def album_date_update(self, album_id: str) -> int | None:
+        """Return the ``date_update`` recorded when the album was last downloaded completely, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT date_update FROM albums WHERE album_id = ?", (album_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def record_album(self, album_id: str, user_id: str, date_update: int) -> None:
+        """Record that the album in the state of ``date_update`` is completely on disk."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO albums VALUES (?, ?, ?)", (album_id, user_id, date_update))
+            self._conn.commit()
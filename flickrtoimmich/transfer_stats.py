@@ -0,0 +1,124 @@
+"""Throughput measured by earlier download and upload runs, used to estimate how long a planned transfer takes."""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from flickrtoimmich import metrics
+
+STATS_FILENAME = ".flickr_transfer_stats.json"
+
+# Number of recent runs per direction that the throughput is averaged over
+KEEP_RUNS = 10
+# Runs that moved less than this are dominated by API latency and not recorded
+MIN_BYTES = 16 * 1024 * 1024
+
+
+def fmt_size(size: float) -> str:
+    """Format a byte count into a human-readable size string.
+
+    Args:
+        size: Size in bytes.
+
+    Returns:
+        Formatted string such as ``"1.5 MB"`` or ``"320 B"``.
+    """
+    if size < 1024:
+        return f"{int(size)} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} TB"
+
+
+def fmt_duration(seconds: float) -> str:
+    """Format a duration such as ``"2h 05m"`` or ``"3m 20s"``."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+class TransferStats:
+    """Bytes and wall-clock seconds of the last :data:`KEEP_RUNS` runs per direction, kept in a JSON file.
+
+    Args:
+        path: Statistics file; created on the first :meth:`record`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def _load(self) -> dict[str, list[list[float]]]:
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as ex:
+            logger.warning(f"Ignoring unreadable transfer statistics {self.path}: {ex}")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def record(self, direction: str, n_bytes: float, seconds: float) -> None:
+        """Add a run that transferred ``n_bytes`` in ``seconds``, unless it was too small to be meaningful.
+
+        Args:
+            direction: ``"download"`` or ``"upload"``.
+            n_bytes: Bytes transferred.
+            seconds: Wall-clock duration of the run.
+        """
+        if n_bytes < MIN_BYTES or seconds <= 0:
+            return
+        data = self._load()
+        data[direction] = (data.get(direction, []) + [[n_bytes, seconds]])[-KEEP_RUNS:]
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(data))
+            os.replace(tmp, self.path)
+        except OSError as ex:
+            logger.warning(f"Could not save transfer statistics {self.path}: {ex}")
+
+    def throughput(self, direction: str) -> tuple[float, int] | None:
+        """Return the average throughput of the recorded runs.
+
+        Args:
+            direction: ``"download"`` or ``"upload"``.
+
+        Returns:
+            Bytes per second and the number of runs it is based on, or None if no run was recorded.
+        """
+        runs = self._load().get(direction) or []
+        n_bytes = sum(run[0] for run in runs)
+        seconds = sum(run[1] for run in runs)
+        return (n_bytes / seconds, len(runs)) if seconds > 0 else None
+
+    def estimate(self, direction: str, n_bytes: float) -> str:
+        """Describe how long transferring ``n_bytes`` will take at the recorded throughput.
+
+        Args:
+            direction: ``"download"`` or ``"upload"``.
+            n_bytes: Bytes to transfer.
+
+        Returns:
+            A human-readable estimate, or a note that no throughput has been measured yet.
+        """
+        measured = self.throughput(direction)
+        if measured is None:
+            return f"no {direction} throughput measured yet"
+        rate, runs = measured
+        return f"ETA ~{fmt_duration(n_bytes / rate)} at {fmt_size(rate)}/s (average of the last {runs} run(s))"
+
+
+def record_run(path: Path, direction: str, started: float) -> None:
+    """Record the bytes this process counted for ``direction`` since ``started`` (``time.monotonic``).
+
+    Args:
+        path: Statistics file.
+        direction: ``"download"`` or ``"upload"``.
+        started: Monotonic start time of the transfer.
+    """
+    TransferStats(path).record(direction, metrics.BYTES.value(direction=direction), time.monotonic() - started)
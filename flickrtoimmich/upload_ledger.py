@@ -0,0 +1,173 @@
+"""Persistent SQLite ledger of files that were already uploaded to Immich."""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+LEDGER_FILENAME = ".immich_upload_ledger.db"
+
+
+class UploadLedger:
+    """Record of successfully uploaded files, keyed by path, size and modification time.
+
+    Paths are stored relative to ``root`` so the ledger stays valid when the data directory is mounted at a
+    different location. A file counts as uploaded only while its size and ``mtime_ns`` match the recorded
+    values; a replaced or modified file is uploaded again.
+
+    The ledger also caches SHA-1 checksums keyed by ``(st_dev, st_ino, size, mtime_ns)`` so unchanged files
+    are hashed only once, even if they are renamed or hardlinked into several albums, and remembers the
+    Immich ID of every album it has attached assets to.
+
+    Args:
+        db_path: SQLite database file (created if missing).
+        root: Data directory that uploaded paths are relative to.
+    """
+
+    def __init__(self, db_path: Path, root: Path) -> None:
+        self.db_path = db_path
+        self.root = root
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " asset_id TEXT, uploaded_at TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checksums ("
+            " dev INTEGER NOT NULL, inode INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " sha1 TEXT NOT NULL, PRIMARY KEY (dev, inode))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS albums (name TEXT PRIMARY KEY, album_id TEXT NOT NULL)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")}
+        if "meta_mtime_ns" not in columns:
+            self._conn.execute("ALTER TABLE uploads ADD COLUMN meta_mtime_ns INTEGER")
+        self._conn.commit()
+
+    def _key(self, path: Path) -> str:
+        """Return the ledger key (path relative to the data directory) for ``path``."""
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def is_uploaded(self, path: Path, size: int, mtime_ns: int) -> bool:
+        """Check whether ``path`` was uploaded before and has not changed since.
+
+        Args:
+            path: File to check.
+            size: Current file size in bytes.
+            mtime_ns: Current modification time in nanoseconds.
+
+        Returns:
+            True if the ledger holds a matching entry.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns FROM uploads WHERE path = ?", (self._key(path),)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def record(self, entries: list[tuple[Path, str | None]]) -> None:
+        """Record successfully uploaded files.
+
+        Files deleted since their upload are left out; there is nothing left to skip on the next run.
+
+        Args:
+            entries: ``(path, asset_id)`` pairs; ``asset_id`` may be None when the upload engine does not
+                report it (CLI engine).
+        """
+        now = datetime.now(tz=timezone.utc).isoformat(timespec="seconds")
+        rows = []
+        for path, asset_id in entries:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                logger.warning(f"Uploaded file {path} no longer exists, not recording it")
+                continue
+            rows.append((self._key(path), st.st_size, st.st_mtime_ns, asset_id, now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO uploads (path, size, mtime_ns, asset_id, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def cached_checksum(self, stat: os.stat_result) -> str | None:
+        """Return the cached SHA-1 for a file if its inode, size and mtime are unchanged.
+
+        Args:
+            stat: ``stat`` result of the file.
+
+        Returns:
+            Hex SHA-1 digest, or None if not cached or stale.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha1 FROM checksums WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+                (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_checksums(self, entries: list[tuple[os.stat_result, str]]) -> None:
+        """Cache freshly computed checksums.
+
+        Args:
+            entries: ``(stat, sha1)`` pairs.
+        """
+        rows = [(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, sha1) for st, sha1 in entries]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def album_ids(self) -> dict[str, str]:
+        """Return the persisted album name-to-ID map.
+
+        Returns:
+            Mapping of album name to Immich album ID.
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, album_id FROM albums").fetchall())
+
+    def record_album(self, name: str, album_id: str) -> None:
+        """Persist the Immich ID of an album.
+
+        Args:
+            name: Album name.
+            album_id: Immich album ID.
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO albums VALUES (?, ?)", (name, album_id))
+            self._conn.commit()
+
+    def uploaded_assets(self) -> list[tuple[Path, str, int | None]]:
+        """Return every uploaded file with a known Immich asset ID.
+
+        Returns:
+            ``(path, asset_id, meta_mtime_ns)`` tuples; ``meta_mtime_ns`` is the modification time of the
+            sidecar whose metadata was last pushed to Immich, or None.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, asset_id, meta_mtime_ns FROM uploads WHERE asset_id IS NOT NULL"
+            ).fetchall()
+        return [(self.root / key, asset_id, meta) for key, asset_id, meta in rows]
+
+    def record_metadata(self, entries: list[tuple[Path, int]]) -> None:
+        """Record that sidecar metadata was pushed to Immich.
+
+        Args:
+            entries: ``(path, sidecar_mtime_ns)`` pairs for the uploaded media files.
+        """
+        rows = [(mtime_ns, self._key(path)) for path, mtime_ns in entries]
+        with self._lock:
+            self._conn.executemany("UPDATE uploads SET meta_mtime_ns = ? WHERE path = ?", rows)
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,29 @@
+"""Fixtures shared by the test modules."""
+
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler without access logging; tests subclass it and implement ``do_GET`` or ``do_HEAD``."""
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture()
+def handler() -> type[BaseHTTPRequestHandler]:
+    """Request handler class of :func:`server`; test modules override this fixture with their own handler."""
+    return QuietHandler
+
+
+@pytest.fixture()
+def server(handler: type[BaseHTTPRequestHandler]) -> Iterator[str]:
+    """Run a local HTTP server with ``handler`` and return its base URL."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
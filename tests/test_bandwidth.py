@@ -0,0 +1,89 @@
+"""Tests for the token-bucket bandwidth limiter."""
+
+import os
+import signal
+import time
+from pathlib import Path
+
+import pytest
+from loguru import logger
+
+from flickrtoimmich import bandwidth
+from flickrtoimmich.bandwidth import TokenBucket, parse_size
+
+
+def test_parse_size() -> None:
+    """Verify plain byte counts, unit suffixes and invalid input."""
+    assert parse_size("0") == 0
+    assert parse_size("5M") == 5 * 1024**2
+    assert parse_size("1.5kib") == 1536
+    for invalid in ("fast", "inf", "1e400", "nan", "-1"):
+        with pytest.raises(ValueError):
+            parse_size(invalid)
+
+
+def test_bucket_paces_after_burst() -> None:
+    """Verify the burst is granted at once and further bytes are paced at the configured rate."""
+    bucket = TokenBucket(rate=100_000, burst=10_000)
+    start = time.monotonic()
+    bucket.consume(10_000)
+    assert time.monotonic() - start < 0.05
+    bucket.consume(20_000)
+    assert time.monotonic() - start >= 0.18
+
+
+def test_unlimited_and_suspended_do_not_block() -> None:
+    """Verify a rate of 0 or a suspended limit never waits."""
+    start = time.monotonic()
+    TokenBucket().consume(10**9)
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.toggle_suspended()
+    bucket.consume(10**9)
+    assert time.monotonic() - start < 0.05
+
+
+def test_signal_while_consuming_does_not_deadlock() -> None:
+    """Verify SIGUSR1 toggles the limit even when it interrupts a thread holding the bucket's lock."""
+    bucket = TokenBucket(rate=1, burst=1)
+    previous = signal.getsignal(signal.SIGUSR1)
+    bucket.install_signal_handler()
+    try:
+        with bucket._lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            # The handler runs on this thread between bytecodes; give it a chance to do so
+            time.sleep(0.01)
+        assert not bucket.limited
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_control_file_reconfigures(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify rate and burst are picked up from the control file when it changes."""
+    monkeypatch.setattr(bandwidth, "CONTROL_POLL_INTERVAL", 0.0)
+    control = tmp_path / "bw"
+    control.write_text("2M 4M\n")
+    bucket = TokenBucket(control_file=control)
+    bucket.consume(1)
+    assert (bucket.rate, bucket.burst) == (2 * 1024**2, 4 * 1024**2)
+    control.write_text("off\n")
+    os.utime(control, ns=(0, 1))
+    bucket.consume(1)
+    assert not bucket.limited
+
+
+def test_configure_logs_only_changes() -> None:
+    """Verify reapplying the current limit, including "unlimited", is not logged as a change."""
+    messages: list[str] = []
+    bucket = TokenBucket()
+    sink = logger.add(messages.append, format="{message}")
+    try:
+        bucket.configure(0)
+        bucket.configure(1000)
+        bucket.configure(1000, 1000)
+        bucket.configure(0)
+    finally:
+        logger.remove(sink)
+    assert [m.strip() for m in messages] == [
+        "Bandwidth limit set to 1000 B/s (burst 1000 B)",
+        "Bandwidth limit disabled",
+    ]
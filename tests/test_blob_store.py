@@ -0,0 +1,46 @@
+"""Tests for the shared photo store."""
+
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from flickrtoimmich.blob_store import BlobStore
+
+
+def test_place_falls_back_to_symlinks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a relative symlink is created where hardlinks are refused, and stored photos are not fetched again."""
+
+    def refuse(src: object, dst: object) -> None:
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", refuse)
+    store = BlobStore(tmp_path / "blobs")
+    fetched: list[str] = []
+
+    def fetch(path: str) -> None:
+        fetched.append(path)
+        Path(path).write_bytes(b"data")
+
+    album = tmp_path / "album"
+    album.mkdir()
+    assert store.place("12345", "Original", str(album / "a.jpg"), fetch) is True
+    assert store.place("12345", "Original", str(album / "b.jpg"), fetch) is False
+
+    assert fetched == [str(tmp_path / "blobs" / "45" / "12345_Original.jpg")]
+    assert os.readlink(album / "b.jpg") == os.path.join("..", "blobs", "45", "12345_Original.jpg")
+    assert (album / "b.jpg").read_bytes() == b"data"
+
+
+def test_failed_download_leaves_nothing_behind(tmp_path: Path) -> None:
+    """Verify a failed fetch creates neither a blob nor an album file."""
+    store = BlobStore(tmp_path / "blobs")
+
+    def fail(path: str) -> None:
+        raise OSError("HTTP Error 404: Not Found")
+
+    with pytest.raises(OSError):
+        store.place("1", None, str(tmp_path / "a.jpg"), fail)
+    assert not store.blob_path("1", None, ".jpg").exists()
+    assert not (tmp_path / "a.jpg").exists()
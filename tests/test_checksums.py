@@ -0,0 +1,37 @@
+"""Tests for parallel SHA-1 hashing and the ledger checksum cache."""
+
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from flickrtoimmich import checksums
+from flickrtoimmich.upload_ledger import UploadLedger
+
+
+def test_compute_checksums_matches_hashlib(tmp_path: Path) -> None:
+    """Verify digests match a plain hashlib SHA-1 of the file contents."""
+    files = []
+    for i in range(4):
+        f = tmp_path / f"f{i}.jpg"
+        f.write_bytes(bytes([i]) * (checksums.CHUNK_SIZE + i))
+        files.append(f)
+    result = checksums.compute_checksums(files)
+    assert result == {f: hashlib.sha1(f.read_bytes()).hexdigest() for f in files}
+
+
+def test_cached_checksums_are_reused(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify unchanged files are not re-hashed once their checksum is in the ledger."""
+    f = tmp_path / "a.jpg"
+    f.write_bytes(b"abc")
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    try:
+        first = checksums.compute_checksums([f], ledger)
+
+        def fail(path: Path) -> str:
+            raise AssertionError(f"{path} hashed again")
+
+        monkeypatch.setattr(checksums, "sha1_file", fail)
+        assert checksums.compute_checksums([f], ledger) == first
+    finally:
+        ledger.close()
@@ -0,0 +1,71 @@
+"""Tests for parsing and multiplexing immich CLI output."""
+
+import sys
+import threading
+from pathlib import Path
+
+from flickrtoimmich.cli_output import CliEvent, CliResult, OutputMultiplexer, parse_line
+
+
+def test_parse_line_extracts_results() -> None:
+    """Verify summary and per-file failure lines become events and other output is ignored."""
+    assert parse_line("Found 3 new files and 2 duplicates") == [CliEvent("duplicate", 2)]
+    assert parse_line("Found 1 new file and 0 duplicates") == []
+    assert parse_line("Successfully uploaded 3 new assets (12.3 MB)") == [CliEvent("created", 3)]
+    assert parse_line('Unable to upload "/data/A/x.jpg": Bad Request') == [
+        CliEvent("failed", 1, "/data/A/x.jpg", "Bad Request")
+    ]
+    assert parse_line("  - /data/A/y.jpg - Error: timeout") == [
+        CliEvent("failed", 1, item="/data/A/y.jpg - Error: timeout")
+    ]
+    assert parse_line("Crawling for assets...") == []
+
+
+def test_failed_files_ignores_unknown_paths(tmp_path: Path) -> None:
+    """Verify only failures naming a file of the batch are attributed to it."""
+    files = [tmp_path / "a.jpg", tmp_path / "b.jpg"]
+    result = CliResult(1, [CliEvent("failed", 1, str(files[1]), "boom"), CliEvent("failed", 1, "/other.jpg", "x")])
+    assert result.failed_files(files) == {files[1]: "boom"}
+    assert result.unattributed_failures(files) == ["/other.jpg: x"]
+
+
+def test_failed_item_paths_may_contain_the_separator(tmp_path: Path) -> None:
+    """Verify a failure list item is split at the end of the batch file it names, not at the first " - "."""
+    album = tmp_path / "Paris - 2015"
+    files = [album / "IMG 1.jpg", album / "IMG 1.jpg - copy.jpg"]
+    events = [
+        *parse_line(f"  - {files[0]} - Error: timeout"),
+        *parse_line(f"  - {files[1]} - Error: unsupported"),
+        *parse_line(f"  - {album}/other.jpg - Error: gone"),
+    ]
+    result = CliResult(0, events)
+    assert result.failed_files(files) == {files[0]: "Error: timeout", files[1]: "Error: unsupported"}
+    assert result.unattributed_failures(files) == [f"{album}/other.jpg - Error: gone"]
+
+
+def test_multiplexer_serves_concurrent_processes() -> None:
+    """Verify one multiplexer delivers complete lines of several processes and their exit codes."""
+    mux = OutputMultiplexer()
+    script = (
+        "import sys\n"
+        "for i in range(500): print(f'{sys.argv[1]} out {i}')\n"
+        "sys.stdout.flush()\n"
+        "sys.stderr.write(sys.argv[1] + ' err\\rpartial')\n"
+        "sys.exit(int(sys.argv[2]))\n"
+    )
+    lines: dict[str, list[tuple[str, str]]] = {}
+    codes: dict[str, int] = {}
+
+    def run(name: str, rc: int) -> None:
+        got = lines.setdefault(name, [])
+        codes[name] = mux.run([sys.executable, "-c", script, name, str(rc)], lambda s, line: got.append((s, line)))
+
+    threads = [threading.Thread(target=run, args=(f"p{i}", i)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+    assert codes == {f"p{i}": i for i in range(4)}
+    for name, got in lines.items():
+        assert [line for s, line in got if s == "stdout"] == [f"{name} out {i}" for i in range(500)]
+        assert [line for s, line in got if s == "stderr"] == [f"{name} err", "partial"]
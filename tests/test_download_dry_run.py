@@ -0,0 +1,15 @@
+"""Tests for the download dry-run."""
+
+import time
+
+from flickrtoimmich.download_dry_run import _ordered_map
+
+
+def test_ordered_map_yields_in_input_order() -> None:
+    """Verify results come out in input order even when later items finish first."""
+
+    def slow_for_small(n: int) -> int:
+        time.sleep(0.01 * (5 - n))
+        return n * n
+
+    assert list(_ordered_map(slow_for_small, range(5), workers=3)) == [(n, n * n) for n in range(5)]
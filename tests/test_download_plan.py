@@ -0,0 +1,78 @@
+"""Tests for download planning."""
+
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import flickr_api.method_call as _mc
+import pytest
+
+from flickrtoimmich import download_plan
+from flickrtoimmich.download_plan import SizeProbe, plan_album
+from flickrtoimmich.flickr_listing import PhotoRecord
+from tests.conftest import QuietHandler
+
+
+class _Handler(QuietHandler):
+    """Answers ``HEAD /<n>`` with a ``Content-Length`` of n; ``/missing`` answers 404."""
+
+    def do_HEAD(self) -> None:
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", self.path.strip("/"))
+        self.end_headers()
+
+
+@pytest.fixture()
+def handler() -> type[QuietHandler]:
+    """Serve the fake Flickr CDN."""
+    return _Handler
+
+
+def _photo(photo_id: str, url_o: str | None, media: str = "photo") -> PhotoRecord:
+    return PhotoRecord(photo_id, f"P{photo_id}", media, "", 0, url_o, None, None)
+
+
+def test_plan_album_measures_files_still_to_download(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, server: str
+) -> None:
+    """Verify recorded photos are left out, originals are probed directly and videos via getSizes."""
+    photos = [
+        _photo("1", f"{server}/1000"),
+        _photo("2", f"{server}/2000"),
+        _photo("3", None, media="video"),
+        _photo("4", f"{server}/missing"),
+    ]
+    monkeypatch.setattr(download_plan, "iter_photoset_photos", lambda photoset_id: iter(photos))
+    sizes_calls: list[str] = []
+
+    def fake_call_api(**args: Any) -> dict[str, Any]:
+        sizes_calls.append(args["photo_id"])
+        if args["photo_id"] == "4":
+            return {"sizes": {"size": []}}
+        video = [
+            {"label": "Video Player", "media": "video", "source": f"{server}/1", "width": 0, "height": 0},
+            {"label": "Video Original", "media": "video", "source": f"{server}/5000", "width": 1, "height": 1},
+            {"label": "Large", "media": "photo", "source": f"{server}/9", "width": 9, "height": 9},
+        ]
+        return {"sizes": {"size": video}}
+
+    monkeypatch.setattr(_mc, "call_api", fake_call_api)
+    album_dir = tmp_path / "My_Album"
+    album_dir.mkdir()
+    with sqlite3.connect(album_dir / ".metadata.db") as conn:
+        conn.execute("CREATE TABLE downloads (photo_id text, size_label text, suffix text)")
+        conn.execute("INSERT INTO downloads VALUES ('2', '', '')")
+
+    probe = SizeProbe(workers=4)
+    try:
+        plan = plan_album("set1", "My/Album", probe, backup_dir=tmp_path)
+    finally:
+        probe.close()
+
+    assert [(p.id, size) for p, size in plan.files] == [("1", 1000), ("3", 5000), ("4", None)]
+    assert plan.already_downloaded == 1
+    assert (plan.n_bytes, plan.unknown) == (6000, 1)
+    assert sorted(sizes_calls) == ["3", "4"]
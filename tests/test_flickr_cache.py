@@ -0,0 +1,107 @@
+"""Tests for the persistent Flickr API response cache."""
+
+import time
+from pathlib import Path
+from typing import Any
+
+import flickr_api
+import flickr_api.method_call as _mc
+import pytest
+import requests
+
+from flickrtoimmich import flickr_cache
+from flickrtoimmich.flickr_cache import DAY, HOUR, ResponseCache, method_ttl
+
+
+def _response(body: bytes = b'{"stat": "ok"}', status: int = 200) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    return resp
+
+
+def _key(method: str, **args: str) -> str:
+    return "&".join(f"{k}={v}" for k, v in {"method": method, "api_key": "k", **args}.items())
+
+
+def test_method_ttl() -> None:
+    """Verify per-method TTLs, the default for other reads, and that writes are never cached."""
+    assert method_ttl("flickr.people.findByUrl") == 7 * DAY
+    assert method_ttl("flickr.photosets.getPhotos") == HOUR
+    assert method_ttl("flickr.galleries.getList") == HOUR
+    assert method_ttl("flickr.photosets.addPhoto") == 0
+    assert method_ttl("flickr.photos.search") == 0
+    assert method_ttl("flickr.test.echo") == 0
+
+
+def test_entries_expire_and_failures_are_not_stored(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify hits survive reopening the file until the TTL runs out, and errors and writes go to Flickr."""
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ResponseCache(tmp_path / "cache.db")
+    cache.set(_key("flickr.photosets.getList"), _response(b'{"stat": "ok", "photosets": []}'))
+    cache.set(_key("flickr.photosets.getInfo"), _response(b'{"stat": "fail", "code": 1}'))
+    cache.set(_key("flickr.photosets.getPhotos"), _response(status=500))
+    cache.set(_key("flickr.photosets.create"), _response())
+    cache.close()
+
+    cache = ResponseCache(tmp_path / "cache.db")
+    hit = cache.get(_key("flickr.photosets.getList"))
+    assert hit is not None and hit.json() == {"stat": "ok", "photosets": []}
+    assert _key("flickr.photosets.getList") in cache
+    for method in ("flickr.photosets.getInfo", "flickr.photosets.getPhotos", "flickr.photosets.create"):
+        assert _key(method) not in cache
+    now[0] += HOUR
+    assert cache.get(_key("flickr.photosets.getList")) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify the size limit evicts the entries that were used longest ago."""
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    body = b'{"stat": "ok", "pad": "' + b"x" * 80 + b'"}'
+    cache = ResponseCache(tmp_path / "cache.db", max_bytes=3 * len(body))
+    for page in "123":
+        now[0] += 1
+        cache.set(_key("flickr.photosets.getPhotos", page=page), _response(body))
+    now[0] += 1
+    assert cache.get(_key("flickr.photosets.getPhotos", page="1")) is not None
+    now[0] += 1
+    cache.set(_key("flickr.photosets.getPhotos", page="4"), _response(body))
+
+    kept = [p for p in "1234" if _key("flickr.photosets.getPhotos", page=p) in cache]
+    assert kept == ["1", "4"]
+
+
+def test_install_answers_repeated_calls_from_disk(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify ``flickr_api`` calls are sent once and later answered from the cache file named in the environment."""
+    monkeypatch.setattr(_mc, "CACHE", None)
+    monkeypatch.setattr(_mc, "requests", requests)
+    monkeypatch.setenv(flickr_cache.CACHE_ENV, str(tmp_path / "api.db"))
+    flickr_api.set_keys("key", "secret")
+    sent: list[dict[str, Any]] = []
+
+    def fake_post(url: str, data: dict[str, Any], **kwargs: Any) -> requests.Response:
+        sent.append(dict(data))
+        return _response(b'{"stat": "ok", "user": {"id": "1"}}')
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    for _ in range(2):
+        flickr_cache.install()
+        assert _mc.call_api(method="flickr.urls.lookupUser", url="https://flickr.com/photos/x")["user"]["id"] == "1"
+    assert len(sent) == 1
+    assert (tmp_path / "api.db").exists()
+
+    monkeypatch.setenv(flickr_cache.MAX_MB_ENV, "0")
+    assert flickr_cache.install() is None
+
+
+def test_forget_drops_responses_for_an_argument(tmp_path: Path) -> None:
+    """Verify only responses of calls with exactly the given argument value are dropped."""
+    cache = ResponseCache(tmp_path / "cache.db")
+    for photo_id in ("1", "12"):
+        cache.set(_key("flickr.photos.getInfo", photo_id=photo_id), _response())
+    cache.set(_key("flickr.photos.getAllContexts", photo_id="1"), _response())
+
+    assert cache.forget("photo_id", ["1"]) == 2
+    assert _key("flickr.photos.getInfo", photo_id="12") in cache
@@ -0,0 +1,35 @@
+"""Tests for the bulk photoset listing."""
+
+from typing import Any
+
+import flickr_api.method_call as _mc
+import pytest
+
+from flickrtoimmich.flickr_listing import PhotoRecord, iter_photoset_photos
+
+
+def test_iter_photoset_photos_fetches_whole_pages(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify one call per page with the extras, and records built from the page entries."""
+    calls: list[dict[str, Any]] = []
+
+    def fake_call_api(**args: Any) -> dict[str, Any]:
+        calls.append(args)
+        page, per_page = int(args["page"]), int(args["per_page"])
+        ids = range((page - 1) * per_page, min(page * per_page, 5))
+        # Flickr sends the dimensions as strings or numbers
+        photos: list[dict[str, Any]] = [
+            {"id": str(i), "title": f"P{i}", "media": "photo", "lastupdate": "17"} for i in ids
+        ]
+        if page == 1:
+            photos[0].update(media="video", datetaken="2020-01-02 03:04:05", url_o="https://x/0_o.mp4")
+            photos[0].update(width_o="1920", height_o=1080)
+        return {"photoset": {"photo": photos, "page": page, "pages": 3, "total": "5"}}
+
+    monkeypatch.setattr(_mc, "call_api", fake_call_api)
+    photos = list(iter_photoset_photos("set1", per_page=2))
+
+    assert [p.id for p in photos] == ["0", "1", "2", "3", "4"]
+    assert [c["page"] for c in calls] == ["1", "2", "3"]
+    assert calls[0]["extras"] == "media,date_taken,last_update,url_o,o_dims"
+    assert photos[0] == PhotoRecord("0", "P0", "video", "2020-01-02 03:04:05", 17, "https://x/0_o.mp4", 1920, 1080)
+    assert photos[1] == PhotoRecord("1", "P1", "photo", "", 17, None, None, None)
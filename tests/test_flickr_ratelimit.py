@@ -0,0 +1,84 @@
+"""Tests for Flickr API pacing and Retry-After handling."""
+
+import time
+from collections.abc import Iterator
+from email.utils import formatdate
+from typing import Any
+
+import flickr_api
+import flickr_api.api as _api
+import flickr_api.method_call as _mc
+import pytest
+import requests
+
+from flickrtoimmich import flickr_ratelimit
+from flickrtoimmich.flickr_ratelimit import CallPacer, RateLimited, parse_retry_after, retrying
+
+
+def test_parse_retry_after() -> None:
+    """Verify delta-seconds and HTTP-date values are accepted and garbage is ignored."""
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30  # type: ignore[operator]
+
+
+def test_retrying_waits_and_gives_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a rate-limited call is retried after the server's delay and re-raised once retries run out."""
+    sleeps: list[float] = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    attempts: Iterator[Exception | str] = iter([RateLimited(7), RateLimited(None), "ok"])
+
+    def call() -> str:
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setenv("BACKOFF_BASE", "10")
+    assert retrying(call, "test") == "ok"
+    assert sleeps == [7, 20]
+    with pytest.raises(RateLimited):
+        retrying(lambda: (_ for _ in ()).throw(RateLimited(1)), "test", max_retries=0)
+
+
+def test_pacer_spaces_calls_after_burst(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify calls beyond the burst wait for the hourly rate."""
+    now = [0.0]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(time, "sleep", sleep)
+    pacer = CallPacer(calls_per_hour=3600, burst=2)
+    pacer.acquire()
+    pacer.acquire()
+    assert sleeps == []
+    pacer.acquire()
+    assert sleeps == [pytest.approx(1.0)]
+
+
+def test_install_retries_rate_limited_api_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a 429 from the REST endpoint is retried with a freshly signed call."""
+    for module, name in ((_mc, "requests"), (_mc, "call_api"), (_api, "call_api")):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    monkeypatch.setattr(_mc, "CACHE", None)
+    flickr_api.set_keys("key", "secret")
+    sent: list[dict[str, Any]] = []
+
+    def fake_post(url: str, data: dict[str, Any], **kwargs: Any) -> requests.Response:
+        sent.append(dict(data))
+        resp = requests.Response()
+        resp.status_code = 429 if len(sent) == 1 else 200
+        resp.headers["Retry-After"] = "1"
+        resp._content = b'{"stat": "ok", "echo": "hi"}'
+        return resp
+
+    monkeypatch.setattr(requests, "post", fake_post)
+    flickr_ratelimit.install(CallPacer(calls_per_hour=0))
+    assert _mc.call_api(method="flickr.test.echo")["echo"] == "hi"
+    assert len(sent) == 2
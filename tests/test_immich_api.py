@@ -0,0 +1,26 @@
+"""Tests for the Immich REST API client helpers."""
+
+from flickrtoimmich.immich_api import ImmichClient, _iso_timestamp, _normalize_base_url
+
+
+def test_normalize_base_url() -> None:
+    """Verify that the ``/api`` suffix is appended exactly once."""
+    assert _normalize_base_url("https://immich.example.com") == "https://immich.example.com/api"
+    assert _normalize_base_url("https://immich.example.com/") == "https://immich.example.com/api"
+    assert _normalize_base_url("https://immich.example.com/api/") == "https://immich.example.com/api"
+
+
+def test_iso_timestamp() -> None:
+    """Verify timestamps are rendered as UTC with millisecond precision."""
+    assert _iso_timestamp(0) == "1970-01-01T00:00:00.000Z"
+    assert _iso_timestamp(1.5) == "1970-01-01T00:00:01.500Z"
+
+
+def test_client_sets_api_key_header() -> None:
+    """Verify the API key is sent on every request of the shared session."""
+    client = ImmichClient("https://immich.example.com", "secret")
+    try:
+        assert client.base_url == "https://immich.example.com/api"
+        assert client.session.headers["x-api-key"] == "secret"
+    finally:
+        client.close()
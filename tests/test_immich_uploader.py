@@ -0,0 +1,415 @@
+"""Tests for the batched Immich uploader."""
+
+import argparse
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from flickrtoimmich import immich_uploader
+from flickrtoimmich.cli_output import CliEvent, CliResult, parse_line
+from flickrtoimmich.immich_api import ImmichAPIError
+from flickrtoimmich.upload_ledger import UploadLedger
+
+
+def _make_tree(root: Path) -> None:
+    """Create two album directories with a handful of files each."""
+    for album, count in (("Album A", 5), ("Album B", 3)):
+        (root / album).mkdir()
+        for i in range(count):
+            (root / album / f"img{i}.jpg").write_bytes(b"x" * (i + 1))
+        (root / album / "img0.jpg.json").write_text("{}")
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_main_uploads_every_file_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int) -> None:
+    """Verify serial and concurrent runs submit every matching file exactly once."""
+    _make_tree(tmp_path)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    calls: list[tuple[str, list[Path]]] = []
+    lock = threading.Lock()
+
+    def fake_upload(files: list[Path], album: str, client: object = None, ledger: object = None, *_: object) -> bool:
+        with lock:
+            calls.append((album, list(files)))
+        return True
+
+    monkeypatch.setattr(immich_uploader, "upload_batch", fake_upload)
+    code = immich_uploader.main(batch_size=2, extensions={".jpg"}, engine="cli", workers=workers, use_ledger=False)
+
+    assert code == 0
+    uploaded = sorted(str(f) for _, files in calls for f in files)
+    assert uploaded == sorted(str(f) for f in tmp_path.rglob("*.jpg"))
+    assert len(calls) == 5
+    assert {album for album, _ in calls} == {"Album A", "Album B"}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_unexpected_batch_error_quarantines_the_batch(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int
+) -> None:
+    """Verify an unexpected exception fails only its batch, whose files are quarantined, and the run goes on."""
+    _make_tree(tmp_path)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    uploaded: list[Path] = []
+    lock = threading.Lock()
+
+    def fake_upload(files: list[Path], album: str, *_: object) -> bool:
+        if album == "Album B":
+            raise KeyError("results")
+        with lock:
+            uploaded.extend(files)
+        return True
+
+    monkeypatch.setattr(immich_uploader, "upload_batch", fake_upload)
+    code = immich_uploader.main(batch_size=2, extensions={".jpg"}, engine="cli", workers=workers, use_ledger=False)
+
+    assert code == 1
+    assert sorted(uploaded) == sorted((tmp_path / "Album A").glob("*.jpg"))
+    report = (tmp_path / immich_uploader.QUARANTINE_FILENAME).read_text().splitlines()
+    assert sorted(line.split("\t")[0] for line in report) == sorted(
+        str(f) for f in (tmp_path / "Album B").glob("*.jpg")
+    )
+
+
+def test_ledger_skips_files_deleted_after_upload(tmp_path: Path) -> None:
+    """Verify recording an uploaded file that was deleted meanwhile records the rest instead of failing."""
+    kept, gone = tmp_path / "kept.jpg", tmp_path / "gone.jpg"
+    kept.write_bytes(b"x")
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    try:
+        ledger.record([(gone, "a1"), (kept, "a2")])
+        assert ledger.is_uploaded(kept, 1, kept.stat().st_mtime_ns)
+    finally:
+        ledger.close()
+
+
+def test_rerun_skips_files_in_ledger(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a second run only uploads files that are new or changed since the first run."""
+    _make_tree(tmp_path)
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    calls: list[Path] = []
+
+    def fake_upload(
+        files: list[Path], album: str, client: object = None, ledger: UploadLedger | None = None, *_: object
+    ) -> bool:
+        calls.extend(files)
+        assert ledger is not None
+        ledger.record([(f, None) for f in files])
+        return True
+
+    monkeypatch.setattr(immich_uploader, "upload_batch", fake_upload)
+    immich_uploader.main(batch_size=2, extensions={".jpg"}, engine="cli")
+    assert len(calls) == 8
+
+    calls.clear()
+    (tmp_path / "Album B" / "img0.jpg").write_bytes(b"changed")
+    (tmp_path / "Album B" / "new.jpg").write_bytes(b"new")
+    immich_uploader.main(batch_size=2, extensions={".jpg"}, engine="cli")
+    assert sorted(f.name for f in calls) == ["img0.jpg", "new.jpg"]
+
+
+def test_batch_bytes_packs_by_size(tmp_path: Path) -> None:
+    """Verify batches close before exceeding the byte target and oversized files travel alone."""
+    album = tmp_path / "album"
+    album.mkdir()
+    for name, size in (("a.jpg", 40), ("b.jpg", 40), ("c.jpg", 40), ("d.mp4", 500), ("e.jpg", 10), ("f.jpg", 10)):
+        (album / name).write_bytes(b"x" * size)
+    totals = immich_uploader.ScanTotals()
+    batches = list(immich_uploader.iter_batches(tmp_path, {".jpg", ".mp4"}, 3, None, totals, batch_bytes=100))
+    assert [[sf.path.name for sf in b.files] for b in batches] == [
+        ["a.jpg", "b.jpg"],
+        ["c.jpg"],
+        ["d.mp4"],
+        ["e.jpg", "f.jpg"],
+    ]
+    assert totals.done and totals.batches == 4
+
+
+@pytest.mark.parametrize(("value", "expected"), [("512", 512), ("64K", 65536), ("1.5M", 1572864), ("2GiB", 2 << 30)])
+def test_parse_size(value: str, expected: int) -> None:
+    """Verify size arguments accept plain byte counts and binary unit suffixes."""
+    assert immich_uploader._parse_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "inf", "1e400", "many"])
+def test_parse_size_rejects_invalid_sizes(value: str) -> None:
+    """Verify zero, non-finite and malformed sizes become usage errors instead of tracebacks."""
+    with pytest.raises(argparse.ArgumentTypeError):
+        immich_uploader._parse_size(value)
+
+
+class _FakeAlbumClient:
+    """Records album calls; album ``"gone"`` is rejected like an album deleted on the server."""
+
+    def __init__(self) -> None:
+        self.albums: dict[str, str] = {}
+        self.adds: list[tuple[str, list[str]]] = []
+
+    def prime_albums(self, albums: dict[str, str]) -> None:
+        self.albums.update(albums)
+
+    def forget_album(self, name: str) -> None:
+        self.albums.pop(name, None)
+
+    def get_or_create_album(self, name: str) -> str:
+        return self.albums.setdefault(name, f"id-{name}")
+
+    def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> None:
+        if album_id == "gone":
+            raise ImmichAPIError("HTTP 400")
+        self.adds.append((album_id, asset_ids))
+
+
+def test_album_attacher_bulk_adds_and_persists_ids(tmp_path: Path) -> None:
+    """Verify assets are attached per album in bulk and stale persisted album IDs are re-resolved."""
+    files = []
+    for i in range(5):
+        f = tmp_path / f"{i}.jpg"
+        f.write_bytes(b"x")
+        files.append(f)
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    try:
+        ledger.record_album("A", "gone")
+        client = _FakeAlbumClient()
+        attacher = immich_uploader.AlbumAttacher(client, ledger, flush_every=3)  # type: ignore[arg-type]
+        assert attacher.add("A", [(files[0], "a0"), (files[1], "a1")])
+        assert client.adds == []
+        assert attacher.add("A", [(files[2], "a2")])
+        assert client.adds == [("id-A", ["a0", "a1", "a2"])]
+        attacher.add("B", [(files[3], "b0"), (files[4], "b1")])
+        assert attacher.flush_idle({"B"})
+        assert len(client.adds) == 1
+        assert attacher.flush_idle(set())
+        assert client.adds[-1] == ("id-B", ["b0", "b1"])
+        assert ledger.album_ids() == {"A": "id-A", "B": "id-B"}
+        assert all(ledger.is_uploaded(f, 1, f.stat().st_mtime_ns) for f in files)
+    finally:
+        ledger.close()
+
+
+def test_cli_failure_is_bisected_to_the_bad_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a failing CLI batch is split until the bad file is isolated and the rest is still uploaded."""
+    files = []
+    for i in range(6):
+        f = tmp_path / ("bad.jpg" if i == 4 else f"{i}.jpg")
+        f.write_bytes(b"x")
+        files.append(f)
+    runs: list[int] = []
+
+    def fake_cli(batch: list[Path], album: str) -> CliResult:
+        runs.append(len(batch))
+        return CliResult(1 if any(f.name == "bad.jpg" for f in batch) else 0, [])
+
+    monkeypatch.setattr(immich_uploader, "_run_cli_upload", fake_cli)
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    quarantine = immich_uploader.Quarantine()
+    try:
+        assert not immich_uploader.upload_batch(files, "album", ledger=ledger, quarantine=quarantine)
+        uploaded = [f for f in files if ledger.is_uploaded(f, 1, f.stat().st_mtime_ns)]
+    finally:
+        ledger.close()
+    assert uploaded == [f for f in files if f.name != "bad.jpg"]
+    assert [p.name for p, _ in quarantine.entries] == ["bad.jpg"]
+    assert runs == [6, 3, 3, 1, 2, 1, 1]
+
+    report = tmp_path / "quarantine.tsv"
+    quarantine.write(report)
+    assert report.read_text().startswith(f"{files[4]}\timmich CLI exited with code 1")
+
+
+def test_cli_reported_failures_are_quarantined_without_bisecting(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verify files the CLI names as failed are quarantined and the rest recorded after a single run."""
+    files = []
+    for i in range(4):
+        f = tmp_path / f"{i}.jpg"
+        f.write_bytes(b"x")
+        files.append(f)
+    runs: list[int] = []
+
+    def fake_cli(batch: list[Path], album: str) -> CliResult:
+        runs.append(len(batch))
+        return CliResult(1, [CliEvent("created", 3), CliEvent("failed", 1, str(files[2]), "unsupported")])
+
+    monkeypatch.setattr(immich_uploader, "_run_cli_upload", fake_cli)
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    quarantine = immich_uploader.Quarantine()
+    try:
+        assert not immich_uploader.upload_batch(files, "album", ledger=ledger, quarantine=quarantine)
+        uploaded = [f for f in files if ledger.is_uploaded(f, 1, f.stat().st_mtime_ns)]
+    finally:
+        ledger.close()
+    assert runs == [4]
+    assert uploaded == [files[0], files[1], files[3]]
+    assert quarantine.entries == [(files[2], "unsupported")]
+
+
+class _FakeUploadClient(_FakeAlbumClient):
+    """Knows no assets up front; uploads of files named ``fail*`` are rejected once."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.checked: list[str] = []
+        self.sent: list[str] = []
+        self._lock = threading.Lock()
+
+    def bulk_upload_check(self, checksums: dict[str, str]) -> dict[str, dict[str, str]]:
+        with self._lock:
+            self.checked.extend(checksums.values())
+        return {}
+
+    def upload_asset(self, path: Path, checksum: str | None = None) -> dict[str, str]:
+        with self._lock:
+            self.sent.append(path.name)
+            if path.name.startswith("fail") and self.sent.count(path.name) == 1:
+                raise ImmichAPIError("HTTP 500")
+        return {"id": f"asset-{path.read_bytes().decode()}", "status": "created"}
+
+
+def test_same_content_is_uploaded_once_and_added_to_every_album(tmp_path: Path) -> None:
+    """Verify a photo in several album directories is sent once and its asset attached to each album."""
+    for album, names in (("A", ("x", "y")), ("B", ("x", "z")), ("C", ("x",))):
+        (tmp_path / album).mkdir()
+        for name in names:
+            (tmp_path / album / f"{name}.jpg").write_text(name)
+    client = _FakeUploadClient()
+    attacher = immich_uploader.AlbumAttacher(client)  # type: ignore[arg-type]
+    assets = immich_uploader.AssetRegistry()
+
+    def upload(album: str) -> bool:
+        files = sorted((tmp_path / album).iterdir())
+        fake: Any = client
+        return immich_uploader.upload_batch(files, album, fake, None, attacher, None, assets)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert all(pool.map(upload, "ABC"))
+    assert attacher.flush_idle(set())
+
+    assert sorted(client.sent) == ["x.jpg", "y.jpg", "z.jpg"]
+    assert len(client.checked) == 3
+    added = {album_id: sorted(ids) for album_id, ids in client.adds}
+    assert added == {
+        "id-A": ["asset-x", "asset-y"],
+        "id-B": ["asset-x", "asset-z"],
+        "id-C": ["asset-x"],
+    }
+
+
+def test_content_of_a_failed_upload_is_sent_by_the_waiting_batch(tmp_path: Path) -> None:
+    """Verify a batch waiting for the same content sends the file itself when the other upload fails."""
+    for album in "AB":
+        (tmp_path / album).mkdir()
+        (tmp_path / album / "fail.jpg").write_text("f")
+    client = _FakeUploadClient()
+    first_claim = threading.Event()
+    second_claim = threading.Event()
+
+    class _Registry(immich_uploader.AssetRegistry):
+        def claim(self, checksum: str) -> "Future[str | None] | None":
+            fut = super().claim(checksum)
+            (first_claim if fut is None else second_claim).set()
+            return fut
+
+    assets = _Registry()
+    upload_asset = client.upload_asset
+
+    def slow_upload(path: Path, checksum: str | None = None) -> dict[str, str]:
+        if path.parent.name == "A":
+            # Fail only once batch B is waiting for this content
+            assert second_claim.wait(5)
+        return upload_asset(path, checksum)
+
+    client.upload_asset = slow_upload  # type: ignore[method-assign]
+
+    def upload(album: str) -> bool:
+        return immich_uploader.upload_batch(
+            [tmp_path / album / "fail.jpg"], album, client, None, None, None, assets  # type: ignore[arg-type]
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(upload, "A")
+        assert first_claim.wait(5)
+        second = pool.submit(upload, "B")
+        assert (first.result(), second.result()) == (False, True)
+    assert client.sent == ["fail.jpg", "fail.jpg"]
+    assert ("id-B", ["asset-f"]) in client.adds
+
+
+def test_failed_duplicate_check_still_attaches_content_claimed_elsewhere(tmp_path: Path) -> None:
+    """Verify a failed duplicate check quarantines the batch's own files and still waits for shared ones."""
+    (tmp_path / "A").mkdir()
+    x, y = tmp_path / "A" / "x.jpg", tmp_path / "A" / "y.jpg"
+    x.write_text("x")
+    y.write_text("y")
+    client = _FakeUploadClient()
+
+    def failing_check(checksums: dict[str, str]) -> dict[str, dict[str, str]]:
+        raise ImmichAPIError("HTTP 503")
+
+    client.bulk_upload_check = failing_check  # type: ignore[method-assign]
+    released = threading.Event()
+
+    class _Registry(immich_uploader.AssetRegistry):
+        def resolve(self, checksum: str, asset_id: str | None) -> None:
+            super().resolve(checksum, asset_id)
+            if asset_id is None:
+                released.set()
+
+    assets = _Registry()
+    # Another batch is still uploading the content of x.jpg
+    assert assets.claim(hashlib.sha1(b"x").hexdigest()) is None
+    quarantine = immich_uploader.Quarantine()
+    fake: Any = client
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        batch = pool.submit(immich_uploader.upload_batch, [x, y], "A", fake, None, None, quarantine, assets)
+        # The batch releases its own claim once the failed check is handled, then waits for x.jpg
+        assert released.wait(5)
+        assets.resolve(hashlib.sha1(b"x").hexdigest(), "asset-x")
+        assert batch.result(timeout=5) is False
+    assert client.sent == []
+    assert [f for f, _ in quarantine.entries] == [y]
+    assert client.adds == [("id-A", ["asset-x"])]
+
+
+def test_asset_registry_keeps_only_recent_assets() -> None:
+    """Verify resolved asset IDs beyond the limit are dropped and failed claims are not kept."""
+    assets = immich_uploader.AssetRegistry(max_recent=2)
+    for checksum in "abc":
+        assert assets.claim(checksum) is None
+        assets.resolve(checksum, f"asset-{checksum}")
+    assert assets.claim("a") is None
+    reused = assets.claim("c")
+    assert reused is not None and reused.result(timeout=0) == "asset-c"
+    assets.resolve("a", None)
+    assert assets.claim("a") is None
+
+
+def test_cli_failure_naming_no_batch_file_is_not_recorded(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify a failure the CLI reports under an unknown name is bisected even when the CLI exits 0."""
+    album = tmp_path / "Paris - 2015"
+    album.mkdir()
+    files = []
+    for name in ("IMG 1.jpg", "bad.jpg"):
+        f = album / name
+        f.write_bytes(b"x")
+        files.append(f)
+
+    def fake_cli(batch: list[Path], album: str) -> CliResult:
+        failed = [parse_line("  - bad - Error: timeout")[0]] if files[1] in batch else []
+        return CliResult(0, failed)
+
+    monkeypatch.setattr(immich_uploader, "_run_cli_upload", fake_cli)
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    quarantine = immich_uploader.Quarantine()
+    try:
+        assert not immich_uploader.upload_batch(files, "album", ledger=ledger, quarantine=quarantine)
+        uploaded = [f for f in files if ledger.is_uploaded(f, 1, f.stat().st_mtime_ns)]
+    finally:
+        ledger.close()
+    assert uploaded == [files[0]]
+    assert quarantine.entries == [(files[1], "immich CLI reported: bad - Error: timeout")]
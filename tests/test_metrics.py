@@ -0,0 +1,40 @@
+"""Tests for the Prometheus metrics exposition."""
+
+import urllib.request
+
+from flickrtoimmich import metrics
+
+
+def test_render_counter_gauge_and_histogram() -> None:
+    """Verify samples are rendered in the text exposition format with escaped labels."""
+    counter = metrics.Counter("test_events_total", "Test events", ("kind",))
+    counter.inc(kind='a"b')
+    counter.inc(2, kind='a"b')
+    gauge = metrics.Gauge("test_depth", "Test depth")
+    gauge.set(3)
+    gauge.dec()
+    hist = metrics.Histogram("test_seconds", "Test latency", (1, 5))
+    hist.observe(0.5)
+    hist.observe(3)
+
+    text = metrics.render()
+    assert "# TYPE test_events_total counter\n" in text
+    assert 'test_events_total{kind="a\\"b"} 3\n' in text
+    assert "test_depth 2\n" in text
+    assert 'test_seconds_bucket{le="1"} 1\n' in text
+    assert 'test_seconds_bucket{le="5"} 2\n' in text
+    assert 'test_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "test_seconds_sum 3.5\n" in text
+    assert "test_seconds_count 2\n" in text
+
+
+def test_server_serves_metrics() -> None:
+    """Verify the HTTP endpoint returns the rendered metrics."""
+    metrics.FILES.inc(direction="upload", result="ok")
+    server = metrics.start_server(0, "127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as resp:
+            body = resp.read().decode()
+    finally:
+        server.shutdown()
+    assert 'flickrtoimmich_files_total{direction="upload",result="ok"}' in body
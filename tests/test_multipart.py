@@ -0,0 +1,53 @@
+"""Tests for the streaming multipart upload body."""
+
+from email.message import Message
+from email.parser import BytesParser
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+
+from flickrtoimmich.multipart import MultipartFileBody
+
+
+def _read_all(body: MultipartFileBody, block: int) -> bytes:
+    """Read ``body`` in blocks of ``block`` bytes like an HTTP connection does."""
+    parts = []
+    while chunk := body.read(block):
+        assert len(chunk) <= block
+        parts.append(bytes(chunk))
+    return b"".join(parts)
+
+
+@pytest.mark.parametrize("size", [0, 1, 5000, 70000])
+def test_body_is_valid_multipart(tmp_path: Path, size: int) -> None:
+    """Verify the streamed body parses as multipart form data and its length is exact."""
+    content = bytes(i % 251 for i in range(size))
+    path = tmp_path / "my photo.jpg"
+    path.write_bytes(content)
+    with MultipartFileBody({"deviceId": "dev", "filename": path.name}, "assetData", path, chunk_size=4096) as body:
+        raw = _read_all(body, 1000)
+        assert len(raw) == len(body)
+        content_type = body.content_type
+
+    msg = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + raw)
+    parts: dict[str, Message] = {}
+    for part in msg.get_payload():
+        assert isinstance(part, Message)
+        parts[str(part.get_param("name", header="content-disposition"))] = part
+    assert parts["deviceId"].get_payload(decode=True) == b"dev"
+    assert parts["assetData"].get_filename() == "my photo.jpg"
+    assert parts["assetData"].get_payload(decode=True) == content
+
+
+def test_requests_streams_body_with_content_length(tmp_path: Path) -> None:
+    """Verify requests sends the body as a sized stream instead of encoding it in memory."""
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"x" * 10000)
+    with MultipartFileBody({}, "assetData", path) as body:
+        # requests' annotations only list file objects returning str | bytes, but any sized stream works
+        data: Any = body
+        prepared = requests.Request("POST", "http://immich.invalid/api/assets", data=data).prepare()
+        assert prepared.body is data
+        assert prepared.headers["Content-Length"] == str(len(body))
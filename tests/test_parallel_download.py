@@ -0,0 +1,279 @@
+"""Tests for the parallel Flickr downloader."""
+
+import json
+import sqlite3
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import flickr_download.flick_download as _fd
+import pytest
+from flickr_api.objects import Photo
+from flickr_download.filename_handlers import get_filename_handler
+
+from flickrtoimmich import parallel_download
+from flickrtoimmich.bandwidth import TokenBucket
+from flickrtoimmich.blob_store import BlobStore
+from flickrtoimmich.sync_state import SyncState
+from tests.conftest import QuietHandler
+
+
+class _Handler(QuietHandler):
+    """Serves ``/<id>.jpg`` with the ID repeated as content; ``/missing.jpg`` answers 404."""
+
+    def do_GET(self) -> None:
+        if self.path == "/missing.jpg":
+            self.send_error(404)
+            return
+        body = self.path.strip("/").encode() * 1000
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def handler() -> type[QuietHandler]:
+    """Serve the fake Flickr CDN."""
+    return _Handler
+
+
+class _FakePhoto(dict[str, Any]):
+    """Just enough of ``flickr_api.objects.Photo`` for the downloader."""
+
+    # Only set on photos whose metadata a test edits, so it is missing from the other sidecars
+    description: str
+
+    def __init__(self, photo_id: str, title: str, url: str) -> None:
+        super().__init__(loaded=True, taken="2020-01-02 03:04:05")
+        self.id = photo_id
+        self.title = title
+        self.url = url
+
+    def _getOutputFilename(self, filename: str, size_label: str | None) -> str:
+        return filename + ".jpg"
+
+    def _getLargestSizeLabel(self) -> str:
+        return "Original"
+
+    def getPhotoFile(self, size_label: str | None = None) -> str:
+        return self.url
+
+    def getExif(self) -> list[str]:
+        return ["exif"]
+
+
+def test_download_list_keeps_flickr_download_layout(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, server: str
+) -> None:
+    """Verify files, sidecars and download records are written like flickr_download and failures are retried."""
+    monkeypatch.chdir(tmp_path)
+    photos = [_FakePhoto(str(i), "Same" if i < 3 else f"P{i}", f"{server}/{i}.jpg") for i in range(6)]
+    photos[4].url = f"{server}/missing.jpg"
+
+    class _Set:
+        id = "set1"
+
+        def getPhotos(self) -> list[_FakePhoto]:
+            return photos
+
+    monkeypatch.setattr(parallel_download, "Walker", lambda method, **kwargs: iter(method()))
+    downloader = parallel_download.ParallelDownloader(
+        get_filename_handler("title_increment"), save_json=True, metadata_store=True, workers=3, limiter=TokenBucket()
+    )
+    try:
+        downloader.download_list(_Set(), "My/Album")
+    finally:
+        downloader.close()
+
+    album = tmp_path / "My_Album"
+    assert sorted(p.name for p in album.glob("*.jpg")) == ["P3.jpg", "P5.jpg", "Same(1).jpg", "Same(2).jpg", "Same.jpg"]
+    assert (album / "Same(2).jpg").read_bytes() == b"2.jpg" * 1000
+    assert json.loads((album / "P3.jpg.json").read_text())["exif"] == ["exif"]
+    assert not list(album.glob("*.part"))
+    assert downloader.failed == 1
+
+    with sqlite3.connect(album / ".metadata.db") as conn:
+        recorded = {row[0] for row in conn.execute("SELECT photo_id FROM downloads")}
+    assert recorded == {"0", "1", "2", "3", "5"}
+
+
+def test_incremental_user_download_fetches_only_the_delta(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, server: str
+) -> None:
+    """Verify a run with a watermark skips unchanged albums and refreshes sidecars of changed photos."""
+    monkeypatch.chdir(tmp_path)
+    albums = {
+        name: [_FakePhoto(f"{name}{i}", f"{name}{i}", f"{server}/{name}{i}.jpg") for i in range(2)] for name in "ABC"
+    }
+    listed: list[str] = []
+
+    class _Set:
+        def __init__(self, name: str, date_update: int) -> None:
+            self.id = self.title = name
+            self.date_update = str(date_update)
+
+        def getPhotos(self) -> list[_FakePhoto]:
+            listed.append(self.id)
+            return albums[self.id]
+
+    sets = [_Set(name, 100) for name in "ABC"]
+
+    class _User:
+        id = "u1"
+
+        def getPhotosets(self) -> list[_Set]:
+            return sets
+
+    monkeypatch.setattr(parallel_download, "Walker", lambda method, **kwargs: iter(method()))
+    monkeypatch.setattr(_fd, "find_user", lambda username: _User())
+    monkeypatch.setattr(parallel_download, "iter_uploaded_since", lambda user_id, since: iter(()))
+    monkeypatch.setattr(parallel_download, "iter_recently_updated", lambda since, owner: iter([albums["C"][1]]))
+    monkeypatch.setattr(parallel_download, "photo_album_ids", lambda photo_id: ["C"])
+    state = SyncState(tmp_path / "state.db")
+
+    def run() -> None:
+        downloader = parallel_download.ParallelDownloader(
+            get_filename_handler("title"),
+            save_json=True,
+            metadata_store=True,
+            workers=2,
+            limiter=TokenBucket(),
+            sync_state=state,
+        )
+        try:
+            downloader.download_user("someone")
+        finally:
+            downloader.close()
+
+    run()
+    assert listed == ["A", "B", "C"]
+    assert state.user_watermark("u1") is not None
+
+    listed.clear()
+    sets[1].date_update = "200"
+    albums["C"][1].description = "edited"
+    run()
+    assert listed == ["B", "C"]
+    assert json.loads((tmp_path / "C" / "C1.jpg.json").read_text())["description"] == "edited"
+    assert "description" not in json.loads((tmp_path / "C" / "C0.jpg.json").read_text())
+
+
+def test_blob_store_downloads_shared_photos_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, server: str) -> None:
+    """Verify a photo in two albums is fetched once and both album files are hardlinks to the stored copy."""
+    monkeypatch.chdir(tmp_path)
+    fetched: list[str] = []
+    shared = _FakePhoto("7", "Shared", f"{server}/7.jpg")
+    own = _FakePhoto("8", "Own", f"{server}/8.jpg")
+
+    def recording_url(photo: _FakePhoto) -> Callable[..., str]:
+        def get_photo_file(size_label: str | None = None) -> str:
+            fetched.append(photo.id)
+            return photo.url
+
+        return get_photo_file
+
+    for photo in (shared, own):
+        monkeypatch.setattr(photo, "getPhotoFile", recording_url(photo))
+
+    class _Set:
+        def __init__(self, set_id: str, photos: list[_FakePhoto]) -> None:
+            self.id = set_id
+            self.photos = photos
+
+        def getPhotos(self) -> list[_FakePhoto]:
+            return self.photos
+
+    monkeypatch.setattr(parallel_download, "Walker", lambda method, **kwargs: iter(method()))
+    downloader = parallel_download.ParallelDownloader(
+        get_filename_handler("title"),
+        workers=2,
+        limiter=TokenBucket(),
+        blob_store=BlobStore(tmp_path / ".flickr_blobs"),
+    )
+    try:
+        downloader.download_list(_Set("s1", [shared]), "First")
+        downloader.download_list(_Set("s2", [shared, own]), "Second")
+    finally:
+        downloader.close()
+
+    assert sorted(fetched) == ["7", "8"]
+    blob = tmp_path / ".flickr_blobs" / "7" / "7_largest.jpg"
+    assert blob.read_bytes() == b"7.jpg" * 1000
+    assert (tmp_path / "First" / "Shared.jpg").samefile(blob)
+    assert (tmp_path / "Second" / "Shared.jpg").samefile(blob)
+    assert blob.stat().st_nlink == 3
+    assert downloader.failed == 0
+
+
+def test_find_album_dir_falls_back_to_the_truncated_name(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify the announced directory is the truncated one when only that exists."""
+    monkeypatch.chdir(tmp_path)
+    title = "x" * (parallel_download.MAX_DIRNAME + 10)
+    assert parallel_download.find_album_dir(title) == Path(title)
+    (tmp_path / title[: parallel_download.MAX_DIRNAME]).mkdir()
+    assert parallel_download.find_album_dir(title) == Path(title[: parallel_download.MAX_DIRNAME])
+
+
+def test_main_fails_when_photos_fail(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify the exit code is non-zero when keys are missing or a photo could not be downloaded."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr(sys, "argv", ["flickr_download", "--download_user", "someone"])
+    assert parallel_download.main(2) == 1
+
+    def download_user(self: parallel_download.ParallelDownloader, username: str) -> None:
+        self.failed = 1
+
+    monkeypatch.setattr(sys, "argv", [*sys.argv, "-k", "key", "-s", "secret"])
+    monkeypatch.setattr(_fd, "_init", lambda key, secret, oauth: True)
+    monkeypatch.setattr(parallel_download.ParallelDownloader, "download_user", download_user)
+    assert parallel_download.main(2) == 1
+
+
+def test_listing_replaces_size_and_info_lookups(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, server: str) -> None:
+    """Verify listed originals are downloaded without per-photo API calls and unlisted ones are still looked up."""
+    monkeypatch.chdir(tmp_path)
+    listing = [
+        dict(
+            id="1",
+            title="Listed",
+            media="photo",
+            datetaken="2020-01-02 03:04:05",
+            url_o=f"{server}/1.jpg",
+            width_o="4",
+            height_o="3",
+        ),
+        dict(id="2", title="Hidden", media="photo", datetaken="2020-01-02 03:04:05"),
+    ]
+    looked_up: list[str] = []
+
+    def get_sizes(self: Photo, **args: Any) -> dict[str, dict[str, Any]]:
+        looked_up.append(self.id)
+        return {"Original": dict(label="Original", media="photo", source=f"{server}/{self.id}.jpg", width=4, height=3)}
+
+    def load(self: Photo) -> None:
+        raise AssertionError("photo info loaded")
+
+    monkeypatch.setattr(Photo, "_getSizes", get_sizes)
+    monkeypatch.setattr(Photo, "load", load)
+
+    class _Set:
+        id = "set1"
+
+        def getPhotos(self, extras: str) -> list[Photo]:
+            assert "url_o" in extras.split(",")
+            return [Photo(**p) for p in listing]
+
+    monkeypatch.setattr(parallel_download, "Walker", lambda method, **kwargs: iter(method(**kwargs)))
+    downloader = parallel_download.ParallelDownloader(get_filename_handler("title"), workers=2, limiter=TokenBucket())
+    try:
+        downloader.download_list(_Set(), "Album")
+    finally:
+        downloader.close()
+
+    assert looked_up == ["2"]
+    assert (tmp_path / "Album" / "Listed.jpg").read_bytes() == b"1.jpg" * 1000
+    assert (tmp_path / "Album" / "Hidden.jpg").read_bytes() == b"2.jpg" * 1000
+    assert downloader.failed == 0
@@ -0,0 +1,124 @@
+"""Tests for resumable downloads."""
+
+from pathlib import Path
+
+import pytest
+import requests
+
+from flickrtoimmich.bandwidth import TokenBucket
+from flickrtoimmich.ranged_download import CHUNK_SIZE, fetch, parse_content_range
+from tests.conftest import QuietHandler
+
+BODY = bytes(range(256)) * 1000
+
+
+class _Handler(QuietHandler):
+    """Serves :data:`BODY` at ``/file`` with ``Range`` support; ``/missing`` answers 404.
+
+    ``cuts`` lists how many bytes each of the next responses sends before dropping the connection, and
+    ``ignore_range`` makes the server answer range requests with the whole file.
+    """
+
+    cuts: list[int] = []
+    ignore_range = False
+    ranges: list[str | None] = []
+
+    def do_GET(self) -> None:
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        requested = self.headers.get("Range")
+        self.ranges.append(requested)
+        start = 0
+        if requested and not self.ignore_range:
+            start = int(requested.removeprefix("bytes=").rstrip("-"))
+            if start >= len(BODY):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(BODY)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        else:
+            self.send_response(200)
+        body = BODY[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.cuts:
+            body = body[: self.cuts.pop(0)]
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def handler(monkeypatch: pytest.MonkeyPatch) -> type[QuietHandler]:
+    """Serve :data:`BODY` with fresh handler settings."""
+    monkeypatch.setattr(_Handler, "cuts", [])
+    monkeypatch.setattr(_Handler, "ranges", [])
+    return _Handler
+
+
+def _fetch(url: str, fname: Path, attempts: int = 5) -> int:
+    with requests.Session() as session:
+        return fetch(session, url, str(fname), TokenBucket(), timeout=10, attempts=attempts)
+
+
+def test_partial_file_is_resumed(tmp_path: Path, server: str) -> None:
+    """Verify a ``.part`` file left by an earlier run is continued with a range request and renamed."""
+    target = tmp_path / "video.mp4"
+    (tmp_path / "video.mp4.part").write_bytes(BODY[:100_000])
+
+    assert _fetch(f"{server}/file", target) == len(BODY) - 100_000
+    assert target.read_bytes() == BODY
+    assert not (tmp_path / "video.mp4.part").exists()
+    assert _Handler.ranges == ["bytes=100000-"]
+
+
+def test_dropped_connections_resume_and_keep_the_partial_file(tmp_path: Path, server: str) -> None:
+    """Verify interrupted attempts continue where they stopped, and the partial file survives giving up."""
+    target = tmp_path / "video.mp4"
+    # Only complete chunks reach the file
+    _Handler.cuts = [CHUNK_SIZE + 100, CHUNK_SIZE + 100]
+    assert _fetch(f"{server}/file", target) == len(BODY)
+    assert target.read_bytes() == BODY
+    assert _Handler.ranges == [None, f"bytes={CHUNK_SIZE}-", f"bytes={2 * CHUNK_SIZE}-"]
+
+    target.unlink()
+    _Handler.cuts = [CHUNK_SIZE + 100]
+    with pytest.raises(requests.RequestException):
+        _fetch(f"{server}/file", target, attempts=1)
+    assert not target.exists()
+    assert (tmp_path / "video.mp4.part").stat().st_size == CHUNK_SIZE
+
+
+def test_ignored_range_restarts_and_complete_part_is_renamed(
+    tmp_path: Path, server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verify a server without range support overwrites the partial file, and a complete one is only renamed."""
+    target = tmp_path / "a.jpg"
+    (tmp_path / "a.jpg.part").write_bytes(b"stale")
+    monkeypatch.setattr(_Handler, "ignore_range", True)
+    assert _fetch(f"{server}/file", target) == len(BODY)
+    assert target.read_bytes() == BODY
+
+    monkeypatch.setattr(_Handler, "ignore_range", False)
+    target = tmp_path / "b.jpg"
+    (tmp_path / "b.jpg.part").write_bytes(BODY)
+    assert _fetch(f"{server}/file", target) == 0
+    assert target.read_bytes() == BODY
+
+
+def test_missing_file_discards_the_partial_file(tmp_path: Path, server: str) -> None:
+    """Verify a partial download of a file that is no longer served is deleted."""
+    (tmp_path / "a.jpg.part").write_bytes(b"partial")
+    with pytest.raises(OSError, match="HTTP Error 404"):
+        _fetch(f"{server}/missing", tmp_path / "a.jpg")
+    assert not list(tmp_path.iterdir())
+
+
+def test_parse_content_range() -> None:
+    """Verify byte ranges and unsatisfied-range answers are parsed."""
+    assert parse_content_range("bytes 100-199/1000") == (100, 1000)
+    assert parse_content_range("bytes */1000") == (None, 1000)
+    assert parse_content_range("bytes 0-9/*") == (0, None)
+    assert parse_content_range(None) == (None, None)
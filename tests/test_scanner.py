@@ -0,0 +1,146 @@
+"""Tests for streaming media discovery."""
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from flickrtoimmich import completion_log, scanner
+from flickrtoimmich.blob_store import BLOB_DIRNAME, BlobStore
+from flickrtoimmich.scan_index import ScanIndex
+from flickrtoimmich.scanner import iter_album_dirs, iter_album_files, prefetch
+
+
+def test_iter_album_files_sorted_and_filtered(tmp_path: Path) -> None:
+    """Verify files are yielded in sorted path order and filtered by extension."""
+    (tmp_path / "sub").mkdir()
+    for name in ("b.JPG", "a.jpg", "c.json", "sub/d.png"):
+        (tmp_path / name).write_bytes(b"12345")
+    found = list(iter_album_files(tmp_path, {".jpg", ".png"}))
+    assert [f.path.relative_to(tmp_path).as_posix() for f in found] == ["a.jpg", "b.JPG", "sub/d.png"]
+    assert all(f.size == 5 for f in found)
+
+
+def test_iter_album_dirs_skips_files(tmp_path: Path) -> None:
+    """Verify only directories are reported as albums."""
+    (tmp_path / "B").mkdir()
+    (tmp_path / "A").mkdir()
+    (tmp_path / "ledger.db").write_bytes(b"")
+    assert [d.name for d in iter_album_dirs(tmp_path)] == ["A", "B"]
+
+
+def test_blob_store_is_not_an_album(tmp_path: Path) -> None:
+    """Verify the blob store in the download directory is neither an album nor counted in the scan."""
+
+    def fetch(path: str) -> None:
+        Path(path).write_bytes(b"x")
+
+    store = BlobStore(tmp_path / BLOB_DIRNAME)
+    (tmp_path / "A").mkdir()
+    store.place("12345", None, str(tmp_path / "A" / "a.jpg"), fetch)
+    albums = [(d.name, [sf.path.name for sf in files]) for d, files in scanner.iter_albums(tmp_path, {".jpg"})]
+    assert albums == [("A", ["a.jpg"])]
+
+
+def test_prefetch_preserves_order_and_reraises() -> None:
+    """Verify elements arrive in order and producer errors surface in the consumer."""
+
+    def produce() -> Iterator[int]:
+        yield from range(10)
+        raise OSError("disk gone")
+
+    seen: list[int] = []
+    with pytest.raises(OSError, match="disk gone"):
+        for item in prefetch(produce(), maxsize=2):
+            seen.append(item)
+    assert seen == list(range(10))
+
+
+def _age_dirs(root: Path) -> None:
+    """Move directory mtimes out of the racy window so their listings get indexed."""
+    for d in [root, *(p for p in root.rglob("*") if p.is_dir())]:
+        os.utime(d, (1_600_000_000, 1_600_000_000))
+
+
+def test_scan_index_skips_unchanged_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify unchanged directories are served from the index and changed ones are read again."""
+    album = tmp_path / "album"
+    (album / "sub").mkdir(parents=True)
+    for name in ("a.jpg", "sub/b.jpg", "c.txt"):
+        (album / name).write_bytes(b"x")
+    _age_dirs(album)
+    index = ScanIndex(tmp_path / "index.db", tmp_path, {".jpg"})
+    try:
+        first = list(iter_album_files(album, {".jpg"}, index))
+        assert [f.path.name for f in first] == ["a.jpg", "b.jpg"]
+
+        real_scandir = os.scandir
+        read: list[str] = []
+
+        def tracking_scandir(path: Path) -> Any:
+            read.append(Path(path).name)
+            return real_scandir(path)
+
+        monkeypatch.setattr(os, "scandir", tracking_scandir)
+        assert list(iter_album_files(album, {".jpg"}, index)) == first
+        assert read == []
+
+        (album / "sub" / "d.jpg").write_bytes(b"x")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            found = list(iter_album_files(album, {".jpg"}, index, pool))
+        assert [f.path.name for f in found] == ["a.jpg", "b.jpg", "d.jpg"]
+        assert read == ["sub"]
+    finally:
+        index.close()
+
+
+def test_scan_index_cleared_when_extensions_change(tmp_path: Path) -> None:
+    """Verify listings filtered by another extension set are not reused."""
+    (tmp_path / "a.jpg").write_bytes(b"x")
+    (tmp_path / "b.png").write_bytes(b"x")
+    _age_dirs(tmp_path)
+    index = ScanIndex(tmp_path / "index.db", tmp_path, {".jpg"})
+    list(iter_album_files(tmp_path, {".jpg"}, index))
+    index.close()
+    index = ScanIndex(tmp_path / "index.db", tmp_path, {".png"})
+    try:
+        assert [f.path.name for f in iter_album_files(tmp_path, {".png"}, index)] == ["b.png"]
+    finally:
+        index.close()
+
+
+def test_follow_waits_for_complete_lines(tmp_path: Path) -> None:
+    """Verify the completion log is tailed until the end marker and half-written lines are held back."""
+    log = tmp_path / "done.log"
+    got: list[Path] = []
+    reader = threading.Thread(target=lambda: got.extend(completion_log.follow(log, poll_interval=0.01)))
+    reader.start()
+    completion_log.mark_album_done(log, tmp_path / "A")
+    with log.open("a") as fh:
+        fh.write(str(tmp_path / "B"))
+        fh.flush()
+        time.sleep(0.05)
+        fh.write("\n")
+    completion_log.mark_finished(log)
+    reader.join(timeout=5)
+    assert not reader.is_alive()
+    assert got == [tmp_path / "A", tmp_path / "B"]
+
+
+def test_iter_completed_albums_yields_announced_albums_first(tmp_path: Path) -> None:
+    """Verify announced albums are yielded in order, foreign directories are ignored and no full pass follows."""
+    data = tmp_path / "data"
+    for album in ("A", "B"):
+        (data / album).mkdir(parents=True)
+        (data / album / "x.jpg").write_bytes(b"x")
+    log = tmp_path / "done.log"
+    completion_log.mark_album_done(log, data / "B")
+    completion_log.mark_album_done(log, tmp_path / "elsewhere")
+    completion_log.mark_finished(log)
+    albums = [d.name for d, files in scanner.iter_completed_albums(log, data, {".jpg"}) if list(files)]
+    assert albums == ["B"]
@@ -0,0 +1,82 @@
+"""Tests for pushing Flickr sidecar metadata to Immich."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from flickrtoimmich.sidecar_metadata import SidecarMetadata, parse_sidecar, sync_metadata
+from flickrtoimmich.upload_ledger import UploadLedger
+
+
+def _write_photo(root: Path, name: str, sidecar: dict[str, Any]) -> Path:
+    """Create a photo and its flickr_download JSON sidecar."""
+    photo = root / name
+    photo.write_bytes(b"x")
+    (root / f"{name}.json").write_text(json.dumps(sidecar))
+    return photo
+
+
+def test_parse_sidecar(tmp_path: Path) -> None:
+    """Verify title and description are combined and a 0,0 location is ignored."""
+    sidecar = tmp_path / "a.jpg.json"
+    sidecar.write_text(
+        json.dumps(
+            {
+                "title": "Beach",
+                "description": {"_content": "Sunset at the beach"},
+                "tags": ["sea", "sunset", "sea"],
+                "location": {"latitude": "54.1", "longitude": "7.9"},
+            }
+        )
+    )
+    assert parse_sidecar(sidecar) == SidecarMetadata("Beach\n\nSunset at the beach", ("sea", "sunset"), 54.1, 7.9)
+    sidecar.write_text(json.dumps({"title": "Untitled", "location": {"latitude": 0, "longitude": 0}}))
+    assert parse_sidecar(sidecar) == SidecarMetadata("Untitled", (), None, None)
+
+
+class _FakeClient:
+    """Records bulk metadata calls."""
+
+    def __init__(self) -> None:
+        self.updates: list[tuple[list[str], dict[str, Any]]] = []
+        self.tagged: list[tuple[list[str], list[str]]] = []
+
+    def update_assets(self, asset_ids: list[str], **fields: Any) -> None:
+        self.updates.append((sorted(asset_ids), fields))
+
+    def upsert_tags(self, names: list[str]) -> dict[str, str]:
+        return {n: f"tag-{n}" for n in names}
+
+    def tag_assets(self, tag_ids: list[str], asset_ids: list[str]) -> None:
+        self.tagged.append((tag_ids, sorted(asset_ids)))
+
+
+def test_sync_metadata_groups_calls_and_skips_synced(tmp_path: Path) -> None:
+    """Verify an asset's fields go in one call, identical values are shared and synced sidecars are skipped."""
+    photos = [
+        _write_photo(tmp_path, "a.jpg", {"title": "Trip", "tags": ["x"]}),
+        _write_photo(tmp_path, "b.jpg", {"title": "Trip", "tags": ["x", "y"]}),
+        _write_photo(tmp_path, "c.jpg", {"title": "", "location": {"latitude": "1.5", "longitude": "2.5"}}),
+        _write_photo(tmp_path, "e.jpg", {"title": "Pier", "location": {"latitude": "3", "longitude": "4"}}),
+    ]
+    (tmp_path / "d.jpg").write_bytes(b"no sidecar")
+    ledger = UploadLedger(tmp_path / "ledger.db", tmp_path)
+    try:
+        ledger.record([(p, f"id-{p.stem}") for p in [*photos, tmp_path / "d.jpg"]])
+        client = _FakeClient()
+        assert sync_metadata(client, ledger) == 4  # type: ignore[arg-type]
+        assert sorted(client.updates, key=str) == sorted(
+            [
+                (["id-a", "id-b"], {"description": "Trip"}),
+                (["id-c"], {"latitude": 1.5, "longitude": 2.5}),
+                (["id-e"], {"description": "Pier", "latitude": 3.0, "longitude": 4.0}),
+            ],
+            key=str,
+        )
+        assert sorted(client.tagged) == [(["tag-x"], ["id-a", "id-b"]), (["tag-y"], ["id-b"])]
+
+        client = _FakeClient()
+        assert sync_metadata(client, ledger) == 0  # type: ignore[arg-type]
+        assert client.updates == [] and client.tagged == []
+    finally:
+        ledger.close()
@@ -0,0 +1,30 @@
+"""Tests for the recorded transfer throughput."""
+
+from pathlib import Path
+
+from flickrtoimmich.transfer_stats import KEEP_RUNS, MIN_BYTES, TransferStats, fmt_duration, fmt_size
+
+
+def test_throughput_averages_recent_runs(tmp_path: Path) -> None:
+    """Verify small runs are ignored, only the last runs count, and the ETA follows from their average."""
+    stats = TransferStats(tmp_path / "stats.json")
+    assert stats.estimate("download", 1) == "no download throughput measured yet"
+
+    stats.record("download", MIN_BYTES - 1, 1)
+    assert stats.throughput("download") is None
+    stats.record("download", 100 * MIN_BYTES, 1)
+    for _ in range(KEEP_RUNS):
+        stats.record("download", MIN_BYTES, 2)
+
+    assert stats.throughput("download") == (MIN_BYTES / 2, KEEP_RUNS)
+    assert stats.throughput("upload") is None
+    assert stats.estimate("download", 3600 * MIN_BYTES).startswith("ETA ~2h 00m at 8.0 MB/s")
+
+
+def test_formatting() -> None:
+    """Verify sizes and durations are rendered with sensible units."""
+    assert fmt_size(320) == "320 B"
+    assert fmt_size(1536) == "1.5 KB"
+    assert fmt_size(3 * 1024**4) == "3.0 TB"
+    assert fmt_duration(200) == "3m 20s"
+    assert fmt_duration(7500) == "2h 05m"